@@ -0,0 +1,174 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+# 預設設定，可透過環境變數覆寫
+DEFAULT_CACHE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "analysis_cache.sqlite3")
+DEFAULT_TTL_SECONDS = 7 * 24 * 3600
+DEFAULT_MAX_ENTRIES = 5000
+
+
+def make_cache_key(input_hash, model_name, prompt_version, generation_config):
+    """組合輸入哈希、模型名稱、提示詞版本與生成參數，產生緩存鍵"""
+    config_text = json.dumps(generation_config or {}, sort_keys=True, ensure_ascii=False)
+    raw = f"{input_hash}|{model_name}|{prompt_version}|{config_text}"
+    return hashlib.md5(raw.encode()).hexdigest()
+
+
+class AnalysisCache:
+    """跨 session、跨行程共享的 SQLite 分析結果緩存（TTL + LRU 容量上限）"""
+
+    def __init__(self, path=None, ttl_seconds=None, max_entries=None):
+        self.path = path or os.getenv("ANALYSIS_CACHE_PATH", DEFAULT_CACHE_PATH)
+        self.ttl_seconds = int(ttl_seconds if ttl_seconds is not None else os.getenv("ANALYSIS_CACHE_TTL", DEFAULT_TTL_SECONDS))
+        self.max_entries = int(max_entries if max_entries is not None else os.getenv("ANALYSIS_CACHE_MAX_ENTRIES", DEFAULT_MAX_ENTRIES))
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._init_schema()
+
+    def _connect(self):
+        """每個執行緒各自持有一條連線；WAL 模式讓多個 Streamlit 行程可同時讀寫"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=30000")
+            self._local.conn = conn
+        return conn
+
+    def _init_schema(self):
+        conn = self._connect()
+        conn.execute(
+            """CREATE TABLE IF NOT EXISTS analysis_cache (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            )"""
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_analysis_cache_last_access ON analysis_cache(last_access)")
+        conn.execute(
+            """CREATE TABLE IF NOT EXISTS cache_stats (
+                name TEXT PRIMARY KEY,
+                value INTEGER NOT NULL
+            )"""
+        )
+        conn.execute("INSERT OR IGNORE INTO cache_stats(name, value) VALUES ('hits', 0), ('misses', 0)")
+
+    def _record(self, name):
+        with self._lock:
+            if name == "hits":
+                self.hits += 1
+            else:
+                self.misses += 1
+        try:
+            self._connect().execute("UPDATE cache_stats SET value = value + 1 WHERE name = ?", (name,))
+        except sqlite3.Error:
+            # 統計失敗不影響主要流程
+            pass
+
+    def get(self, key):
+        """讀取緩存；過期項目視為未命中並刪除"""
+        now = time.time()
+        try:
+            conn = self._connect()
+            row = conn.execute("SELECT value, created_at FROM analysis_cache WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self._record("misses")
+                return None
+            value, created_at = row
+            if self.ttl_seconds > 0 and now - created_at > self.ttl_seconds:
+                conn.execute("DELETE FROM analysis_cache WHERE key = ?", (key,))
+                self._record("misses")
+                return None
+            conn.execute("UPDATE analysis_cache SET last_access = ? WHERE key = ?", (now, key))
+        except sqlite3.Error:
+            self._record("misses")
+            return None
+        self._record("hits")
+        return json.loads(value)
+
+    def set(self, key, value):
+        """寫入緩存，超過容量時依最近使用時間淘汰最舊的項目"""
+        now = time.time()
+        payload = json.dumps(value, ensure_ascii=False, separators=(",", ":"))
+        try:
+            conn = self._connect()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.execute(
+                    "INSERT OR REPLACE INTO analysis_cache(key, value, created_at, last_access) VALUES (?, ?, ?, ?)",
+                    (key, payload, now, now),
+                )
+                if self.ttl_seconds > 0:
+                    conn.execute("DELETE FROM analysis_cache WHERE created_at < ?", (now - self.ttl_seconds,))
+                if self.max_entries > 0:
+                    conn.execute(
+                        """DELETE FROM analysis_cache WHERE key IN (
+                            SELECT key FROM analysis_cache ORDER BY last_access DESC LIMIT -1 OFFSET ?
+                        )""",
+                        (self.max_entries,),
+                    )
+                conn.execute("COMMIT")
+            except sqlite3.Error:
+                conn.execute("ROLLBACK")
+                raise
+        except sqlite3.Error:
+            # 緩存寫入失敗時不影響分析結果
+            return False
+        return True
+
+    def stats(self):
+        """回傳命中/未命中統計：本行程與所有共享行程的累計數字"""
+        shared = {}
+        entries = 0
+        try:
+            conn = self._connect()
+            shared = dict(conn.execute("SELECT name, value FROM cache_stats").fetchall())
+            entries = conn.execute("SELECT COUNT(*) FROM analysis_cache").fetchone()[0]
+        except sqlite3.Error:
+            pass
+        total_hits = shared.get("hits", 0)
+        total_misses = shared.get("misses", 0)
+        lookups = total_hits + total_misses
+        return {
+            "process_hits": self.hits,
+            "process_misses": self.misses,
+            "hits": total_hits,
+            "misses": total_misses,
+            "hit_rate": total_hits / lookups if lookups else 0.0,
+            "entries": entries,
+        }
+
+    def metrics(self):
+        """register_collector 用的 (counters, gauges)：本行程的命中/未命中累計與目前的項目數
+
+        counter 只計本行程（重新啟動從 0 開始），多個 worker 行程各自輸出、由 Prometheus 加總；
+        stats() 中跨行程共享的累計值會在重新啟動後延續，不適合當作 counter。
+        """
+        try:
+            entries = self._connect().execute("SELECT COUNT(*) FROM analysis_cache").fetchone()[0]
+        except sqlite3.Error:
+            entries = 0
+        with self._lock:
+            counters = {"hits": self.hits, "misses": self.misses}
+        return counters, {"entries": entries}
+
+    def clear(self):
+        """清空所有緩存項目與統計"""
+        conn = self._connect()
+        conn.execute("DELETE FROM analysis_cache")
+        conn.execute("UPDATE cache_stats SET value = 0")
+        with self._lock:
+            self.hits = 0
+            self.misses = 0
@@ -0,0 +1,271 @@
+"""分析結果的型別模型
+
+Gemini 回傳的 JSON 在解析時就經由 AnalysisResult.from_dict() 驗證並正規化一次：
+三種歷史格式（item/evidence、title/description、純文字）統一成固定欄位，分數與權重轉成數值並限制範圍。
+之後的渲染、排序與緩存都只處理這個模型，不需要再逐次檢查資料形狀。
+
+to_compact() / from_compact() 以不含欄位名稱的巢狀列表保存結果，用於磁碟緩存；
+to_dict() 輸出與提示詞相同的 JSON 格式，用於 HTTP API。
+"""
+import re
+import sys
+from dataclasses import dataclass
+from typing import Optional
+
+# 緊湊格式的版本號，欄位順序改變時遞增（舊版本的緩存項目會被視為未命中）
+COMPACT_VERSION = 1
+
+_NUMBER_RE = re.compile(r'-?\d+(?:\.\d+)?')
+
+
+def _text(value):
+    if value is None:
+        return ""
+    return value.strip() if isinstance(value, str) else str(value).strip()
+
+
+def _texts(value):
+    """字串或列表統一成去除空白項目的 tuple"""
+    if value is None:
+        return ()
+    if not isinstance(value, (list, tuple)):
+        value = [value]
+    return tuple(text for text in map(_text, value) if text)
+
+
+def _number(value):
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, str):
+        match = _NUMBER_RE.search(value)
+        if match:
+            return float(match.group())
+    return None
+
+
+def _score(value):
+    """0–100 的整數分數；接受 85、85.4、"85%" 等形式"""
+    number = _number(value)
+    if number is None:
+        return None
+    return max(0, min(100, round(number)))
+
+
+def _weight(value):
+    """0–1 的權重；大於 1 的數值視為百分比"""
+    number = _number(value)
+    if number is None:
+        return 0.0
+    if number > 1:
+        number /= 100
+    return max(0.0, min(1.0, number))
+
+
+@dataclass(frozen=True)
+class Priority:
+    """職缺重點；weight 為 None 代表舊格式的純文字項目"""
+
+    __slots__ = ("name", "weight", "explanation")
+    name: str
+    weight: Optional[float]
+    explanation: str
+
+    @classmethod
+    def from_raw(cls, value):
+        if isinstance(value, dict):
+            return cls(_text(value.get("name")), _weight(value.get("weight")), _text(value.get("explanation")))
+        return cls(_text(value), None, "")
+
+
+@dataclass(frozen=True)
+class MatchedItem:
+    """已符合的條件與履歷中的證據（舊格式的 description 視為單一證據）"""
+
+    __slots__ = ("item", "evidence")
+    item: str
+    evidence: tuple
+
+    @classmethod
+    def from_raw(cls, value):
+        if isinstance(value, dict):
+            if "item" in value:
+                return cls(_text(value["item"]), _texts(value.get("evidence")))
+            if "title" in value:
+                return cls(_text(value["title"]), _texts(value.get("description")))
+        return cls(_text(value), ())
+
+
+@dataclass(frozen=True)
+class MissingItem:
+    """缺少的條件與建議行動"""
+
+    __slots__ = ("item", "action")
+    item: str
+    action: str
+
+    @classmethod
+    def from_raw(cls, value):
+        if isinstance(value, dict):
+            if "item" in value:
+                return cls(_text(value["item"]), _text(value.get("action")))
+            if "title" in value:
+                return cls(_text(value["title"]), _text(value.get("description")))
+        return cls(_text(value), "")
+
+
+@dataclass(frozen=True)
+class AdviceCategory:
+    """一個建議類別；title 為空字串代表舊格式（沒有分類的建議列表）"""
+
+    __slots__ = ("title", "items")
+    title: str
+    items: tuple
+
+    @classmethod
+    def from_raw(cls, title, items):
+        return cls(sys.intern(_text(title)), _texts(items))
+
+
+def _advice(value):
+    if isinstance(value, dict):
+        categories = (AdviceCategory.from_raw(title, items) for title, items in value.items())
+        return tuple(category for category in categories if category.items)
+    items = _texts(value)
+    return (AdviceCategory("", items),) if items else ()
+
+
+def _items(factory, value):
+    if not isinstance(value, (list, tuple)):
+        return ()
+    items = (factory(raw) for raw in value)
+    return tuple(item for item in items if item.item)
+
+
+@dataclass(frozen=True)
+class AnalysisResult:
+    """正規化後的分析結果；match_score 為 None 只出現在串流中尚未生成分數的部分結果"""
+
+    __slots__ = (
+        "match_score", "match_explanation", "score_explanation", "priorities",
+        "matched", "missing", "advice", "output_language", "prescreened",
+    )
+    match_score: Optional[int]
+    match_explanation: str
+    score_explanation: str
+    priorities: tuple
+    matched: tuple
+    missing: tuple
+    advice: tuple
+    output_language: str
+    prescreened: bool
+
+    @classmethod
+    def from_dict(cls, data, output_language=None, partial=False):
+        """驗證並正規化 Gemini 回傳的 JSON 物件；partial=True 時缺少的分數保留為 None"""
+        score = _score(data.get("match_score"))
+        if score is None and not partial:
+            score = 0
+        priorities = data.get("priorities")
+        return cls(
+            match_score=score,
+            match_explanation=_text(data.get("match_explanation")),
+            score_explanation=_text(data.get("score_explanation")),
+            priorities=tuple(Priority.from_raw(p) for p in priorities) if isinstance(priorities, list) else (),
+            matched=_items(MatchedItem.from_raw, data.get("matched")),
+            missing=_items(MissingItem.from_raw, data.get("missing")),
+            advice=_advice(data.get("advice")),
+            output_language=output_language or _text(data.get("output_language")),
+            prescreened=bool(data.get("prescreened")),
+        )
+
+    def to_dict(self):
+        """輸出與提示詞相同格式的 JSON 物件"""
+        data = {
+            "match_score": self.match_score,
+            "match_explanation": self.match_explanation,
+            "score_explanation": self.score_explanation,
+            "priorities": [
+                {"name": p.name, "weight": p.weight, "explanation": p.explanation} if p.weight is not None else p.name
+                for p in self.priorities
+            ],
+            "matched": [{"item": m.item, "evidence": list(m.evidence)} for m in self.matched],
+            "missing": [{"item": m.item, "action": m.action} for m in self.missing],
+            "advice": {c.title: list(c.items) for c in self.advice},
+            "output_language": self.output_language,
+        }
+        if self.prescreened:
+            data["prescreened"] = True
+        return data
+
+    def to_compact(self):
+        """以不含欄位名稱的巢狀列表表示，可直接 json.dumps"""
+        return [
+            COMPACT_VERSION,
+            self.match_score,
+            self.match_explanation,
+            self.score_explanation,
+            [[p.name, p.weight, p.explanation] for p in self.priorities],
+            [[m.item, list(m.evidence)] for m in self.matched],
+            [[m.item, m.action] for m in self.missing],
+            [[c.title, list(c.items)] for c in self.advice],
+            self.output_language,
+            int(self.prescreened),
+        ]
+
+    @classmethod
+    def from_compact(cls, data):
+        """還原 to_compact() 的輸出；版本不符時拋出 ValueError"""
+        if not data or data[0] != COMPACT_VERSION:
+            raise ValueError(f"不支援的結果格式版本: {data[0] if data else None}")
+        _, score, explanation, score_explanation, priorities, matched, missing, advice, language, prescreened = data
+        return cls(
+            match_score=score,
+            match_explanation=explanation,
+            score_explanation=score_explanation,
+            priorities=tuple(Priority(name, weight, text) for name, weight, text in priorities),
+            matched=tuple(MatchedItem(item, tuple(evidence)) for item, evidence in matched),
+            missing=tuple(MissingItem(item, action) for item, action in missing),
+            advice=tuple(AdviceCategory(sys.intern(title), tuple(items)) for title, items in advice),
+            output_language=language,
+            prescreened=bool(prescreened),
+        )
+
+    @classmethod
+    def from_stored(cls, data):
+        """讀取緩存中的結果：緊湊格式，或升級前以 dict 保存的舊項目；無法辨識時回傳 None"""
+        if isinstance(data, dict):
+            return cls.from_dict(data)
+        try:
+            return cls.from_compact(data)
+        except (TypeError, ValueError):
+            return None
+
+
+@dataclass(frozen=True)
+class JobProfile:
+    """職缺重點：同一份職缺比對多位應徵者時只抽取一次，作為每次比對的職缺上下文"""
+
+    __slots__ = ("role", "key_skills", "experience", "other")
+    role: str
+    key_skills: tuple
+    experience: tuple
+    other: tuple
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(
+            role=_text(data.get("role")),
+            key_skills=_texts(data.get("key_skills")),
+            experience=_texts(data.get("experience")),
+            other=_texts(data.get("other")),
+        )
+
+    def to_dict(self):
+        return {
+            "role": self.role,
+            "key_skills": list(self.key_skills),
+            "experience": list(self.experience),
+            "other": list(self.other),
+        }
@@ -0,0 +1,222 @@
+"""JobMatch.AI 的 HTTP/JSON API（不經過 Streamlit）
+
+  python api_server.py [--host 0.0.0.0] [--port 8080] [--workers 1]
+
+POST /analyze        {"resume": "...", "job_description": "...", "language": "中文" | "English" | "日本語" | "한국어"}
+POST /analyze/batch  {"resume": "...", "jobs": [{"id": "...", "title": "...", "text": "..."} | "...", ...], "language": ...}
+POST /analyze/screen {"job_description": "...", "resumes": [{"id": "...", "title": "...", "text": "..."} | "...", ...], "language": ...}
+                     多位應徵者比對同一份職缺：職缺只整理一次重點，回傳 job_profile 與依匹配度排序的結果
+GET  /healthz
+GET  /metrics        Prometheus text format：各階段耗時直方圖、分析結果與 token 用量計數、緩存與 single-flight 統計
+
+設定 API_SERVER_TOKEN 時，請求必須帶上 Authorization: Bearer <token>。
+"""
+import argparse
+import hmac
+import logging
+import os
+from contextlib import asynccontextmanager
+
+import uvicorn
+from dotenv import load_dotenv
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse, Response
+from starlette.routing import Route
+
+from language_detection import detect_language
+from matching_engine import AnalysisBusyError, AnalysisError, MatchingEngine
+from metrics import PROMETHEUS_CONTENT_TYPE, get_registry
+
+load_dotenv()
+
+logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO"), format="%(asctime)s %(levelname)s %(name)s %(message)s")
+logger = logging.getLogger(__name__)
+
+API_TOKEN = os.getenv("API_SERVER_TOKEN", "")
+# 單一請求的輸入上限
+MAX_TEXT_CHARS = int(os.getenv("API_MAX_TEXT_CHARS", "50000"))
+MAX_BATCH_JOBS = int(os.getenv("API_MAX_BATCH_JOBS", "50"))
+MAX_SCREEN_RESUMES = int(os.getenv("API_MAX_SCREEN_RESUMES", "300"))
+LANGUAGE_ALIASES = {
+    "中文": "中文", "zh": "中文", "zh-tw": "中文", "zh-cn": "中文",
+    "english": "English", "en": "English",
+    "日本語": "日本語", "ja": "日本語",
+    "한국어": "한국어", "ko": "한국어",
+}
+
+
+class BadRequest(Exception):
+    pass
+
+
+def parse_language(value, sample_text):
+    """接受 中文/English/日本語/한국어 或 zh/en/ja/ko；未指定時依履歷內容判斷"""
+    if not value:
+        return detect_language(sample_text)
+    language = LANGUAGE_ALIASES.get(str(value).strip().lower())
+    if language is None:
+        raise BadRequest(f"unsupported language: {value}")
+    return language
+
+
+def require_text(payload, field):
+    value = payload.get(field)
+    if not isinstance(value, str) or not value.strip():
+        raise BadRequest(f"'{field}' must be a non-empty string")
+    if len(value) > MAX_TEXT_CHARS:
+        raise BadRequest(f"'{field}' exceeds {MAX_TEXT_CHARS} characters")
+    return value
+
+
+def parse_documents(payload, field, max_items):
+    """解析 jobs / resumes 列表：每項為字串或 {"id", "title", "text"}"""
+    documents = payload.get(field)
+    if not isinstance(documents, list) or not documents:
+        raise BadRequest(f"'{field}' must be a non-empty list")
+    if len(documents) > max_items:
+        raise BadRequest(f"'{field}' exceeds {max_items} items")
+    parsed = []
+    for index, document in enumerate(documents):
+        if isinstance(document, str):
+            document = {"text": document}
+        if not isinstance(document, dict):
+            raise BadRequest(f"{field}[{index}] must be a string or an object")
+        text = require_text(document, "text")
+        parsed.append({"id": str(document.get("id", index)), "title": document.get("title") or text.strip().splitlines()[0][:80], "text": text})
+    return parsed
+
+
+def parse_jobs(payload):
+    return parse_documents(payload, "jobs", MAX_BATCH_JOBS)
+
+
+def ranked_items(documents, outcomes):
+    """合併輸入項目與分析結果，依匹配度由高到低排序，失敗的項目排在最後"""
+    items = []
+    for document, (result, analysis_error) in zip(documents, outcomes):
+        item = {"id": document["id"], "title": document["title"]}
+        if analysis_error is None:
+            item["match_score"] = result.match_score
+            item["result"] = result.to_dict()
+        else:
+            item["error"] = str(analysis_error)
+        items.append(item)
+    items.sort(key=lambda item: item.get("match_score", -1), reverse=True)
+    return items
+
+
+def error_response(error):
+    if isinstance(error, AnalysisBusyError):
+        return JSONResponse({"error": str(error)}, status_code=429, headers={"Retry-After": "10"})
+    return JSONResponse(
+        {"error": str(error), "details": [{"label": label, "text": text} for label, text in error.details]},
+        status_code=502,
+    )
+
+
+async def read_payload(request):
+    if API_TOKEN:
+        supplied = request.headers.get("authorization", "").removeprefix("Bearer ").strip()
+        if not hmac.compare_digest(supplied, API_TOKEN):
+            return None, JSONResponse({"error": "unauthorized"}, status_code=401)
+    try:
+        payload = await request.json()
+    except ValueError:
+        return None, JSONResponse({"error": "request body must be JSON"}, status_code=400)
+    if not isinstance(payload, dict):
+        return None, JSONResponse({"error": "request body must be a JSON object"}, status_code=400)
+    return payload, None
+
+
+async def analyze(request):
+    payload, error = await read_payload(request)
+    if error:
+        return error
+    try:
+        resume_text = require_text(payload, "resume")
+        job_description = require_text(payload, "job_description")
+        language = parse_language(payload.get("language"), resume_text)
+    except BadRequest as e:
+        return JSONResponse({"error": str(e)}, status_code=400)
+
+    try:
+        result = await request.app.state.engine.analyze(resume_text, job_description, language)
+    except AnalysisError as e:
+        return error_response(e)
+    return JSONResponse({"result": result.to_dict()})
+
+
+async def analyze_batch(request):
+    payload, error = await read_payload(request)
+    if error:
+        return error
+    try:
+        resume_text = require_text(payload, "resume")
+        jobs = parse_jobs(payload)
+        language = parse_language(payload.get("language"), resume_text)
+    except BadRequest as e:
+        return JSONResponse({"error": str(e)}, status_code=400)
+
+    outcomes = await request.app.state.engine.analyze_batch(resume_text, [job["text"] for job in jobs], language)
+    return JSONResponse({"results": ranked_items(jobs, outcomes)})
+
+
+async def analyze_screen(request):
+    payload, error = await read_payload(request)
+    if error:
+        return error
+    try:
+        job_description = require_text(payload, "job_description")
+        resumes = parse_documents(payload, "resumes", MAX_SCREEN_RESUMES)
+        language = parse_language(payload.get("language"), job_description)
+    except BadRequest as e:
+        return JSONResponse({"error": str(e)}, status_code=400)
+
+    try:
+        profile, outcomes = await request.app.state.engine.screen(job_description, [resume["text"] for resume in resumes], language)
+    except AnalysisError as e:
+        return error_response(e)
+    return JSONResponse({"job_profile": profile.to_dict(), "results": ranked_items(resumes, outcomes)})
+
+
+async def healthz(request):
+    return JSONResponse({"status": "ok", "healthy": request.app.state.engine.pool.healthy})
+
+
+async def metrics(request):
+    return Response(get_registry().render_prometheus(), headers={"Content-Type": PROMETHEUS_CONTENT_TYPE})
+
+
+@asynccontextmanager
+async def lifespan(app):
+    app.state.engine = await MatchingEngine().start()
+    yield
+
+
+def create_app():
+    return Starlette(
+        routes=[
+            Route("/analyze", analyze, methods=["POST"]),
+            Route("/analyze/batch", analyze_batch, methods=["POST"]),
+            Route("/analyze/screen", analyze_screen, methods=["POST"]),
+            Route("/healthz", healthz, methods=["GET"]),
+            Route("/metrics", metrics, methods=["GET"]),
+        ],
+        lifespan=lifespan,
+    )
+
+
+app = create_app()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="JobMatch.AI HTTP API")
+    parser.add_argument("--host", default=os.getenv("API_SERVER_HOST", "127.0.0.1"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("API_SERVER_PORT", "8080")))
+    parser.add_argument("--workers", type=int, default=int(os.getenv("API_SERVER_WORKERS", "1")))
+    args = parser.parse_args()
+    uvicorn.run("api_server:app", host=args.host, port=args.port, workers=args.workers)
+
+
+if __name__ == "__main__":
+    main()
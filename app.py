@@ -1,13 +1,36 @@
 import streamlit as st
-import json
-import google.generativeai as genai
 import os
-import hashlib
 from dotenv import load_dotenv
+
+@st.cache_resource(show_spinner=False)
+def load_environment():
+    """每個行程只載入一次 .env；必須在讀取環境變數設定的本地模組之前執行"""
+    load_dotenv()
+
+load_environment()
+
 import time
+import re
+import logging
+import queue
+from analysis_cache import AnalysisCache
+from gemini_client import GeminiClientError, get_client_pool
+from async_runner import AsyncRunner, wait_for_futures
+from document_extraction import SUPPORTED_EXTENSIONS, DocumentExtractionError, DocumentExtractor
+from single_flight import SingleFlight
+from result_renderer import render_advice_category, render_result_cached
+from metrics import get_registry, start_metrics_server, timed_stage
+from matching_engine import MAX_ASYNC_ANALYSES, MODEL_NAME, AnalysisError, make_input_hash, run_advice, run_analysis
+from prompts import ADVICE_KEYS
+from ui_assets import APP_STYLE_HTML, get_ui_texts
 
-# 載入環境變數
-load_dotenv()
+logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO"), format="%(asctime)s %(levelname)s %(name)s %(message)s")
+logger = logging.getLogger(__name__)
+
+# 職缺庫索引資料夾（由 python job_corpus.py build 建立），未設定時不顯示職缺庫模式
+JOB_CORPUS_INDEX = os.getenv("JOB_CORPUS_INDEX", "")
+# 職缺庫模式一次最多送進 AI 分析的職缺數
+CORPUS_MAX_TOP_K = 20
 
 # 頁面配置
 st.set_page_config(
@@ -17,314 +40,119 @@ st.set_page_config(
     initial_sidebar_state="collapsed"
 )
 
-# 自定義 CSS 樣式 - 簡約風格
-st.markdown("""
-<style>
-    /* 整體頁面樣式 */
-    .main .block-container {
-        padding-top: 2rem;
-        padding-bottom: 2rem;
-        max-width: 1000px;
-    }
-    
-    /* 主標題 */
-    .main-header {
-        font-size: 2.5rem;
-        font-weight: 300;
-        text-align: center;
-        color: #1a1a1a;
-        margin-bottom: 2rem;
-        margin-top: 1rem;
-        /* letter-spacing: -0.02em; Safari 兼容性 */
-    }
-    
-    /* 副標題 */
-    .subtitle {
-        text-align: center;
-        color: #666;
-        font-size: 1rem;
-        margin-bottom: 3rem;
-        font-weight: 400;
-        line-height: 1.5;
-    }
-    
-    /* 匹配度分數容器 */
-    .score-container {
-        background: #ffffff;
-        border: 1px solid #e1e5e9;
-        padding: 2rem;
-        border-radius: 8px;
-        text-align: center;
-        color: #1a1a1a;
-        margin: 2rem 0;
-        /* box-shadow: 0 1px 3px rgba(0,0,0,0.1); Safari 兼容性 */
-    }
-    
-    .score-number {
-        font-size: 3rem;
-        font-weight: 200;
-        margin: 0;
-        color: #1a1a1a;
-    }
-    
-    .score-label {
-        font-size: 1rem;
-        margin: 0;
-        color: #666;
-        font-weight: 400;
-    }
-    
-    /* 優先技能標籤 */
-    .priority-item {
-        background: #f8f9fa;
-        color: #495057;
-        padding: 0.4rem 0.8rem;
-        border-radius: 4px;
-        margin: 0.2rem;
-        display: inline-block;
-        font-weight: 400;
-        font-size: 0.9rem;
-        border: 1px solid #e9ecef;
-    }
-    
-    /* 符合的經驗項目 */
-    .matched-item {
-        background: #ffffff;
-        border: 1px solid #d4edda;
-        padding: 1rem;
-        border-radius: 6px;
-        margin: 0.5rem 0;
-        border-left: 3px solid #28a745;
-    }
-    
-    /* 缺少的經驗項目 */
-    .missing-item {
-        background: #ffffff;
-        border: 1px solid #f8d7da;
-        padding: 1rem;
-        border-radius: 6px;
-        margin: 0.5rem 0;
-        border-left: 3px solid #dc3545;
-    }
-    
-    /* AI 建議框 */
-    .advice-box {
-        background: #ffffff;
-        border: 1px solid #e1e5e9;
-        color: #1a1a1a;
-        padding: 1.5rem;
-        border-radius: 6px;
-        font-size: 1rem;
-        line-height: 1.6;
-        margin: 1rem 0;
-    }
-    
-    .advice-box ul {
-        padding-left: 1.5rem;
-        margin: 0.5rem 0;
-    }
-    
-    .advice-box li {
-        margin: 0.5rem 0;
-        line-height: 1.6;
-    }
-    
-    .advice-box strong {
-        font-weight: 600;
-    }
-    
-    /* 語言選擇器樣式 */
-    .stSelectbox > div > div {
-        width: 120px !important;
-    }
-    
-    .stSelectbox > div > div > select {
-        font-size: 0.9rem !important;
-        padding: 0.3rem 0.5rem !important;
-        height: 2rem !important;
-    }
-    
-    /* 輸入框樣式 */
-    .stTextArea > div > div > textarea {
-        border: 1px solid #e1e5e9;
-        border-radius: 6px;
-        font-size: 0.9rem;
-    }
-    
-    .stTextArea > div > div > textarea:focus {
-        border-color: #007bff;
-        /* box-shadow: 0 0 0 2px rgba(0,123,255,0.25); Safari 兼容性 */
-    }
-    
-    /* 按鈕樣式 */
-    .stButton > button {
-        background-color: #007bff;
-        color: white;
-        border: none;
-        border-radius: 6px;
-        font-weight: 500;
-        transition: background-color 0.2s;
-    }
-    
-    .stButton > button:hover {
-        background-color: #0056b3;
-    }
-    
-    /* 側邊欄樣式 */
-    .css-1d391kg {
-        background-color: #f8f9fa;
-    }
-    
-    /* 標題樣式 */
-    h1, h2, h3 {
-        color: #1a1a1a;
-        font-weight: 500;
-    }
-    
-    /* 移除默認的邊框和陰影 */
-    .stApp {
-        background-color: #ffffff;
-    }
-    
-    /* 簡化表格樣式 */
-    .stDataFrame {
-        border: none;
-    }
-</style>
-""", unsafe_allow_html=True)
-
-def get_ui_texts(language):
-    """根據語言返回界面文字"""
-    texts = {
-        "中文": {
-            "app_title": "JobMatch.AI",
-            "app_subtitle": "看見你的強項，精準補齊差距：30 秒搞懂這份職缺適不適合你",
-            "settings_title": "設置",
-            "language_label": "分析語言",
-            "instructions_title": "使用說明",
-            "instructions": [
-                "在左側貼上你的履歷內容",
-                "在右側貼上職缺描述",
-                "點擊「開始分析」",
-                "查看匹配度結果和建議"
-            ],
-            "privacy_title": "隱私保護",
-            "privacy": [
-                "不保存任何履歷內容",
-                "分析完成後自動清除",
-                "完全免費使用"
-            ],
-            "resume_title": "履歷內容",
-            "resume_placeholder": "請貼上你的履歷內容（支援中英文）",
-            "resume_example": "例如：\n姓名：張小明\n學歷：台灣大學資訊工程系\n工作經驗：\n- 2020-2022 軟體工程師，負責前端開發\n- 具備 React, JavaScript, Python 經驗\n...",
-            "job_title": "職缺描述",
-            "job_placeholder": "請貼上職缺描述（Job Description）",
-            "job_example": "例如：\n職位：前端工程師\n要求：\n- 3年以上 React 開發經驗\n- 熟悉 JavaScript, TypeScript\n- 具備團隊協作能力\n- 有產品思維\n...",
-            "analyze_button": "開始分析",
-            "analyze_another": "分析另一份職缺",
-            "match_score_label": "總體匹配度",
-            "priorities_title": "職缺關鍵經驗/技能",
-            "matched_title": "我符合的經驗",
-            "missing_title": "我缺少的經驗",
-            "advice_title": "AI 建議",
-            "advice_resume_optimization": "履歷優化",
-            "advice_cover_letter": "求職信建議",
-            "advice_skill_gap": "技能差距分析",
-            "advice_interview": "面試準備建議",
-            "advice_portfolio": "作品集建議",
-            "no_matched": "暫無符合的經驗",
-            "all_skills_met": "所有關鍵技能都已具備！",
-            "copy_advice": "複製建議文字",
-            "analyzing": "AI 正在分析中，請稍候...",
-            "analysis_complete": "分析完成！",
-            "analysis_failed": "分析失敗，請檢查 API 設置或稍後再試",
-            "fill_required": "請填寫履歷內容和職缺描述"
-        },
-        "English": {
-            "app_title": "JobMatch.AI",
-            "app_subtitle": "See your strengths, bridge the gaps: 30 seconds to know if this job fits you",
-            "settings_title": "Settings",
-            "language_label": "Analysis Language",
-            "instructions_title": "Instructions",
-            "instructions": [
-                "Paste your resume content on the left",
-                "Paste job description on the right",
-                "Click 'Start Analysis'",
-                "View matching results and recommendations"
-            ],
-            "privacy_title": "Privacy Protection",
-            "privacy": [
-                "No resume content is saved",
-                "Automatically cleared after analysis",
-                "Completely free to use"
-            ],
-            "resume_title": "Resume Content",
-            "resume_placeholder": "Please paste your resume content",
-            "resume_example": "Example:\nName: John Smith\nEducation: Computer Science, MIT\nExperience:\n- 2020-2022 Software Engineer, Frontend Development\n- Proficient in React, JavaScript, Python\n...",
-            "job_title": "Job Description",
-            "job_placeholder": "Please paste job description",
-            "job_example": "Example:\nPosition: Frontend Engineer\nRequirements:\n- 3+ years React development experience\n- Familiar with JavaScript, TypeScript\n- Team collaboration skills\n- Product mindset\n...",
-            "analyze_button": "Start Analysis",
-            "analyze_another": "Analyze Another Job",
-            "match_score_label": "Overall Match Score",
-            "priorities_title": "Job Key Experience/Skills",
-            "matched_title": "My Matching Experience",
-            "missing_title": "Missing Experience",
-            "advice_title": "AI Recommendations",
-            "advice_resume_optimization": "Resume Optimization",
-            "advice_cover_letter": "Cover Letter Suggestions",
-            "advice_skill_gap": "Skill Gap Analysis",
-            "advice_interview": "Interview Preparation",
-            "advice_portfolio": "Portfolio Suggestions",
-            "no_matched": "No matching experience found",
-            "all_skills_met": "All key skills are met!",
-            "copy_advice": "Copy Recommendations",
-            "analyzing": "AI is analyzing, please wait...",
-            "analysis_complete": "Analysis complete!",
-            "analysis_failed": "Analysis failed, please check API settings or try again later",
-            "fill_required": "Please fill in resume content and job description"
-        },
-    }
-    return texts.get(language, texts["中文"])
+# 自定義 CSS 樣式（每個行程只讀取、壓縮一次）
+st.markdown(APP_STYLE_HTML, unsafe_allow_html=True)
 
-def initialize_gemini_client():
-    """初始化 Google Gemini 客戶端"""
-    api_key = os.getenv("GOOGLE_API_KEY")
-    if not api_key:
+
+def check_api_key():
+    """確認已設置 API key（不需要載入 Gemini SDK）"""
+    if not os.getenv("GOOGLE_API_KEY"):
         st.error("⚠️ 請設置 GOOGLE_API_KEY 環境變數")
         st.info("請到 https://makersuite.google.com/app/apikey 申請免費 API key，然後在 .env 文件中設置")
+        return False
+    return True
+
+def initialize_gemini_client():
+    """初始化 Google Gemini 客戶端（等待背景預熱完成，上次預熱失敗時重試）"""
+    if not check_api_key():
         return None
     
     try:
-        genai.configure(api_key=api_key)
-        model = genai.GenerativeModel('gemini-2.0-flash-lite')
-        return model
-    except Exception as e:
+        get_gemini_pool().start_warm_up(retry_failed=True).result()
+        return get_gemini_pool().get_model()
+    except GeminiClientError as e:
         st.error(f"❌ Gemini 客戶端初始化失敗: {str(e)}")
         return None
 
-def detect_language(text):
-    """檢測文本的主要語言"""
-    # 更準確的語言檢測邏輯
-    chinese_chars = len([c for c in text if '\u4e00' <= c <= '\u9fff'])
-    english_chars = len([c for c in text if c.isalpha() and ord(c) < 128])
-    total_chars = chinese_chars + english_chars
+@st.cache_resource
+def get_gemini_pool():
+    """行程共用的 Gemini 客戶端池；SDK 載入與健康檢查由 start_warm_up() 在背景進行"""
+    return get_client_pool(model_name=MODEL_NAME)
+
+@st.cache_resource
+def get_async_runner():
+    """行程共用的背景 event loop，所有 session 的 Gemini 呼叫都在這裡以協程執行"""
+    return AsyncRunner(max_concurrency=MAX_ASYNC_ANALYSES)
+
+@st.cache_resource
+def get_metrics_server():
+    """設定 METRICS_PORT 時，在背景提供 Prometheus 格式的 GET /metrics"""
+    return start_metrics_server()
+
+@st.cache_resource
+def get_analysis_flights():
+    """行程共用的進行中分析表，以緩存鍵合併不同 session 的相同請求；合併次數輸出到 metrics"""
+    flights = SingleFlight("analysis_single_flight")
+    get_registry().register_collector("single_flight", flights.metrics, flight=flights.name)
+    return flights
+
+@st.cache_resource
+def get_shared_cache():
+    """取得行程內共用的磁碟緩存（同一台主機的多個 worker 共享同一個 SQLite 檔案）；命中統計輸出到 metrics"""
+    cache = AnalysisCache()
+    get_registry().register_collector("analysis_cache", cache.metrics)
+    return cache
+
+@st.cache_resource
+def get_document_extractor():
+    """行程共用的履歷檔案解析 process pool，擷取結果以檔案內容哈希暫存在記憶體中"""
+    return DocumentExtractor()
+
+def read_uploaded_resume(uploaded_file, language):
+    """擷取上傳履歷的文字；沒有上傳或讀取失敗時回傳空字串（失敗時顯示錯誤）"""
+    if uploaded_file is None:
+        return ""
+    texts = get_ui_texts(language)
+    try:
+        with st.spinner(texts['resume_extracting']):
+            document = get_document_extractor().extract(uploaded_file.getvalue(), uploaded_file.name)
+    except DocumentExtractionError as e:
+        st.error(texts['resume_upload_failed'].format(error=e))
+        return ""
+    st.caption(texts['resume_extracted'].format(name=uploaded_file.name, chars=len(document.text), pages=document.pages))
+    if document.truncated:
+        st.caption(texts['resume_truncated'])
+    return document.text
+
+def resume_uploader(language, key):
+    """履歷文字框下方的檔案上傳；有上傳檔案時回傳擷取的文字，優先於貼上的內容"""
+    texts = get_ui_texts(language)
+    uploaded_file = st.file_uploader(texts['resume_upload'], type=[ext.lstrip(".") for ext in SUPPORTED_EXTENSIONS], key=key)
+    return read_uploaded_resume(uploaded_file, language)
+
+def cancel_active_analyses():
+    """取消這個 session 尚未完成的背景分析（例如使用者再次按下分析）"""
+    for future in st.session_state.get('active_analyses', []):
+        future.cancel()
+    st.session_state.active_analyses = []
+
+def make_elapsed_ticker(language):
+    """每秒更新一次等待時間；同時讓腳本在輪詢期間有機會被 Streamlit 中斷（重新執行或離開頁面）"""
+    texts = get_ui_texts(language)
+    placeholder = st.empty()
+    started = time.monotonic()
+    last_shown = [0]
     
-    if total_chars == 0:
-        return "English"  # 預設英文
+    def tick():
+        seconds = int(time.monotonic() - started)
+        if seconds != last_shown[0]:
+            last_shown[0] = seconds
+            placeholder.caption(texts['elapsed_label'].format(seconds=seconds))
     
-    chinese_ratio = chinese_chars / total_chars
-    # 提高閾值，只有當中文字符佔比超過 50% 時才認為是中文
-    return "中文" if chinese_ratio > 0.5 else "English"
+    return tick, placeholder.empty
+
+def analyze_resume_job_match(resume_text, job_description, ui_language="中文", on_partial=None, include_advice=True):
+    """使用 Google Gemini API 分析履歷與職缺匹配度；提供 on_partial 時以串流模式逐步回傳部分結果
 
-def analyze_resume_job_match(resume_text, job_description, ui_language="中文"):
-    """使用 Google Gemini API 分析履歷與職缺匹配度"""
+    include_advice=False 時只生成分數與符合/缺少項目，建議由 show_lazy_advice 在展開時逐類生成。
+    """
     
     # 直接使用用戶選擇的 UI 語言作為輸出語言
     output_language = ui_language
     
-    # 創建輸入的哈希值用於緩存（包含輸出語言）
-    input_hash = hashlib.md5(f"{resume_text}_{job_description}_{output_language}".encode()).hexdigest()
+    input_hash = make_input_hash(resume_text, job_description, output_language)
+    if not include_advice:
+        input_hash += ":summary"
     
     # 檢查是否已有緩存結果
     if 'analysis_cache' not in st.session_state:
@@ -337,340 +165,366 @@ def analyze_resume_job_match(resume_text, job_description, ui_language="中文")
     if not model:
         return None
     
-    # 系統提示詞
-    system_prompt = """你是專業職涯顧問。請閱讀【履歷】與【職缺】，並 ONLY 以 JSON 回覆，符合下列 schema：
-
-{{
-  "match_score": 整數0-100,
-  "confidence": 浮點0-1,
-  "match_explanation": "請根據履歷與職缺的比對結果，撰寫一段不超過 3 段的自然語言說明，用來在 UI 呈現匹配度摘要。請使用簡單清楚、人性化的語氣",
-  "priorities": [{{"name":字串,"weight":0-1,"explanation":字串}}],
-  "matched": [{{"item":字串,"evidence":[字串...]}}],
-  "missing": [{{"item":字串,"action":字串}}],
-  "advice": {{
-    "履歷優化": ["具體的履歷改進建議"],
-    "求職信建議": ["可直接複製的段落模板"],
-    "技能差距分析": ["缺少技能和學習方向"],
-    "面試準備建議": ["潛在問題和回答方向"],
-    "作品集建議": ["具體的專案題目和展示建議"]
-  }}
-}}
-
-重要規則：
-- 所有回應文字必須完全使用{language}，不能混合其他語言，不用使用敬語（您）
-- match_explanation：請根據履歷與職缺的比對結果，撰寫一段不超過 3 段的自然語言說明，用來在 UI 呈現匹配度摘要。請使用簡單清楚、人性化的語氣
-- priorities：必須只從職缺內容中挑出重要關鍵技能，不能包含職缺中未提及的技能！每個技能要包含explanation說明為何得分是這樣。
-- matched：標題要是關鍵技能，首字要大寫；內文若有多點，要列點式描述哪裡有符合、排版恰當，不用寫「因此給予怎樣的權重。」
-- missing：不用每個都寫「建議行動：在履歷中補充相關經驗」，文字要寫的有邏輯，有頭有尾；標題要寫的是有邏輯的履歷提到的經歷、技能，要讓人看得懂
-         - advice：必須包含以下五個類別，每個類別提供具體可執行的建議：
-           * 履歷優化：關鍵缺漏技能建議、可加入的具體句子、技能欄排序建議、成就量化建議
-           * 求職信建議：開場句模板、中段敘述連結過往經驗、結尾句模板（使用{language}，自然表達，不用敬語，可以用「你」）
-           * 技能差距分析：缺少技能、學習方向、免費資源/課程建議
-           * 面試準備建議：潛在問題、回答方向、STAR回答框架提示
-           * 作品集建議：小專案題目、展示建議
-- 僅回 JSON，不要其他文字
-
-特別注意：
-1. priorities 中的技能必須是職缺描述中明確提及或要求的技能，不能因為履歷中有相關經驗就加入職缺關鍵技能中！
-2. 經驗年數評估規則：
-   - 只有當職缺有提到此年數要求才需要考慮此規則
-   - 職缺要求 X 年經驗，履歷有 Y 年經驗：
-     * Y >= X：給 90-100%（經驗充足或超過要求）
-     * Y >= X*0.8：給 70-85%（經驗接近要求）
-     * Y >= X*0.6：給 50-70%（經驗不足但可接受）
-     * Y < X*0.6：給 30-50%（經驗嚴重不足）
-   - 必須在 explanation 中明確說明年數差距對分數的影響
-3. 技能匹配評估規則：
-   - 履歷明確提到相關經驗：給 70-90%
-   - 履歷有相關但描述較少：給 50-70%
-   - 履歷沒有明確提到：給 20-40%
-   - 不要過於保守，如果履歷中有相關經驗就應該給合理的高分
-
-一致性要求：
-- 相同的履歷和職缺描述必須產生相同的分數和評估結果
-- 使用結構化的評估標準，避免主觀判斷
-- 優先考慮客觀指標（年數、技能匹配度）而非主觀感受
-- 嚴格遵守語言一致性：所有回應必須完全使用{language}，不能出現任何其他語言""".format(language=output_language)
-
-    user_prompt = f"""
-履歷內容：
-{resume_text}
-
-職缺描述：
-{job_description}
-
-請分析匹配度並提供建議。
-"""
-
-    try:
-        # 創建完整的提示詞
-        full_prompt = f"{system_prompt}\n\n{user_prompt}"
-        
-        # 使用 Gemini 生成回應
-        response = model.generate_content(
-            full_prompt,
-            generation_config=genai.types.GenerationConfig(
-                temperature=0.1,  # 降低溫度以提高一致性
-                max_output_tokens=4000,  # 增加 token 限制以避免截斷
-                top_p=0.8,  # 限制詞彙選擇範圍
-                top_k=20,   # 限制候選詞數量
-            )
-        )
-        
-        response_text = response.text
-        
-        # 嘗試解析 JSON
-        try:
-            # 檢查回應是否為空
-            if not response_text or response_text.strip() == "":
-                st.error("❌ AI 回應為空，請檢查 API 設置")
-                return None
-            
-            # 清理回應文本，提取 JSON 部分
-            json_text = ""
-            if "```json" in response_text:
-                json_start = response_text.find("```json") + 7
-                json_end = response_text.find("```", json_start)
-                if json_end > json_start:
-                    json_text = response_text[json_start:json_end].strip()
-            elif "{" in response_text and "}" in response_text:
-                json_start = response_text.find("{")
-                json_end = response_text.rfind("}") + 1
-                json_text = response_text[json_start:json_end]
-            else:
-                json_text = response_text.strip()
-            
-            # 清理無效的控制字符
-            import re
-            # 移除或替換無效的控制字符（除了 \n, \r, \t）
-            json_text = re.sub(r'[\x00-\x08\x0B\x0C\x0E-\x1F\x7F]', '', json_text)
-            # 確保引號正確配對
-            json_text = json_text.replace('"', '"').replace('"', '"')
-            json_text = json_text.replace(''', "'").replace(''', "'")
-            
-            # 檢查提取的 JSON 是否為空
-            if not json_text:
-                st.error("❌ 無法從 AI 回應中提取 JSON 內容")
-                st.text("原始回應:")
-                st.text(response_text)
-                return None
-            
-            # 檢查 JSON 是否被截斷
-            if json_text.count("{") != json_text.count("}"):
-                st.warning("⚠️ JSON 回應可能被截斷，嘗試修復...")
-                # 嘗試修復截斷的 JSON
-                if json_text.count("{") > json_text.count("}"):
-                    # 缺少右括號，嘗試補全
-                    missing_braces = json_text.count("{") - json_text.count("}")
-                    # 簡單補全：添加缺失的右括號
-                    json_text += "}" * missing_braces
-                    # 如果最後一個字符不是 }，添加一個
-                    if not json_text.endswith("}"):
-                        json_text += "}"
+    # 分析在背景 event loop 執行，部分結果與警告經由佇列交回腳本執行緒顯示
+    cancel_active_analyses()
+    updates = queue.Queue()
+    future = get_async_runner().submit(run_analysis(
+        model, get_shared_cache(), resume_text, job_description, output_language,
+        warn=lambda message: updates.put(("warn", message)),
+        on_partial=(lambda partial: updates.put(("partial", partial))) if on_partial else None,
+        flights=get_analysis_flights(),
+        on_queue=lambda status: updates.put(("queue", status)),
+        include_advice=include_advice,
+    ))
+    st.session_state.active_analyses = [future]
+    
+    queue_placeholder = st.empty()
+    texts = get_ui_texts(output_language)
+    
+    def drain_updates():
+        latest_partial = None
+        while not updates.empty():
+            kind, value = updates.get_nowait()
+            if kind == "warn":
+                st.warning(value)
+            elif kind == "queue":
+                if value is None:
+                    queue_placeholder.empty()
                 else:
-                    # 多餘的右括號，移除
-                    extra_braces = json_text.count("}") - json_text.count("{")
-                    for _ in range(extra_braces):
-                        json_text = json_text.rsplit("}", 1)[0]
-            
-            # 如果 JSON 仍然不完整，嘗試添加基本的結束結構
-            if not json_text.strip().endswith("}"):
-                # 檢查是否缺少基本的結束結構
-                if '"advice"' in json_text and not json_text.strip().endswith("}"):
-                    # 嘗試添加基本的結束結構
-                    json_text = json_text.rstrip() + '}}'
-                elif '"missing"' in json_text and not json_text.strip().endswith("}"):
-                    json_text = json_text.rstrip() + '}'
-                elif '"matched"' in json_text and not json_text.strip().endswith("}"):
-                    json_text = json_text.rstrip() + '}'
-                elif '"priorities"' in json_text and not json_text.strip().endswith("}"):
-                    # 如果截斷在 priorities 部分，嘗試補全
-                    if json_text.count("[") > json_text.count("]"):
-                        json_text = json_text.rstrip() + ']'
-                    json_text = json_text.rstrip() + '}'
-            
-            result = json.loads(json_text)
-            # 將輸出語言添加到結果中
-            result['output_language'] = output_language
-            # 將結果存入緩存
-            st.session_state.analysis_cache[input_hash] = result
-            return result
-            
-        except json.JSONDecodeError as e:
-            st.error(f"❌ JSON 解析失敗: {str(e)}")
-            st.text("提取的 JSON 文本:")
-            st.text(json_text)
-            st.text("原始回應:")
-            st.text(response_text)
-            return None
-            
-    except Exception as e:
-        st.error(f"❌ API 調用失敗: {str(e)}")
+                    position, eta = value
+                    queue_placeholder.info(texts['queue_label'].format(position=position, eta=max(1, round(eta))))
+            else:
+                latest_partial = value
+        if latest_partial is not None:
+            on_partial(latest_partial)
+    
+    tick, clear_ticker = make_elapsed_ticker(output_language)
+    
+    def on_tick():
+        tick()
+        drain_updates()
+    
+    wait_for_futures([future], on_tick=on_tick)
+    clear_ticker()
+    drain_updates()
+    queue_placeholder.empty()
+    
+    if future.cancelled():
         return None
+    try:
+        result = future.result()
+    except AnalysisError as e:
+        st.error(str(e))
+        for label, text in e.details:
+            st.text(label)
+            st.text(text)
+        return None
+    
+    # 將結果存入緩存
+    st.session_state.analysis_cache[input_hash] = result
+    return result
 
-def display_results(result, language="中文"):
-    """顯示分析結果"""
-    if not result:
-        return
+def generate_advice(resume_text, job_description, result, category, language):
+    """在背景 event loop 生成單一建議類別，回傳 AdviceCategory；同一 session 內重複展開直接取用"""
+    if 'advice_cache' not in st.session_state:
+        st.session_state.advice_cache = {}
+    cache_key = (make_input_hash(resume_text, job_description, language), category)
+    if cache_key in st.session_state.advice_cache:
+        return st.session_state.advice_cache[cache_key]
+    
+    model = initialize_gemini_client()
+    if not model:
+        return None
     
-    # 根據語言設置文字
+    future = get_async_runner().submit(run_advice(
+        model, get_shared_cache(), resume_text, job_description, language, result, category,
+        flights=get_analysis_flights(),
+    ))
+    tick, clear_ticker = make_elapsed_ticker(language)
+    wait_for_futures([future], on_tick=tick)
+    clear_ticker()
+    
+    if future.cancelled():
+        return None
+    try:
+        advice = future.result()
+    except AnalysisError as e:
+        st.error(str(e))
+        return None
+    st.session_state.advice_cache[cache_key] = advice
+    return advice
+
+def lazy_expander(label, key):
+    """追蹤展開狀態的 expander（.open 為 True/False）；較舊的 Streamlit 不支援時回傳一般的 expander，由呼叫端改用按鈕"""
+    try:
+        return st.expander(label, key=key, on_change="rerun")
+    except TypeError:
+        return st.expander(label)
+
+@st.fragment
+def show_lazy_advice(resume_text, job_description, result, language):
+    """兩階段分析的第二階段：每個建議類別在展開時才生成；展開只會重新執行這個 fragment，上方結果不受影響"""
     texts = get_ui_texts(language)
+    input_hash = make_input_hash(resume_text, job_description, language)
+    advice_cache = st.session_state.get('advice_cache', {})
+    st.markdown(f"### {texts['advice_title']}")
+    for category in ADVICE_KEYS:
+        expander = lazy_expander(texts[f"advice_{category}"], key=f"advice_{input_hash}_{category}")
+        # 不支援展開狀態的版本回傳一般的 DeltaGenerator，.open 會被當成元素方法（永遠為真），只接受 True
+        open_state = getattr(expander, "open", None)
+        with expander:
+            requested = (input_hash, category) in advice_cache or open_state is True
+            if not requested and not isinstance(open_state, bool):
+                requested = st.button(texts['advice_generate'], key=f"advice_button_{input_hash}_{category}")
+            if not requested:
+                continue
+            advice = generate_advice(resume_text, job_description, result, category, language)
+            if advice is None:
+                continue
+            if advice.items:
+                st.markdown(render_advice_category(advice), unsafe_allow_html=True)
+            else:
+                st.info(texts['advice_empty'])
+
+def split_job_descriptions(pasted_text, uploaded_files=None):
+    """將貼上的多份職缺（以 --- 分隔）與上傳的文字檔整理成 (標題, 內容) 清單"""
+    jobs = []
+    for block in re.split(r'^\s*-{3,}\s*$', pasted_text or "", flags=re.MULTILINE):
+        block = block.strip()
+        if block:
+            jobs.append((block.splitlines()[0].strip()[:40], block))
+    for uploaded_file in uploaded_files or []:
+        content = uploaded_file.getvalue().decode("utf-8", errors="ignore").strip()
+        if content:
+            jobs.append((uploaded_file.name, content))
+    return jobs
+
+def analyze_many(resume_text, jobs, ui_language="中文", on_result=None):
+    """在背景 event loop 以有上限的並行度分析同一份履歷對多份職缺，每完成一份就在主執行緒呼叫 on_result(index, result, error)"""
+    if 'analysis_cache' not in st.session_state:
+        st.session_state.analysis_cache = {}
+    session_cache = st.session_state.analysis_cache
+    
+    results = [None] * len(jobs)
+    errors = [None] * len(jobs)
+    
+    def finish(index, result, error):
+        results[index] = result
+        errors[index] = error
+        if on_result:
+            on_result(index, result, error)
+    
+    # 先處理 session 內已有緩存的職缺
+    pending = []
+    for index, (_, job_description) in enumerate(jobs):
+        input_hash = make_input_hash(resume_text, job_description, ui_language)
+        if input_hash in session_cache:
+            finish(index, session_cache[input_hash], None)
+        else:
+            pending.append((index, input_hash, job_description))
+    
+    if not pending:
+        return results, errors
     
-    # 匹配度分數
-    match_score = result.get('match_score', 0)
-    match_explanation = result.get('match_explanation', '')
+    model = initialize_gemini_client()
+    if not model:
+        for index, _, _ in pending:
+            finish(index, None, "❌ Gemini 客戶端初始化失敗")
+        return results, errors
+    
+    # 背景 event loop 只執行不依賴 Streamlit 的 run_analysis，UI 更新留在主執行緒
+    cancel_active_analyses()
+    runner = get_async_runner()
+    shared_cache = get_shared_cache()
+    flights = get_analysis_flights()
+    futures = {
+        runner.submit(run_analysis(model, shared_cache, resume_text, job_description, ui_language, flights=flights)): (index, input_hash)
+        for index, input_hash, job_description in pending
+    }
+    st.session_state.active_analyses = list(futures)
     
-    # 根據語言調整字體大小
-    font_size = "0.9rem" if language == "English" else "0.85rem"
+    def on_done(future):
+        index, input_hash = futures[future]
+        if future.cancelled():
+            return
+        try:
+            result = future.result()
+        except AnalysisError as e:
+            finish(index, None, str(e))
+            return
+        session_cache[input_hash] = result
+        finish(index, result, None)
     
-    st.markdown(f"""
-    <div class="score-container">
-        <h1 class="score-number">{match_score}%</h1>
-        <p class="score-label">{texts['match_score_label']}</p>
-        <p style="font-size: {font_size}; margin-top: 0.5rem; opacity: 0.8;">{match_explanation}</p>
-    </div>
-    """, unsafe_allow_html=True)
+    tick, clear_ticker = make_elapsed_ticker(ui_language)
+    wait_for_futures(futures, on_done=on_done, on_tick=tick)
+    clear_ticker()
     
-    # 職缺關鍵技能
-    if 'priorities' in result and result['priorities']:
-        st.markdown(f"### {texts['priorities_title']}")
-        
-        # 顯示技能分數解釋
-        if 'score_explanation' in result and result['score_explanation']:
-            explanation_font_size = "1.0rem" if language == "English" else "0.9rem"
-            st.markdown(f"<p style='font-size: {explanation_font_size}; color: #666; margin-bottom: 1rem;'>{result['score_explanation']}</p>", unsafe_allow_html=True)
-        
-        # 顯示技能和權重
-        for i, priority in enumerate(result['priorities'], 1):
-            if isinstance(priority, dict):
-                name = priority.get('name', '')
-                weight = priority.get('weight', 0)
-                explanation = priority.get('explanation', '')
-                weight_percent = int(weight * 100)
-                color = "#28a745" if weight >= 0.7 else "#ffc107" if weight >= 0.5 else "#dc3545"
-                
-                st.markdown(f"""
-                <div style="background: #f8f9fa; padding: 0.8rem; margin: 0.3rem 0; border-radius: 6px; 
-                           border-left: 3px solid {color};">
-                    <div style="margin-bottom: 0.3rem;">
-                        <span style="font-weight: 500;">{i}. {name}</span>
-                        <span style="font-weight: bold; color: {color}; float: right;">{weight_percent}%</span>
-                        <div style="clear: both;"></div>
-                    </div>
-                    <small style="color: #666; font-size: {'0.9rem' if language == 'English' else '0.8rem'};">{explanation}</small>
-                </div>
-                """, unsafe_allow_html=True)
-            else:
-                # 兼容舊格式
-                st.markdown(f"<div class='priority-item'>{i}. {priority}</div>", unsafe_allow_html=True)
+    return results, errors
+
+def build_ranking_rows(jobs, results, errors, texts):
+    """依 match_score 由高到低排序，產生排名表格資料"""
+    finished = [i for i in range(len(jobs)) if results[i] is not None or errors[i] is not None]
+    finished.sort(key=lambda i: results[i].match_score if results[i] else -1, reverse=True)
+    rows = []
+    for rank, index in enumerate(finished, 1):
+        result = results[index]
+        rows.append({
+            texts['rank_column']: rank,
+            texts['job_column']: jobs[index][0],
+            texts['score_column']: result.match_score if result else None,
+            texts['status_column']: texts['status_done'] if result else texts['status_failed'],
+        })
+    return rows, finished
+
+def run_multi_job_mode(language):
+    """多職缺模式：一份履歷同時比對多份職缺，並依匹配度排名"""
+    texts = get_ui_texts(language)
     
-    # 雙欄結果
     col1, col2 = st.columns(2)
     
     with col1:
-        st.markdown(f"### {texts['matched_title']}")
-        if 'matched' in result and result['matched']:
-            for item in result['matched']:
-                # 處理新格式（有item和evidence）或舊格式
-                if isinstance(item, dict) and 'item' in item and 'evidence' in item:
-                    evidence_list = item['evidence']
-                    evidence_html = "<ul style='margin: 0.3rem 0; padding-left: 1.2rem;'>"
-                    for evidence in evidence_list:
-                        evidence_html += f"<li style='margin: 0.2rem 0;'>{evidence}</li>"
-                    evidence_html += "</ul>"
-                    st.markdown(f'''
-                    <div class="matched-item">
-                        <strong>{item["item"]}</strong>
-                        {evidence_html}
-                    </div>
-                    ''', unsafe_allow_html=True)
-                elif isinstance(item, dict) and 'title' in item and 'description' in item:
-                    st.markdown(f'<div class="matched-item"><strong>{item["title"]}</strong><br>{item["description"]}</div>', unsafe_allow_html=True)
-                else:
-                    st.markdown(f'<div class="matched-item">{item}</div>', unsafe_allow_html=True)
-        else:
-            st.info(texts['no_matched'])
+        st.markdown(f"### {texts['resume_title']}")
+        resume_text = st.text_area(
+            texts['resume_placeholder'],
+            height=300,
+            placeholder=texts['resume_example'],
+            key="multi_resume_text"
+        )
+        resume_text = resume_uploader(language, "multi_resume_file") or resume_text
     
     with col2:
-        st.markdown(f"### {texts['missing_title']}")
-        if 'missing' in result and result['missing']:
-            for item in result['missing']:
-                # 處理新格式（有item和action）或舊格式
-                if isinstance(item, dict) and 'item' in item and 'action' in item:
-                    st.markdown(f'''
-                    <div class="missing-item">
-                        <strong>{item["item"]}</strong><br>
-                        <span style="color: #666;">{item["action"]}</span>
-                    </div>
-                    ''', unsafe_allow_html=True)
-                elif isinstance(item, dict) and 'title' in item and 'description' in item:
-                    st.markdown(f'<div class="missing-item"><strong>{item["title"]}</strong><br>{item["description"]}</div>', unsafe_allow_html=True)
-                else:
-                    st.markdown(f'<div class="missing-item">{item}</div>', unsafe_allow_html=True)
-        else:
-            st.success(texts['all_skills_met'])
+        st.markdown(f"### {texts['jobs_title']}")
+        jobs_text = st.text_area(
+            texts['jobs_placeholder'],
+            height=300,
+            placeholder=texts['jobs_example'],
+            key="multi_jobs_text"
+        )
+        uploaded_files = st.file_uploader(texts['jobs_upload'], type=["txt", "md"], accept_multiple_files=True)
     
-    # AI 建議
-    if 'advice' in result and result['advice']:
-        st.markdown(f"<div style='font-size: 1.5rem; font-weight: 600; margin: 1.5rem 0 1rem 0; color: #1a1a1a;'>{texts['advice_title']}</div>", unsafe_allow_html=True)
-        
-        advice_content = result['advice']
-        
-        # 處理新格式（帶標題的物件）或舊格式
-        if isinstance(advice_content, dict):
-            advice_html = ""
-            
-            # 定義每個類別的顏色和翻譯映射
-            advice_config = {
-                "履歷優化": {"color": "#dc3545", "key": "advice_resume_optimization"},
-                "求職信建議": {"color": "#007bff", "key": "advice_cover_letter"},
-                "技能差距分析": {"color": "#28a745", "key": "advice_skill_gap"},
-                "面試準備建議": {"color": "#6f42c1", "key": "advice_interview"},
-                "作品集建議": {"color": "#fd7e14", "key": "advice_portfolio"},
-                "Resume Optimization": {"color": "#dc3545", "key": "advice_resume_optimization"},
-                "Cover Letter Suggestions": {"color": "#007bff", "key": "advice_cover_letter"},
-                "Skill Gap Analysis": {"color": "#28a745", "key": "advice_skill_gap"},
-                "Interview Preparation": {"color": "#6f42c1", "key": "advice_interview"},
-                "Portfolio Suggestions": {"color": "#fd7e14", "key": "advice_portfolio"}
-            }
-            
-            for title, items in advice_content.items():
-                if items and len(items) > 0:
-                    config = advice_config.get(title, {"color": "#666"})
-                    color = config["color"]
-                    
-                    # 使用翻譯後的標題，如果沒有找到則使用原始標題
-                    display_title = texts.get(config.get("key", ""), title)
-                    
-                    advice_html += f"<div style='color: {color}; margin-top: 0.8rem; margin-bottom: 0.5rem; font-size: 1.5rem; font-weight: 600;'>{display_title}</div>"
-                    
-                    # 處理每個建議項目，統一使用標題 → bullet points 結構
-                    for item in items:
-                        import re
-                        clean_item = re.sub(r'\*\*(.*?)\*\*', r'<strong>\1</strong>', str(item))
-                        clean_item = clean_item.replace("*", "").strip()
-                        
-                        # 檢查是否為子標題（包含冒號且長度較短）
-                        if ":" in clean_item and len(clean_item) < 100:
-                            # 這是子標題，使用較大的字體和粗體
-                            advice_html += f"<div style='font-weight: 600; margin: 0.8rem 0 0.3rem 0; color: #333; font-size: 1.1rem;'>{clean_item}</div>"
-                        else:
-                            # 所有其他項目都使用 bullet points (Safari 兼容)
-                            advice_html += f"<div style='margin: 0.3rem 0; padding-left: 1.5rem; line-height: 1.6;'><span style='color: {color}; font-weight: bold; margin-right: 0.5rem;'>•</span>{clean_item}</div>"
-        elif isinstance(advice_content, str):
-            # 字符串格式：直接顯示
-            advice_html = advice_content
-        elif isinstance(advice_content, list):
-            advice_html = "<ul>"
-            for item in advice_content:
-                advice_html += f"<li>{item}</li>"
-            advice_html += "</ul>"
+    st.markdown("<br>", unsafe_allow_html=True)
+    col_btn1, col_btn2, col_btn3 = st.columns([1, 2, 1])
+    with col_btn2:
+        analyze_button = st.button(texts['analyze_button'], type="primary", use_container_width=True, key="multi_analyze")
+    
+    if not analyze_button:
+        return
+    
+    jobs = split_job_descriptions(jobs_text, uploaded_files)
+    if not resume_text.strip() or not jobs:
+        st.error(texts['fill_required'])
+        return
+    
+    show_ranked_analyses(resume_text, jobs, language)
+
+def show_ranked_analyses(resume_text, jobs, language):
+    """分析多份職缺並顯示排名表與各職缺的詳細結果；每完成一份就更新排名表與詳細結果"""
+    texts = get_ui_texts(language)
+    
+    # 每完成一份就更新進度與排名表
+    st.markdown(f"### {texts['ranking_title']}")
+    progress = st.progress(0.0)
+    table_placeholder = st.empty()
+    # 詳細結果依名次佔位：第 k 個位置顯示目前排名第 k 的職缺，名次改變的位置才重新渲染
+    detail_placeholders = [st.empty() for _ in jobs]
+    shown = [None] * len(jobs)
+    partial_results = [None] * len(jobs)
+    partial_errors = [None] * len(jobs)
+    done_count = [0]
+    
+    def on_result(index, result, error):
+        partial_results[index] = result
+        partial_errors[index] = error
+        done_count[0] += 1
+        progress.progress(done_count[0] / len(jobs), text=texts['multi_progress'].format(done=done_count[0], total=len(jobs)))
+        rows, ranked_indices = build_ranking_rows(jobs, partial_results, partial_errors, texts)
+        table_placeholder.dataframe(rows, use_container_width=True, hide_index=True)
+        for rank, job_index in enumerate(ranked_indices, 1):
+            if shown[rank - 1] != job_index:
+                shown[rank - 1] = job_index
+                show_job_result(detail_placeholders[rank - 1], rank, jobs[job_index][0], partial_results[job_index], partial_errors[job_index], language)
+    
+    analyze_many(resume_text, jobs, language, on_result=on_result)
+
+def show_job_result(placeholder, rank, title, result, error, language):
+    """在 placeholder 中以 display_results 呈現單一職缺的詳細結果"""
+    texts = get_ui_texts(language)
+    with placeholder.container():
+        if result:
+            with st.expander(f"{rank}. {title} — {result.match_score}%"):
+                display_results(result, result.output_language or language)
         else:
-            advice_html = str(advice_content)
-        
-        st.markdown(f'<div class="advice-box">{advice_html}</div>', unsafe_allow_html=True)
+            with st.expander(f"{rank}. {title} — {texts['status_failed']}"):
+                st.error(error)
+
+@st.cache_resource
+def get_job_corpus():
+    """載入 JOB_CORPUS_INDEX 指定的職缺庫索引（memory-map，整個程序共用一份）"""
+    from job_corpus import JobCorpusIndex
+    return JobCorpusIndex.load(JOB_CORPUS_INDEX)
+
+def run_corpus_mode(language):
+    """職缺庫模式：先以本地索引找出最相關的 K 份職缺，只有這 K 份送進 AI 分析"""
+    texts = get_ui_texts(language)
+    try:
+        corpus = get_job_corpus()
+    except (OSError, ValueError) as e:
+        st.error(texts['corpus_load_failed'].format(error=e))
+        return
+    
+    st.markdown(f"### {texts['resume_title']}")
+    resume_text = st.text_area(
+        texts['resume_placeholder'],
+        height=300,
+        placeholder=texts['resume_example'],
+        key="corpus_resume_text"
+    )
+    resume_text = resume_uploader(language, "corpus_resume_file") or resume_text
+    top_k = st.slider(texts['corpus_top_k'].format(total=len(corpus)), min_value=1, max_value=min(CORPUS_MAX_TOP_K, max(len(corpus), 1)), value=min(5, max(len(corpus), 1)))
+    
+    st.markdown("<br>", unsafe_allow_html=True)
+    col_btn1, col_btn2, col_btn3 = st.columns([1, 2, 1])
+    with col_btn2:
+        analyze_button = st.button(texts['analyze_button'], type="primary", use_container_width=True, key="corpus_analyze")
+    
+    if not analyze_button:
+        return
+    
+    if not resume_text.strip():
+        st.error(texts['fill_required'])
+        return
+    
+    candidates = corpus.search(resume_text, k=top_k)
+    if not candidates:
+        st.warning(texts['corpus_no_match'])
+        return
+    
+    st.caption(texts['corpus_retrieved'].format(count=len(candidates), total=len(corpus)))
+    jobs = [(job['title'], job['text']) for job in candidates]
+    show_ranked_analyses(resume_text, jobs, language)
+
+def display_results(result, language="中文", partial=False):
+    """顯示分析結果；partial=True 時為串流中的部分結果，尚未生成的區塊不顯示"""
+    if not result:
+        return
+    if partial and result.match_score is None:
+        return
+    
+    # 整份結果以單一 HTML 片段送出，相同的結果直接重用已產生的 HTML
+    if partial:
+        st.markdown(render_result_cached(result, get_ui_texts(language), language, partial), unsafe_allow_html=True)
+        return
+    with timed_stage("render", language=language):
+        st.markdown(render_result_cached(result, get_ui_texts(language), language), unsafe_allow_html=True)
 
 def main():
+    # 啟動時只檢查 API key 是否設置；健康檢查在首次渲染後於背景進行，失敗時下一次互動就會提示
+    if not check_api_key():
+        st.stop()
+    warm_up_error = get_gemini_pool().warm_up_error
+    if warm_up_error is not None:
+        st.error(f"❌ Gemini 客戶端初始化失敗: {warm_up_error}")
+    
     # 語言選擇（放在頁面左上角）
     col1, col2 = st.columns([1, 4])
     with col1:
@@ -685,6 +539,18 @@ def main():
     st.markdown(f'<h1 class="main-header">{texts["app_title"]}</h1>', unsafe_allow_html=True)
     st.markdown(f'<p class="subtitle">{texts["app_subtitle"]}</p>', unsafe_allow_html=True)
     
+    # 分析模式
+    modes = [texts['mode_single'], texts['mode_multi']]
+    if JOB_CORPUS_INDEX:
+        modes.append(texts['mode_corpus'])
+    mode = st.radio(texts['mode_label'], modes, horizontal=True)
+    if mode == texts['mode_multi']:
+        run_multi_job_mode(language)
+        return
+    if mode == texts['mode_corpus']:
+        run_corpus_mode(language)
+        return
+    
     # 主要輸入區域
     col1, col2 = st.columns(2)
     
@@ -695,6 +561,7 @@ def main():
             height=300,
             placeholder=texts['resume_example']
         )
+        resume_text = resume_uploader(language, "resume_file") or resume_text
     
     with col2:
         st.markdown(f"### {texts['job_title']}")
@@ -714,6 +581,8 @@ def main():
             type="primary",
             use_container_width=True
         )
+        stream_results = st.checkbox(texts['stream_label'], value=True)
+        lazy_advice = st.checkbox(texts['lazy_advice_label'], value=True)
     
     # 執行分析
     if analyze_button:
@@ -721,15 +590,35 @@ def main():
             st.error(texts['fill_required'])
             return
         
+        # 先顯示本地預估分數，LLM 完成後再以完整結果取代
+        estimate_placeholder = st.empty()
+        from prescore import estimate_match
+        estimate = estimate_match(resume_text, job_description)
+        estimate_placeholder.info(texts['prescore_label'].format(score=estimate['score']))
+        
+        # 串流模式下，結果區塊在同一個位置逐步更新
+        results_placeholder = st.empty()
+        on_partial = None
+        if stream_results:
+            def on_partial(partial_result):
+                with results_placeholder.container():
+                    display_results(partial_result, language, partial=True)
+        
         with st.spinner(texts['analyzing']):
-            result = analyze_resume_job_match(resume_text, job_description, language)
+            result = analyze_resume_job_match(
+                resume_text, job_description, language, on_partial=on_partial, include_advice=not lazy_advice
+            )
+        estimate_placeholder.empty()
         
         if result:
             # 使用用戶選擇的語言來顯示結果和 UI
-            display_language = result.get('output_language', language)
+            display_language = result.output_language or language
             display_texts = get_ui_texts(display_language)
-            st.success(display_texts['analysis_complete'])
-            display_results(result, display_language)
+            with results_placeholder.container():
+                st.success(display_texts['analysis_complete'])
+                display_results(result, display_language)
+            if lazy_advice and not result.advice and not result.prescreened:
+                show_lazy_advice(resume_text, job_description, result, display_language)
             
             # 重新分析按鈕
             st.markdown("<br>", unsafe_allow_html=True)
@@ -742,4 +631,7 @@ def main():
 
 if __name__ == "__main__":
     main()
+    # 首次渲染完成後才在背景載入 Gemini SDK 並執行健康檢查
+    get_gemini_pool().start_warm_up()
+    get_metrics_server()
     
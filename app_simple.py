@@ -1,13 +1,17 @@
 import streamlit as st
 import json
-import google.generativeai as genai
 import os
 import hashlib
 from dotenv import load_dotenv
+from gemini_client import GeminiClientError, get_client_pool
+from text_compaction import compact_job_description, compact_resume
 
 # 載入環境變數
 load_dotenv()
 
+# 簡化版每份輸入的 token 預算
+SIMPLE_TOKEN_BUDGET = 250
+
 # 頁面配置
 st.set_page_config(
     page_title="JobMatch.AI - Test",
@@ -65,23 +69,30 @@ def initialize_gemini_client():
             st.error("❌ 請設置 GOOGLE_API_KEY 環境變數")
             return None
         
-        genai.configure(api_key=api_key)
-        model = genai.GenerativeModel('gemini-2.0-flash-lite')
-        return model
-    except Exception as e:
+        return get_gemini_pool().get_model()
+    except GeminiClientError as e:
         st.error(f"❌ Gemini 客戶端初始化失敗: {str(e)}")
         return None
 
+@st.cache_resource
+def get_gemini_pool():
+    """建立並預熱行程共用的 Gemini 客戶端池"""
+    return get_client_pool().warm_up()
+
 def simple_analysis(resume_text, job_description, language):
     """簡化版分析"""
     model = initialize_gemini_client()
     if not model:
         return None
     
+    # 依段落重要性壓縮到較小的 token 預算，取代直接截斷前 500 字
+    resume_text = compact_resume(resume_text, budget=SIMPLE_TOKEN_BUDGET)
+    job_description = compact_job_description(job_description, budget=SIMPLE_TOKEN_BUDGET)
+    
     prompt = f"""請用{language}分析以下履歷和職缺的匹配度，並以 JSON 格式回覆：
 
-履歷：{resume_text[:500]}
-職缺：{job_description[:500]}
+履歷：{resume_text}
+職缺：{job_description}
 
 請回覆：
 {{
@@ -99,6 +110,10 @@ def simple_analysis(resume_text, job_description, language):
         return None
 
 def main():
+    # 啟動時先做健康檢查
+    if initialize_gemini_client() is None:
+        st.stop()
+    
     # 語言選擇
     language = st.selectbox("語言 / Language", ["中文", "English"])
     texts = get_ui_texts(language)
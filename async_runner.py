@@ -0,0 +1,54 @@
+import asyncio
+import concurrent.futures
+import threading
+
+
+class AsyncRunner:
+    """在背景執行緒執行常駐的 asyncio event loop
+
+    Streamlit 的腳本執行緒透過 submit() 提交協程並取得 concurrent.futures.Future，
+    之後輪詢結果而不是阻塞在 API 呼叫上；對 Future 呼叫 cancel() 會一併取消 event loop 中的工作。
+    所有 Gemini 非同步呼叫都在同一個 event loop 上執行，gRPC 連線因此可以共用。
+    """
+
+    def __init__(self, max_concurrency=4, name="analysis-event-loop"):
+        self._loop = asyncio.new_event_loop()
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        asyncio.set_event_loop(self._loop)
+        self._loop.run_forever()
+
+    async def _limited(self, coro):
+        async with self._semaphore:
+            return await coro
+
+    def submit(self, coro):
+        """提交協程（受 max_concurrency 限制），回傳可跨執行緒等待或取消的 Future"""
+        return asyncio.run_coroutine_threadsafe(self._limited(coro), self._loop)
+
+    def call_soon(self, callback, *args):
+        """在 event loop 執行緒中呼叫 callback"""
+        self._loop.call_soon_threadsafe(callback, *args)
+
+
+def wait_for_futures(futures, on_done=None, on_tick=None, poll_interval=0.25):
+    """輪詢一組 Future 直到全部完成
+
+    每完成一個就在目前執行緒呼叫 on_done(future)，每次輪詢逾時則呼叫 on_tick()。
+    呼叫端被中斷（例如 Streamlit 在 on_tick 中拋出重新執行或停止的例外）時，取消尚未完成的 Future。
+    """
+    pending = set(futures)
+    try:
+        while pending:
+            done, pending = concurrent.futures.wait(pending, timeout=poll_interval, return_when=concurrent.futures.FIRST_COMPLETED)
+            for future in done:
+                if on_done:
+                    on_done(future)
+            if pending and on_tick:
+                on_tick()
+    finally:
+        for future in pending:
+            future.cancel()
@@ -0,0 +1,148 @@
+"""緩存鍵的命中率比較（不呼叫 Gemini API）
+
+以合成流量比較三種查詢方式：
+  raw        升級前的鍵：原始文字直接 md5
+  canonical  make_input_hash：canonical_text 正規化後再 md5
+  near       canonical 未命中時，再以 SimHash 查詢相似度達門檻的既有結果
+
+每筆流量是先前已分析過的 (履歷, 職缺) 經過一種改動：完全相同、行尾空白、CRLF、項目符號樣式、
+項目順序、修改一行、新增一行；「修改數字」（例如年資 2 → 3 年）與「不同職缺」應該是新的請求，
+用來確認近似查詢不會誤判。
+
+  python benchmarks/bench_cache_keys.py [--pairs 200] [--threshold 0.95]
+"""
+import argparse
+import hashlib
+import os
+import random
+import re
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from matching_engine import make_input_hash  # noqa: E402
+from analysis_cache import AnalysisCache  # noqa: E402
+from near_duplicate import NearDuplicateIndex, numbers_fingerprint, simhash  # noqa: E402
+
+SKILLS = [
+    "React", "TypeScript", "Python", "Django", "FastAPI", "Go", "Kubernetes", "Docker", "AWS", "GCP",
+    "PostgreSQL", "Redis", "Kafka", "Spark", "Airflow", "Terraform", "GraphQL", "Node.js", "Vue", "Rust",
+]
+VERBS = ["開發", "維護", "設計", "優化", "重構", "導入", "建置"]
+
+
+def build_pair(rng, index):
+    skills = rng.sample(SKILLS, 6)
+    resume = ["工作經驗:"] + [
+        f"- 20{rng.randint(10, 23)} 在公司 {index}-{n} {rng.choice(VERBS)} {skill} 服務，提升效能 {rng.randint(5, 60)}%"
+        for n, skill in enumerate(skills)
+    ] + ["技能:", "- " + ", ".join(skills)]
+    job_skills = rng.sample(SKILLS, 5)
+    job = [f"職位 {index}：後端工程師", "Requirements:"] + [
+        f"- {rng.randint(2, 6)} 年以上 {skill} 經驗" for skill in job_skills
+    ] + ["Responsibilities:", f"- 負責 {job_skills[0]} 與 {job_skills[1]} 相關系統"]
+    return "\n".join(resume), "\n".join(job)
+
+
+def _lines(text):
+    return text.split("\n")
+
+
+PERTURBATIONS = {
+    "完全相同": lambda rng, text: text,
+    "行尾空白": lambda rng, text: "\n".join(line + "  " for line in _lines(text)) + "\n",
+    "CRLF": lambda rng, text: text.replace("\n", "\r\n"),
+    "項目符號": lambda rng, text: text.replace("- ", "• "),
+    "項目順序": lambda rng, text: _shuffle_bullets(rng, text),
+    "修改一行": lambda rng, text: _edit_line(rng, text),
+    "新增一行": lambda rng, text: text + "\n- 熟悉 Git 與 CI/CD 流程",
+    "修改數字": lambda rng, text: _edit_number(rng, text),
+}
+
+
+def _shuffle_bullets(rng, text):
+    """打亂每個段落內的項目順序（段落本身的順序不變）"""
+    lines = _lines(text)
+    run = []
+    for i in range(len(lines) + 1):
+        if i < len(lines) and lines[i].startswith("- "):
+            run.append(i)
+            continue
+        shuffled = [lines[j] for j in run]
+        rng.shuffle(shuffled)
+        for j, line in zip(run, shuffled):
+            lines[j] = line
+        run = []
+    return "\n".join(lines)
+
+
+def _edit_line(rng, text):
+    lines = _lines(text)
+    bullets = [i for i, line in enumerate(lines) if line.startswith("- ")]
+    index = rng.choice(bullets)
+    lines[index] = lines[index].replace("%", "％").replace("提升", "改善", 1) + "。"
+    return "\n".join(lines)
+
+
+def _edit_number(rng, text):
+    """把某個項目中的第一個數字加一"""
+    lines = _lines(text)
+    bullets = [i for i, line in enumerate(lines) if line.startswith("- ") and re.search(r"\d", line)]
+    index = rng.choice(bullets)
+    lines[index] = re.sub(r"\d+", lambda match: str(int(match.group()) + 1), lines[index], count=1)
+    return "\n".join(lines)
+
+
+def raw_hash(resume, job, language):
+    return hashlib.md5(f"{resume}_{job}_{language}".encode()).hexdigest()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pairs", type=int, default=200, help="先前已分析過的 (履歷, 職缺) 數量")
+    parser.add_argument("--threshold", type=float, default=0.95, help="近似查詢的相似度門檻")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    pairs = [build_pair(rng, index) for index in range(args.pairs)]
+    unseen = [build_pair(rng, args.pairs + index) for index in range(args.pairs)]
+
+    with tempfile.TemporaryDirectory() as directory:
+        cache = AnalysisCache(path=os.path.join(directory, "cache.sqlite3"))
+        index = NearDuplicateIndex(cache)
+        raw_keys, canonical_keys = set(), set()
+        start = time.perf_counter()
+        for resume, job in pairs:
+            raw_keys.add(raw_hash(resume, job, "中文"))
+            key = make_input_hash(resume, job, "中文")
+            canonical_keys.add(key)
+            # 索引只保留結果仍在緩存中的項目
+            cache.set(key, {})
+            index.add(numbers_fingerprint(resume, job), key, simhash(resume), simhash(job))
+        build_ms = (time.perf_counter() - start) * 1000 / len(pairs)
+
+        print(f"已分析 {len(pairs)} 組，每組建立鍵與簽章 {build_ms:.2f} ms，近似門檻 {args.threshold}")
+        print(f"{'流量類型':<10}{'raw':>8}{'canonical':>11}{'near':>8}{'查詢 ms':>10}")
+        cases = [(name, [(perturb(rng, r), perturb(rng, j)) for r, j in pairs]) for name, perturb in PERTURBATIONS.items()]
+        cases.append(("不同職缺", [(r, unseen[i][1]) for i, (r, _) in enumerate(pairs)]))
+        for name, traffic in cases:
+            raw_hits = canonical_hits = near_hits = 0
+            start = time.perf_counter()
+            for resume, job in traffic:
+                raw_hits += raw_hash(resume, job, "中文") in raw_keys
+                if make_input_hash(resume, job, "中文") in canonical_keys:
+                    canonical_hits += 1
+                    near_hits += 1
+                elif index.find(numbers_fingerprint(resume, job), simhash(resume), simhash(job), args.threshold) is not None:
+                    near_hits += 1
+            lookup_ms = (time.perf_counter() - start) * 1000 / len(traffic)
+            total = len(traffic)
+            print(f"{name:<10}{raw_hits / total:>8.0%}{canonical_hits / total:>11.0%}{near_hits / total:>8.0%}{lookup_ms:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""單次請求與平行拆分（fan-out）的延遲比較（不呼叫真正的 Gemini API）
+
+以 FakeGeminiModel 模擬首字延遲與生成速度：單次請求一次生成完整結果，
+fan-out 則依提示詞中的段落規則只回傳該段落的欄位（score / evidence / advice），三個子請求同時進行。
+延遲主要由輸出長度決定，因此 fan-out 的總延遲約等於最長的子請求（通常是 advice）。
+
+  python benchmarks/bench_fanout.py [--sizes 1 2 4] [--latency 0.4] [--cps 1500 3000] [--calls 5]
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_stages import build_job, build_result, build_resume  # noqa: E402  （同時設定離線執行的環境變數）
+from fake_gemini import FakeGeminiModel, NullCache, load_fixtures  # noqa: E402
+from matching_engine import run_analysis  # noqa: E402
+from prompts import SECTION_KEYS  # noqa: E402
+
+# 提示詞中各段落規則的開頭，用來判斷子請求要生成哪些段落
+SECTION_MARKERS = {"score": "- match_explanation：", "evidence": "- matched：", "advice": "- advice："}
+
+
+def make_responder(result):
+    """依請求的段落回傳 result 中對應欄位的 JSON"""
+    def responder(contents):
+        keys = [key for section, marker in SECTION_MARKERS.items() if marker in contents for key in SECTION_KEYS[section]]
+        return json.dumps({key: result[key] for key in keys if key in result}, ensure_ascii=False)
+    return responder
+
+
+def measure(model, resume_text, job_description, fan_out, stream, calls):
+    """回傳 (平均延遲 ms, 首個部分結果 ms, 每次分析的請求數)；第一次呼叫只用來暖機"""
+    cache = NullCache()
+    first_partial = []
+
+    async def run_once():
+        start = time.perf_counter()
+        seen = []
+
+        def on_partial(partial):
+            if not seen and partial.match_score is not None:
+                seen.append(time.perf_counter() - start)
+
+        await run_analysis(
+            model, cache, resume_text, job_description, "中文",
+            on_partial=on_partial if stream else None, fan_out=fan_out,
+        )
+        first_partial.extend(seen)
+
+    async def run_all():
+        await run_once()
+        first_partial.clear()
+        model.calls = 0
+        start = time.perf_counter()
+        for _ in range(calls):
+            await run_once()
+        elapsed = time.perf_counter() - start
+        first_ms = sum(first_partial) / len(first_partial) * 1000 if first_partial else float("nan")
+        return elapsed / calls * 1000, first_ms, model.calls / calls
+
+    return asyncio.run(run_all())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1, 2, 4], help="結果列表的放大倍數（模擬較長的回應）")
+    parser.add_argument("--latency", type=float, default=0.4, help="模擬的首字延遲（秒）")
+    parser.add_argument("--cps", type=float, nargs="+", default=[1500.0, 3000.0], help="模擬的生成速度（字元/秒）")
+    parser.add_argument("--calls", type=int, default=5, help="每種設定執行的分析次數")
+    args = parser.parse_args()
+
+    fixture = next(fixture for fixture in load_fixtures() if fixture["name"] == "zh_structured")
+    base_result = json.loads(fixture["text"])
+    resume_text, job_description = build_resume(1), build_job(1)
+
+    print(f"首字延遲 {args.latency}s，每項 {args.calls} 次")
+    print(f"{'大小':>5}{'字元/秒':>9}{'回應字元':>10}{'模式':>10}{'串流':>5}{'請求數':>7}{'平均延遲 ms':>13}{'首個分數 ms':>13}{'加速':>7}")
+    for scale in args.sizes:
+        result = build_result(base_result, scale)
+        response_chars = len(json.dumps(result, ensure_ascii=False))
+        for cps in args.cps:
+            for stream in (False, True):
+                baseline = None
+                for fan_out in (False, True):
+                    model = FakeGeminiModel([], first_token_latency=args.latency, chars_per_second=cps, responder=make_responder(result))
+                    latency_ms, first_ms, requests = measure(model, resume_text, job_description, fan_out, stream, args.calls)
+                    baseline = baseline or latency_ms
+                    print(
+                        f"{scale:>5}x{cps:>9.0f}{response_chars:>10}{'fan-out' if fan_out else '單次':>10}{'是' if stream else '否':>5}"
+                        f"{requests:>7.1f}{latency_ms:>13.1f}{first_ms:>13.1f}{baseline / latency_ms:>6.2f}x"
+                    )
+
+
+if __name__ == "__main__":
+    main()
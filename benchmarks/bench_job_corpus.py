@@ -0,0 +1,102 @@
+"""職缺庫索引的建立與查詢延遲基準測試
+
+以固定亂數種子合成職缺，分別量測 1k/10k/100k 份職缺的建立、寫入、memory-map 載入與 top-K 查詢時間：
+  python benchmarks/bench_job_corpus.py [--sizes 1000 10000 100000] [--queries 50] [-k 10]
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from job_corpus import JobCorpusIndex  # noqa: E402
+from prescore import SKILL_TERMS  # noqa: E402
+
+_SKILLS = sorted(term for term in SKILL_TERMS if term.isascii())
+_ROLES = ["Frontend Engineer", "Backend Engineer", "Data Scientist", "DevOps Engineer", "Product Manager",
+          "Mobile Developer", "QA Engineer", "ML Engineer", "Data Analyst", "Site Reliability Engineer"]
+_FILLER = ("build maintain design deliver scalable reliable services customers platform product features "
+           "collaborate stakeholders ownership quality performance mentoring roadmap testing monitoring "
+           "analytics dashboards pipelines infrastructure security compliance growth startup enterprise").split()
+_ZH_FILLER = ["負責系統開發與維護", "與產品團隊合作", "具備良好溝通能力", "熟悉敏捷開發流程", "優化服務效能", "撰寫技術文件"]
+
+
+def synthesize_jobs(n, seed=0):
+    """合成 n 份長度與用詞接近真實職缺的資料（約 120 個詞，部分混有中文）"""
+    rng = random.Random(seed)
+    jobs = []
+    for i in range(n):
+        role = rng.choice(_ROLES)
+        skills = rng.sample(_SKILLS, 8)
+        words = rng.choices(_FILLER, k=90)
+        lines = [
+            f"{role} #{i}",
+            "Responsibilities:",
+            " ".join(words[:45]),
+            "Requirements:",
+            *(f"- {rng.randint(1, 8)}+ years {skill}" for skill in skills),
+            " ".join(words[45:]),
+        ]
+        if i % 3 == 0:
+            lines.extend(rng.sample(_ZH_FILLER, 3))
+        jobs.append({"id": f"job-{i}", "title": f"{role} #{i}", "text": "\n".join(lines)})
+    return jobs
+
+
+def synthesize_resumes(n, seed=1):
+    rng = random.Random(seed)
+    resumes = []
+    for _ in range(n):
+        skills = rng.sample(_SKILLS, 10)
+        resumes.append("Experience:\n" + "\n".join(f"- Built services with {skill}" for skill in skills)
+                       + "\n" + " ".join(rng.choices(_FILLER, k=60)) + "\n負責系統開發與維護")
+    return resumes
+
+
+def bench_size(n, queries, k):
+    jobs = synthesize_jobs(n)
+    start = time.perf_counter()
+    index = JobCorpusIndex.build(jobs)
+    build_s = time.perf_counter() - start
+
+    with tempfile.TemporaryDirectory() as directory:
+        start = time.perf_counter()
+        index.save(directory)
+        save_s = time.perf_counter() - start
+
+        start = time.perf_counter()
+        loaded = JobCorpusIndex.load(directory)
+        load_s = time.perf_counter() - start
+
+        latencies = []
+        for resume in synthesize_resumes(queries):
+            start = time.perf_counter()
+            loaded.search(resume, k=k)
+            latencies.append((time.perf_counter() - start) * 1000)
+        del loaded
+
+    latencies.sort()
+    p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+    return build_s, save_s, load_s, statistics.median(latencies), p95
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("-k", type=int, default=10)
+    args = parser.parse_args()
+
+    print(f"{'職缺數':>8}{'建立(s)':>10}{'寫入(s)':>10}{'載入(s)':>10}{'查詢p50(ms)':>14}{'查詢p95(ms)':>14}")
+    for n in args.sizes:
+        build_s, save_s, load_s, p50, p95 = bench_size(n, args.queries, args.k)
+        print(f"{n:>8}{build_s:>10.2f}{save_s:>10.2f}{load_s:>10.2f}{p50:>14.2f}{p95:>14.2f}")
+
+
+if __name__ == "__main__":
+    main()
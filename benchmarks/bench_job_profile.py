@@ -0,0 +1,107 @@
+"""多位應徵者比對同一份職缺：完整職缺 vs 職缺重點（JobProfile）的輸入 token 與延遲比較（不呼叫 Gemini API）
+
+以 FakeGeminiModel 模擬 API；職缺重點的請求回傳固定的 JobProfile，其餘請求重播錄製的分析結果。
+--input-cps 模擬模型處理輸入的速度，讓較長的提示詞反映在延遲上。
+
+  python benchmarks/bench_job_profile.py [--resumes 50] [--job-sizes 1 4 8] [--latency 0.3] [--input-cps 20000]
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_stages import build_job, build_resume  # noqa: E402  （同時設定離線執行的環境變數）
+from fake_gemini import FakeGeminiModel, load_fixtures  # noqa: E402
+from analysis_cache import AnalysisCache  # noqa: E402
+from matching_engine import run_analysis, run_job_profile  # noqa: E402
+from single_flight import SingleFlight  # noqa: E402
+from text_compaction import estimate_tokens  # noqa: E402
+
+PROFILE = {
+    "role": "Frontend Engineer",
+    "key_skills": ["React", "TypeScript", "REST API"],
+    "experience": ["Experience building React and TypeScript applications"],
+    "other": [],
+}
+PROFILE_MARKER = "請整理職缺重點"
+
+
+class InputAwareModel(FakeGeminiModel):
+    """首字延遲加上依輸入長度計算的處理時間，並記錄每次請求的輸入 token 數"""
+
+    def __init__(self, responses, input_chars_per_second, **kwargs):
+        super().__init__(responses, **kwargs)
+        self.input_chars_per_second = input_chars_per_second
+        self.analysis_tokens = []
+
+    async def generate_content_async(self, contents, generation_config=None, stream=False, **kwargs):
+        if PROFILE_MARKER not in contents:
+            self.analysis_tokens.append(estimate_tokens(contents))
+        if self.input_chars_per_second:
+            await asyncio.sleep(len(contents) / self.input_chars_per_second)
+        return await super().generate_content_async(contents, generation_config, stream, **kwargs)
+
+
+def measure(resumes, job_description, use_job_profile, args, analysis_text):
+    """回傳 (每位應徵者平均輸入 token, 每位應徵者平均延遲秒, 總耗時秒, API 呼叫數)；職缺重點的抽取只計入總耗時"""
+    model = InputAwareModel(
+        [], args.input_cps, first_token_latency=args.latency,
+        responder=lambda contents: json.dumps(PROFILE) if PROFILE_MARKER in contents else analysis_text,
+    )
+
+    async def run_all():
+        with tempfile.TemporaryDirectory() as directory:
+            cache = AnalysisCache(path=os.path.join(directory, "cache.sqlite3"))
+            flights = SingleFlight("bench")
+            durations = []
+
+            async def analyze(resume, profile):
+                started = time.perf_counter()
+                await run_analysis(model, cache, resume, job_description, "中文", flights=flights, job_profile=profile)
+                durations.append(time.perf_counter() - started)
+
+            start = time.perf_counter()
+            # 與 MatchingEngine.screen 相同：先抽取一次重點，再傳給每次比對
+            profile = await run_job_profile(model, cache, job_description, "中文", flights=flights) if use_job_profile else None
+            await asyncio.gather(*(analyze(resume, profile) for resume in resumes))
+            return sum(durations) / len(durations), time.perf_counter() - start
+
+    latency, elapsed = asyncio.run(run_all())
+    return sum(model.analysis_tokens) / len(model.analysis_tokens), latency, elapsed, model.calls
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--resumes", type=int, default=50, help="應徵者人數")
+    parser.add_argument("--job-sizes", type=int, nargs="+", default=[1, 4, 8], help="職缺大小（約 N KB）")
+    parser.add_argument("--latency", type=float, default=0.3, help="模擬的首字延遲（秒）")
+    parser.add_argument("--input-cps", type=float, default=20000.0, help="模擬的輸入處理速度（字元/秒，0 代表不計）")
+    args = parser.parse_args()
+
+    analysis_text = next(fixture["text"] for fixture in load_fixtures() if fixture["name"] == "zh_structured")
+    # 每份履歷內容不同，避免命中緩存
+    resumes = [build_resume(1) + f"\n- 應徵者 {index}" for index in range(args.resumes)]
+
+    print(f"{args.resumes} 位應徵者，首字延遲 {args.latency}s，輸入處理 {args.input_cps or '不計'} 字元/秒")
+    # 第一次分析會載入 SDK，先暖機避免影響第一組數字
+    measure(resumes[:1], build_job(1), False, args, analysis_text)
+    print(f"{'職缺':>6}{'模式':>10}{'輸入 token/人':>14}{'API 呼叫':>10}{'延遲/人 s':>11}{'總耗時 s':>10}{'token 節省':>12}")
+    for size in args.job_sizes:
+        job_description = build_job(size)
+        baseline = None
+        for use_job_profile in (False, True):
+            tokens, latency, elapsed, calls = measure(resumes, job_description, use_job_profile, args, analysis_text)
+            baseline = baseline or tokens
+            print(
+                f"{size:>5}K{'職缺重點' if use_job_profile else '完整職缺':>10}{tokens:>14.0f}{calls:>10}"
+                f"{latency:>11.2f}{elapsed:>10.2f}{1 - tokens / baseline:>12.0%}"
+            )
+
+
+if __name__ == "__main__":
+    main()
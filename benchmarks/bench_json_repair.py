@@ -0,0 +1,142 @@
+"""JSON 擷取/修復的模糊測試語料與微基準測試
+
+比較 json_repair.extract_json 與原本 analyze_resume_job_match 內的清理邏輯：
+  python benchmarks/bench_json_repair.py [--stride 23] [--repeat 20]
+"""
+import argparse
+import json
+import os
+import random
+import re
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from json_repair import loads_tolerant  # noqa: E402
+
+FIXTURES = os.path.join(ROOT, "benchmarks", "fixtures", "gemini_responses.jsonl")
+
+
+def load_fixtures(path=FIXTURES):
+    """讀取錄製的 Gemini 回應（含圍欄、截斷、格式錯誤的樣本）"""
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def build_fuzz_corpus(fixtures, stride=23, seed=0):
+    """從完整回應衍生模糊測試語料：每隔 stride 個字元截斷一次，並隨機插入控制字元"""
+    rng = random.Random(seed)
+    corpus = [(f["name"], f["text"]) for f in fixtures]
+    for fixture in fixtures:
+        if fixture["kind"] == "truncated":
+            continue
+        text = fixture["text"]
+        for cut in range(stride, len(text), stride):
+            corpus.append((f"{fixture['name']}@{cut}", text[:cut]))
+        garbled = list(text)
+        for _ in range(5):
+            garbled.insert(rng.randrange(len(garbled)), chr(rng.choice([0x01, 0x07, 0x0B, 0x1F, 0x7F])))
+        corpus.append((f"{fixture['name']}+ctrl", "".join(garbled)))
+    return corpus
+
+
+def legacy_extract(response_text):
+    """原本 analyze_resume_job_match 內的清理與括號補全邏輯（供比較用）"""
+    json_text = ""
+    if "```json" in response_text:
+        json_start = response_text.find("```json") + 7
+        json_end = response_text.find("```", json_start)
+        if json_end > json_start:
+            json_text = response_text[json_start:json_end].strip()
+    elif "{" in response_text and "}" in response_text:
+        json_start = response_text.find("{")
+        json_end = response_text.rfind("}") + 1
+        json_text = response_text[json_start:json_end]
+    else:
+        json_text = response_text.strip()
+
+    json_text = re.sub(r'[\x00-\x08\x0B\x0C\x0E-\x1F\x7F]', '', json_text)
+
+    if json_text.count("{") != json_text.count("}"):
+        if json_text.count("{") > json_text.count("}"):
+            missing_braces = json_text.count("{") - json_text.count("}")
+            json_text += "}" * missing_braces
+            if not json_text.endswith("}"):
+                json_text += "}"
+        else:
+            extra_braces = json_text.count("}") - json_text.count("{")
+            for _ in range(extra_braces):
+                json_text = json_text.rsplit("}", 1)[0]
+
+    if not json_text.strip().endswith("}"):
+        if '"advice"' in json_text:
+            json_text = json_text.rstrip() + '}}'
+        elif '"missing"' in json_text:
+            json_text = json_text.rstrip() + '}'
+        elif '"matched"' in json_text:
+            json_text = json_text.rstrip() + '}'
+        elif '"priorities"' in json_text:
+            if json_text.count("[") > json_text.count("]"):
+                json_text = json_text.rstrip() + ']'
+            json_text = json_text.rstrip() + '}'
+    return json_text
+
+
+def legacy_parse(response_text):
+    return json.loads(legacy_extract(response_text))
+
+
+def new_parse(response_text):
+    return loads_tolerant(response_text)[0]
+
+
+def parses(parse, text):
+    try:
+        value = parse(text)
+    except (json.JSONDecodeError, ValueError):
+        return False
+    return isinstance(value, dict) and "match_score" in value
+
+
+def time_per_call(parse, corpus, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for _, text in corpus:
+            try:
+                parse(text)
+            except (json.JSONDecodeError, ValueError):
+                pass
+    return (time.perf_counter() - start) / (repeat * len(corpus)) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--stride", type=int, default=23, help="截斷間隔（字元）")
+    parser.add_argument("--repeat", type=int, default=20, help="計時重複次數")
+    args = parser.parse_args()
+
+    fixtures = load_fixtures()
+    corpus = build_fuzz_corpus(fixtures, stride=args.stride)
+    print(f"語料: {len(fixtures)} 份錄製回應，衍生 {len(corpus)} 個樣本")
+
+    print(f"{'實作':<12}{'可解析':>8}{'成功率':>10}{'µs/次':>12}")
+    # 計時包含 json.loads，比較的是「回應文字 → dict」的完整成本
+    complete = [(name, text) for name, text in corpus if parses(legacy_parse, text)]
+    for label, sample in (("全部樣本", corpus), ("完整回應", complete)):
+        print(f"[{label}] {len(sample)} 個")
+        for name, parse in (("legacy", legacy_parse), ("json_repair", new_parse)):
+            ok = sum(parses(parse, text) for _, text in sample)
+            micros = time_per_call(parse, sample, args.repeat)
+            print(f"{name:<12}{ok:>8}{ok / len(sample):>10.1%}{micros:>12.1f}")
+
+    # 逐一列出錄製樣本的結果，方便看出哪一類輸入會失敗
+    print()
+    for fixture in fixtures:
+        print(f"{fixture['name']:<40}legacy={parses(legacy_parse, fixture['text'])!s:<6}"
+              f"json_repair={parses(new_parse, fixture['text'])}")
+
+
+if __name__ == "__main__":
+    main()
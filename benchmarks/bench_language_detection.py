@@ -0,0 +1,66 @@
+"""語言偵測基準測試
+
+以約 100 KB 的中文、英文、中英混合、日文、韓文文字比較 language_detection.detect_language
+與原本逐字元建立列表的實作：
+  python benchmarks/bench_language_detection.py [--size 100000] [--repeat 50]
+"""
+import argparse
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from language_detection import detect_language  # noqa: E402
+
+SAMPLES = {
+    "中文": "負責前端架構設計與開發，使用 React 與 TypeScript 建立設計系統，並與產品團隊合作優化使用者體驗。",
+    "English": "Built and maintained React and TypeScript services, led the design system and improved page performance by 40%. ",
+    "中英混合": "熟悉 React、Vue、Node.js，負責 API 設計與 CI/CD 流程，曾帶領 5 人團隊完成電商平台重構。",
+    "日本語": "フロントエンド開発を担当し、React と TypeScript を用いてデザインシステムを構築しました。",
+    "한국어": "React와 TypeScript를 사용하여 프론트엔드 개발을 담당하고 디자인 시스템을 구축했습니다. ",
+}
+
+
+def legacy_detect_language(text):
+    """原本 app.py 的實作：建立兩個完整列表計數，只分辨中英文"""
+    chinese_chars = len([c for c in text if '\u4e00' <= c <= '\u9fff'])
+    english_chars = len([c for c in text if c.isalpha() and ord(c) < 128])
+    total_chars = chinese_chars + english_chars
+
+    if total_chars == 0:
+        return "English"
+
+    chinese_ratio = chinese_chars / total_chars
+    return "中文" if chinese_ratio > 0.5 else "English"
+
+
+def build_text(sample, size):
+    return (sample * (size // len(sample) + 1))[:size]
+
+
+def time_per_call(func, text, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func(text)
+    return (time.perf_counter() - start) / repeat * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--size", type=int, default=100_000, help="每份輸入的字元數")
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    print(f"{'輸入':<10}{'原本結果':>10}{'新結果':>10}{'原本(µs)':>12}{'新(µs)':>10}{'加速':>8}")
+    for name, sample in SAMPLES.items():
+        text = build_text(sample, args.size)
+        legacy_us = time_per_call(legacy_detect_language, text, max(1, args.repeat // 10))
+        new_us = time_per_call(detect_language, text, args.repeat)
+        print(f"{name:<10}{legacy_detect_language(text):>10}{detect_language(text):>10}"
+              f"{legacy_us:>12.0f}{new_us:>10.0f}{legacy_us / new_us:>7.0f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,192 @@
+"""分析流程各階段的離線微基準測試（不呼叫真正的 Gemini API）
+
+在多種輸入大小下量測各階段的吞吐量與峰值記憶體：
+  prompt     履歷/職缺壓縮與提示詞組裝
+  repair     從圍欄包住或被截斷的回應擷取並修復 JSON
+  loads      json.loads 解析完整 JSON
+  normalize  AnalysisResult.from_dict 驗證與正規化，以及緊湊格式的序列化/還原
+  language   detect_language
+  render     結果 HTML 渲染
+  e2e        以 FakeGeminiModel 重播錄製回應，跑完整的 run_analysis（含模擬延遲）
+
+  python benchmarks/bench_stages.py [--sizes 1 4 16] [--stages prompt repair ...] [--latency 0.3] [--cps 0]
+"""
+import argparse
+import asyncio
+import copy
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+# 離線執行：停用 context caching（避免連線）與 API 額度限制
+os.environ.setdefault("GEMINI_CONTEXT_CACHE_TTL", "0")
+os.environ.setdefault("GEMINI_RPM", "0")
+
+from fake_gemini import FakeGeminiModel, NullCache, load_fixtures  # noqa: E402
+from analysis_result import AnalysisResult  # noqa: E402
+from json_repair import loads_tolerant  # noqa: E402
+from language_detection import detect_language  # noqa: E402
+from matching_engine import run_analysis  # noqa: E402
+from prompts import build_user_prompt, get_prompt  # noqa: E402
+from result_renderer import render_result  # noqa: E402
+from text_compaction import compact_job_description, compact_resume  # noqa: E402
+from ui_assets import get_ui_texts  # noqa: E402
+
+STAGES = ("prompt", "repair", "loads", "normalize", "language", "render", "e2e")
+
+
+def build_resume(scale):
+    """約 scale KB 的履歷；每行內容不同，避免被壓縮時的去重消掉"""
+    lines = ["工作經驗:"]
+    index = 0
+    while sum(len(line.encode()) for line in lines) < scale * 1024:
+        index += 1
+        lines.append(f"- 2020-2023 專案 {index}：使用 React、TypeScript 與 Python 開發功能模組 {index}，提升轉換率 {index % 30}%")
+    lines += ["技能:", "- React, TypeScript, Python, Docker"]
+    return "\n".join(lines)
+
+
+def build_job(scale):
+    lines = ["Requirements:"]
+    index = 0
+    while sum(len(line.encode()) for line in lines) < scale * 1024:
+        index += 1
+        lines.append(f"- Experience #{index} building React and TypeScript applications with REST API integration")
+    lines += ["Benefits:", "- Free lunch", "We are an equal opportunity employer."]
+    return "\n".join(lines)
+
+
+def build_result(base, scale):
+    """把錄製結果中的列表放大 scale 倍，模擬較長的分析結果"""
+    result = copy.deepcopy(base)
+    for key in ("priorities", "matched", "missing"):
+        items = result.get(key) or []
+        result[key] = [copy.deepcopy(item) for _ in range(scale) for item in items]
+    advice = result.get("advice")
+    if isinstance(advice, dict):
+        result["advice"] = {title: list(items) * scale for title, items in advice.items()}
+    return result
+
+
+def measure(func, arg, input_bytes, min_time):
+    """重複執行直到累積 min_time 秒，回傳 (每秒次數, MB/s, 峰值記憶體 KB)"""
+    func(arg)
+    runs = 0
+    start = time.perf_counter()
+    while True:
+        func(arg)
+        runs += 1
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time:
+            break
+    tracemalloc.start()
+    func(arg)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    ops = runs / elapsed
+    return ops, ops * input_bytes / 1e6, peak / 1024
+
+
+def measure_e2e(model, resume_text, job_description, stream, calls):
+    """以 FakeGeminiModel 跑完整分析，回傳 (平均延遲 ms, 峰值記憶體 KB)；第一次呼叫只用來暖機（載入 SDK 等）"""
+    cache = NullCache()
+    on_partial = (lambda partial: None) if stream else None
+
+    async def run_once():
+        await run_analysis(model, cache, resume_text, job_description, "中文", on_partial=on_partial)
+
+    async def run_all():
+        await run_once()
+        start = time.perf_counter()
+        for _ in range(calls):
+            await run_once()
+        elapsed = time.perf_counter() - start
+        tracemalloc.start()
+        await run_once()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        return elapsed / calls * 1000, peak / 1024
+
+    return asyncio.run(run_all())
+
+
+def print_row(stage, scale, input_bytes, ops, mb_per_s, peak_kb):
+    print(f"{stage:<18}{scale:>6}x{input_bytes / 1024:>10.1f}{ops:>14.1f}{mb_per_s:>10.2f}{peak_kb:>12.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1, 4, 16], help="輸入放大倍數（履歷/職缺約為 N KB）")
+    parser.add_argument("--stages", nargs="+", choices=STAGES, default=list(STAGES))
+    parser.add_argument("--min-time", type=float, default=0.3, help="每項量測至少執行的秒數")
+    parser.add_argument("--latency", type=float, default=0.0, help="e2e：模擬的首字延遲（秒）")
+    parser.add_argument("--cps", type=float, default=0.0, help="e2e：模擬的生成速度（字元/秒，0 代表不延遲）")
+    parser.add_argument("--calls", type=int, default=20, help="e2e：每種設定執行的分析次數")
+    args = parser.parse_args()
+
+    fixtures = load_fixtures()
+    complete = next(fixture for fixture in fixtures if fixture["kind"] == "complete" and fixture["name"].startswith("zh"))
+    base_result, _ = loads_tolerant(complete["text"])
+    texts = get_ui_texts("中文")
+
+    print(f"{'階段':<16}{'大小':>7}{'輸入 KB':>10}{'次/秒':>12}{'MB/s':>10}{'峰值 KB':>10}")
+    for scale in args.sizes:
+        resume_text = build_resume(scale)
+        job_description = build_job(scale)
+        result = build_result(base_result, scale)
+        plain = json.dumps(result, ensure_ascii=False, indent=2)
+        fenced = f"```json\n{plain}\n```"
+        truncated = fenced[:int(len(fenced) * 0.8)]
+
+        if "prompt" in args.stages:
+            def build_prompt(texts_pair):
+                resume, job = texts_pair
+                get_prompt("中文")
+                return build_user_prompt(compact_resume(resume), compact_job_description(job))
+            size = len(resume_text.encode()) + len(job_description.encode())
+            print_row("prompt", scale, size, *measure(build_prompt, (resume_text, job_description), size, args.min_time))
+        if "repair" in args.stages:
+            size = len(fenced.encode())
+            print_row("repair (fenced)", scale, size, *measure(loads_tolerant, fenced, size, args.min_time))
+            size = len(truncated.encode())
+            print_row("repair (truncated)", scale, size, *measure(loads_tolerant, truncated, size, args.min_time))
+        if "loads" in args.stages:
+            size = len(plain.encode())
+            print_row("json.loads", scale, size, *measure(json.loads, plain, size, args.min_time))
+        if "normalize" in args.stages:
+            size = len(plain.encode())
+            print_row("from_dict", scale, size, *measure(AnalysisResult.from_dict, result, size, args.min_time))
+            model = AnalysisResult.from_dict(result)
+            stored = json.dumps(model.to_compact(), ensure_ascii=False, separators=(",", ":"))
+            size = len(stored.encode())
+            print_row("compact dumps", scale, size, *measure(
+                lambda value: json.dumps(value.to_compact(), ensure_ascii=False, separators=(",", ":")), model, size, args.min_time))
+            print_row("compact loads", scale, size, *measure(
+                lambda value: AnalysisResult.from_compact(json.loads(value)), stored, size, args.min_time))
+        if "language" in args.stages:
+            size = len(resume_text.encode())
+            print_row("detect_language", scale, size, *measure(detect_language, resume_text, size, args.min_time))
+        if "render" in args.stages:
+            size = len(plain.encode())
+            print_row("render", scale, size, *measure(lambda value: render_result(value, texts), AnalysisResult.from_dict(result), size, args.min_time))
+
+    if "e2e" in args.stages:
+        print()
+        print(f"e2e（首字延遲 {args.latency}s，生成速度 {args.cps or '不限'} 字元/秒，每項 {args.calls} 次）")
+        print(f"{'回應':<22}{'大小':>6}{'串流':>6}{'平均延遲 ms':>14}{'峰值 KB':>10}")
+        for fixture in (fixture for fixture in fixtures if fixture["name"] in ("zh_fenced", "en_prose_no_fence", "zh_truncated_in_advice_string")):
+            for scale in args.sizes:
+                for stream in (False, True):
+                    model = FakeGeminiModel([fixture["text"]], first_token_latency=args.latency, chars_per_second=args.cps)
+                    latency_ms, peak_kb = measure_e2e(model, build_resume(scale), build_job(scale), stream, args.calls)
+                    print(f"{fixture['name']:<30}{scale:>5}x{'是' if stream else '否':>5}{latency_ms:>14.2f}{peak_kb:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
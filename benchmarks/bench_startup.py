@@ -0,0 +1,100 @@
+"""冷啟動基準測試與回歸檢查
+
+每一項都在全新的 Python 行程中量測：
+  1. import 時間：streamlit 本身，以及 app.py 依賴的本地模組
+  2. 首次渲染時間：以 streamlit.testing 的 AppTest 執行 app.py 直到第一個畫面完成
+並確認本地模組 import 時沒有載入 google.generativeai 等重量級套件（應延後到第一次分析）。
+
+  python benchmarks/bench_startup.py [--runs 3] [--max-import-ms 300] [--max-render-ms 3000]
+
+超過門檻或載入了不該載入的套件時以非零狀態碼結束，可作為 CI 的回歸檢查。
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP_PATH = os.path.join(ROOT, "app.py")
+
+# app.py 在首次渲染前會 import 的本地模組
+APP_MODULES = [
+    "analysis_cache", "async_runner", "document_extraction", "gemini_client", "matching_engine",
+    "metrics", "prescore", "result_renderer", "single_flight", "ui_assets",
+]
+# 這些套件只應在第一次分析（或背景預熱、解析上傳檔案的 worker）時才載入
+DEFERRED_MODULES = ["google.generativeai", "google.api_core.exceptions", "grpc", "pypdf", "docx"]
+
+IMPORT_SNIPPET = """
+import json, sys, time
+start = time.perf_counter()
+import streamlit
+streamlit_done = time.perf_counter()
+for name in {modules!r}:
+    __import__(name)
+done = time.perf_counter()
+print(json.dumps({{
+    "streamlit_ms": (streamlit_done - start) * 1000,
+    "app_modules_ms": (done - streamlit_done) * 1000,
+    "deferred_loaded": [name for name in {deferred!r} if name in sys.modules],
+}}))
+"""
+
+RENDER_SNIPPET = """
+import json, time, warnings
+warnings.filterwarnings("ignore")
+from streamlit.testing.v1 import AppTest
+start = time.perf_counter()
+at = AppTest.from_file({app_path!r}, default_timeout=60).run()
+elapsed = (time.perf_counter() - start) * 1000
+print(json.dumps({{"first_render_ms": elapsed, "exception": bool(at.exception)}}))
+"""
+
+
+def run_snippet(code):
+    env = dict(os.environ)
+    env.setdefault("GOOGLE_API_KEY", "benchmark-placeholder-key")
+    output = subprocess.run(
+        [sys.executable, "-c", code], cwd=ROOT, env=env, capture_output=True, text=True, check=True, timeout=300
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--max-import-ms", type=float, default=300.0, help="本地模組 import 時間上限（中位數）")
+    parser.add_argument("--max-render-ms", type=float, default=3000.0, help="首次渲染時間上限（中位數）")
+    args = parser.parse_args()
+
+    imports = [run_snippet(IMPORT_SNIPPET.format(modules=APP_MODULES, deferred=DEFERRED_MODULES)) for _ in range(args.runs)]
+    renders = [run_snippet(RENDER_SNIPPET.format(app_path=APP_PATH)) for _ in range(args.runs)]
+
+    streamlit_ms = statistics.median(item["streamlit_ms"] for item in imports)
+    app_modules_ms = statistics.median(item["app_modules_ms"] for item in imports)
+    render_ms = statistics.median(item["first_render_ms"] for item in renders)
+    deferred_loaded = sorted({name for item in imports for name in item["deferred_loaded"]})
+
+    print(f"import streamlit      {streamlit_ms:8.1f} ms")
+    print(f"import app 模組        {app_modules_ms:8.1f} ms")
+    print(f"首次渲染（AppTest）    {render_ms:8.1f} ms")
+    print(f"提早載入的重量級套件   {', '.join(deferred_loaded) or '無'}")
+
+    failures = []
+    if app_modules_ms > args.max_import_ms:
+        failures.append(f"app 模組 import {app_modules_ms:.0f} ms 超過 {args.max_import_ms:.0f} ms")
+    if render_ms > args.max_render_ms:
+        failures.append(f"首次渲染 {render_ms:.0f} ms 超過 {args.max_render_ms:.0f} ms")
+    if deferred_loaded:
+        failures.append(f"import 時載入了應延後的套件: {', '.join(deferred_loaded)}")
+    if any(item["exception"] for item in renders):
+        failures.append("首次渲染發生例外")
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
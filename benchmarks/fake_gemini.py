@@ -0,0 +1,123 @@
+"""離線測試用的 Gemini 替身：重播錄製的回應，並模擬首字延遲與串流速度
+
+用法與 google.generativeai.GenerativeModel 相同的介面（generate_content / generate_content_async / count_tokens），
+可直接傳給 matching_engine.run_analysis：
+
+    model = FakeGeminiModel.from_fixtures(names=["zh_fenced"], first_token_latency=0.3, chars_per_second=2000)
+"""
+import asyncio
+import itertools
+import json
+import os
+import time
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "gemini_responses.jsonl")
+# 串流時每個 chunk 的字元數（接近 Gemini 實際的分塊大小）
+CHUNK_CHARS = 200
+
+
+def load_fixtures(path=FIXTURES):
+    """讀取錄製的 Gemini 回應（含圍欄、截斷、格式錯誤的樣本）"""
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+class FakeUsage:
+    __slots__ = ("prompt_token_count", "cached_content_token_count", "candidates_token_count", "total_token_count")
+
+    def __init__(self, prompt_tokens, output_tokens):
+        self.prompt_token_count = prompt_tokens
+        self.cached_content_token_count = 0
+        self.candidates_token_count = output_tokens
+        self.total_token_count = prompt_tokens + output_tokens
+
+
+class FakeChunk:
+    __slots__ = ("text", "usage_metadata")
+
+    def __init__(self, text, usage_metadata):
+        self.text = text
+        self.usage_metadata = usage_metadata
+
+
+class FakeResponse:
+    """模擬 GenerateContentResponse / AsyncGenerateContentResponse：.text、usage_metadata 與（非）同步迭代"""
+
+    def __init__(self, text, usage_metadata, chunk_delay=0.0):
+        self.text = text
+        self.usage_metadata = usage_metadata
+        self._chunk_delay = chunk_delay
+
+    def _chunks(self):
+        for start in range(0, len(self.text), CHUNK_CHARS):
+            yield FakeChunk(self.text[start:start + CHUNK_CHARS], self.usage_metadata)
+
+    def __iter__(self):
+        for chunk in self._chunks():
+            if self._chunk_delay:
+                time.sleep(self._chunk_delay)
+            yield chunk
+
+    async def __aiter__(self):
+        for chunk in self._chunks():
+            if self._chunk_delay:
+                await asyncio.sleep(self._chunk_delay)
+            yield chunk
+
+
+class FakeGeminiModel:
+    """依序（循環）重播錄製回應的模型替身
+
+    first_token_latency：送出請求到第一個 chunk 的秒數；
+    chars_per_second：生成速度，0 代表不延遲（非串流模式會等到整份回應「生成」完才回傳）。
+    responder(contents) 可自訂每次要回傳的文字，優先於錄製回應。
+    """
+
+    def __init__(self, responses, first_token_latency=0.0, chars_per_second=0.0, responder=None):
+        self._responses = itertools.cycle(responses)
+        self.first_token_latency = first_token_latency
+        self.chars_per_second = chars_per_second
+        self.responder = responder
+        self.calls = 0
+
+    @classmethod
+    def from_fixtures(cls, names=None, kinds=None, **kwargs):
+        fixtures = load_fixtures()
+        responses = [
+            fixture["text"] for fixture in fixtures
+            if (names is None or fixture["name"] in names) and (kinds is None or fixture["kind"] in kinds)
+        ]
+        if not responses:
+            raise ValueError(f"找不到符合條件的錄製回應: names={names} kinds={kinds}")
+        return cls(responses, **kwargs)
+
+    def _next_response(self, contents):
+        self.calls += 1
+        text = self.responder(contents) if self.responder else next(self._responses)
+        usage = FakeUsage(prompt_tokens=len(str(contents)) // 4, output_tokens=len(text) // 4)
+        chunk_delay = CHUNK_CHARS / self.chars_per_second if self.chars_per_second else 0.0
+        generation_time = len(text) / self.chars_per_second if self.chars_per_second else 0.0
+        return text, usage, chunk_delay, generation_time
+
+    def generate_content(self, contents, generation_config=None, stream=False, **kwargs):
+        text, usage, chunk_delay, generation_time = self._next_response(contents)
+        time.sleep(self.first_token_latency + (0.0 if stream else generation_time))
+        return FakeResponse(text, usage, chunk_delay if stream else 0.0)
+
+    async def generate_content_async(self, contents, generation_config=None, stream=False, **kwargs):
+        text, usage, chunk_delay, generation_time = self._next_response(contents)
+        await asyncio.sleep(self.first_token_latency + (0.0 if stream else generation_time))
+        return FakeResponse(text, usage, chunk_delay if stream else 0.0)
+
+    def count_tokens(self, contents):
+        return FakeUsage(len(str(contents)) // 4, 0)
+
+
+class NullCache:
+    """不保存任何東西的 AnalysisCache 替身，讓每次分析都會走完整流程"""
+
+    def get(self, key):
+        return None
+
+    def set(self, key, value):
+        pass
@@ -0,0 +1,240 @@
+"""上傳履歷（PDF / DOCX / 純文字）的文字擷取
+
+解析在獨立的 process pool 中執行：大型或格式異常的檔案不會佔用 Streamlit 腳本執行緒與 GIL，
+超過 EXTRACTION_TIMEOUT 的工作會連同 worker 一起終止。PDF 與 DOCX 逐頁/逐段讀取，累積到
+MAX_EXTRACTED_CHARS 就停止，記憶體用量不隨檔案頁數成長。
+
+擷取結果以檔案內容的 SHA-256 暫存在行程記憶體中的 LRU（最多 DOCUMENT_CACHE_SIZE 份），重新上傳同一份檔案
+或重新分析時不需要再解析；履歷文字不寫入磁碟，也不佔用 AnalysisCache 的容量與命中統計。
+pypdf 與 python-docx 只在 worker 中載入，不影響主程式的啟動時間。
+"""
+import concurrent.futures
+import hashlib
+import io
+import logging
+import multiprocessing
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+
+from metrics import timed_stage
+
+SUPPORTED_EXTENSIONS = (".pdf", ".docx", ".txt", ".md")
+# 單一檔案的解析逾時（秒）與 worker 數量
+EXTRACTION_TIMEOUT = float(os.getenv("EXTRACTION_TIMEOUT", "20"))
+EXTRACTION_WORKERS = int(os.getenv("EXTRACTION_WORKERS", "2"))
+# 上傳大小與擷取內容的上限；履歷送進提示詞前還會再經 text_compaction 壓縮
+MAX_UPLOAD_BYTES = 10 * 1024 * 1024
+MAX_EXTRACTED_CHARS = 50_000
+MAX_PDF_PAGES = 50
+# 行程內保留的擷取結果數量
+DOCUMENT_CACHE_SIZE = int(os.getenv("DOCUMENT_CACHE_SIZE", "32"))
+
+logger = logging.getLogger(__name__)
+
+
+class DocumentExtractionError(Exception):
+    """無法從上傳的檔案取得文字；訊息可直接顯示給使用者"""
+
+
+@dataclass(frozen=True)
+class ExtractedDocument:
+    """擷取結果；truncated 代表超過頁數或字數上限，只保留前段內容"""
+
+    __slots__ = ("text", "pages", "truncated")
+    text: str
+    pages: int
+    truncated: bool
+
+
+class _TextCollector:
+    """逐段累積文字，超過 MAX_EXTRACTED_CHARS 時標記截斷"""
+
+    __slots__ = ("parts", "chars", "truncated")
+
+    def __init__(self):
+        self.parts = []
+        self.chars = 0
+        self.truncated = False
+
+    @property
+    def full(self):
+        return self.chars >= MAX_EXTRACTED_CHARS
+
+    def add(self, text):
+        text = (text or "").strip()
+        if not text:
+            return
+        remaining = MAX_EXTRACTED_CHARS - self.chars
+        if len(text) > remaining:
+            text = text[:remaining]
+            self.truncated = True
+        self.parts.append(text)
+        self.chars += len(text)
+
+    def text(self):
+        return "\n".join(self.parts)
+
+
+def _extract_pdf(data):
+    """在 worker 行程中執行：逐頁擷取 PDF 文字，只保留文字而不保留已解析的頁面"""
+    try:
+        from pypdf import PdfReader
+        from pypdf.errors import PdfReadError
+    except ImportError as e:
+        raise DocumentExtractionError("讀取 PDF 需要安裝 pypdf（pip install pypdf）") from e
+
+    try:
+        reader = PdfReader(io.BytesIO(data))
+        if reader.is_encrypted and not reader.decrypt(""):
+            raise DocumentExtractionError("PDF 已加密，請先移除密碼再上傳")
+        collector = _TextCollector()
+        pages = len(reader.pages)
+        for index in range(pages):
+            if index >= MAX_PDF_PAGES or collector.full:
+                collector.truncated = True
+                break
+            collector.add(reader.pages[index].extract_text())
+    except PdfReadError as e:
+        raise DocumentExtractionError(f"無法解析 PDF：{e}") from e
+    return collector.text(), pages, collector.truncated
+
+
+def _iter_docx_blocks(document):
+    yield from (paragraph.text for paragraph in document.paragraphs)
+    for table in document.tables:
+        for row in table.rows:
+            yield " | ".join(cell.text.strip() for cell in row.cells if cell.text.strip())
+
+
+def _extract_docx(data):
+    """在 worker 行程中執行：依序擷取 DOCX 的段落與表格文字"""
+    try:
+        import docx
+    except ImportError as e:
+        raise DocumentExtractionError("讀取 DOCX 需要安裝 python-docx（pip install python-docx）") from e
+
+    try:
+        document = docx.Document(io.BytesIO(data))
+    except Exception as e:
+        # python-docx 對損毀的檔案會拋出 zipfile / lxml 等各種錯誤
+        raise DocumentExtractionError(f"無法解析 DOCX：{e}") from e
+    collector = _TextCollector()
+    for block in _iter_docx_blocks(document):
+        if collector.full:
+            collector.truncated = True
+            break
+        collector.add(block)
+    return collector.text(), 1, collector.truncated
+
+
+EXTRACTORS = {".pdf": _extract_pdf, ".docx": _extract_docx}
+
+
+def make_document_key(data):
+    """以檔案內容（而非檔名）計算緩存鍵"""
+    return hashlib.sha256(data).digest()
+
+
+class DocumentExtractor:
+    """以 process pool 擷取上傳檔案的文字，並以內容哈希在記憶體中緩存結果（執行緒安全）
+
+    worker 以 spawn 啟動，不會複製主行程的 event loop 與 gRPC 執行緒；第一次解析時才建立 pool。
+    """
+
+    def __init__(self, max_workers=EXTRACTION_WORKERS, timeout=EXTRACTION_TIMEOUT, cache_size=DOCUMENT_CACHE_SIZE):
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self.cache_size = cache_size
+        self._pool = None
+        self._lock = threading.Lock()
+        self._documents = OrderedDict()
+
+    def _get_pool(self):
+        with self._lock:
+            if self._pool is None:
+                self._pool = concurrent.futures.ProcessPoolExecutor(
+                    max_workers=self.max_workers, mp_context=multiprocessing.get_context("spawn")
+                )
+            return self._pool
+
+    def _discard_pool(self, pool):
+        """終止卡住或異常的 pool；之後的解析會建立新的 pool"""
+        with self._lock:
+            if self._pool is pool:
+                self._pool = None
+        pool.shutdown(wait=False, cancel_futures=True)
+        terminate = getattr(pool, "terminate_workers", None)
+        if terminate is not None:
+            terminate()
+            return
+        # Python 3.14 之前沒有公開的終止方法，逾時的 worker 只能直接結束
+        for process in list((getattr(pool, "_processes", None) or {}).values()):
+            process.terminate()
+
+    def _cached(self, key):
+        with self._lock:
+            document = self._documents.get(key)
+            if document is not None:
+                self._documents.move_to_end(key)
+            return document
+
+    def _remember(self, key, document):
+        if self.cache_size <= 0:
+            return
+        with self._lock:
+            self._documents[key] = document
+            self._documents.move_to_end(key)
+            while len(self._documents) > self.cache_size:
+                self._documents.popitem(last=False)
+
+    def _run(self, func, data):
+        pool = self._get_pool()
+        future = pool.submit(func, data)
+        try:
+            return future.result(timeout=self.timeout)
+        except concurrent.futures.TimeoutError as e:
+            self._discard_pool(pool)
+            raise DocumentExtractionError(f"檔案解析逾時（超過 {self.timeout:g} 秒）") from e
+        except concurrent.futures.process.BrokenProcessPool as e:
+            self._discard_pool(pool)
+            raise DocumentExtractionError("檔案解析程序異常結束，請確認檔案是否損毀") from e
+        except DocumentExtractionError:
+            raise
+        except Exception as e:
+            # pypdf / python-docx 對格式異常的內容會拋出 KeyError、ValueError、PdfStreamError 等各種錯誤
+            logger.info("document extraction failed: %s", e, exc_info=True)
+            raise DocumentExtractionError(f"無法解析檔案：{e}") from e
+
+    def extract(self, data, filename):
+        """擷取檔案文字並回傳 ExtractedDocument；失敗時拋出 DocumentExtractionError"""
+        extension = os.path.splitext(filename or "")[1].lower()
+        if extension not in SUPPORTED_EXTENSIONS:
+            raise DocumentExtractionError(f"不支援的檔案格式：{extension or filename}")
+        if len(data) > MAX_UPLOAD_BYTES:
+            raise DocumentExtractionError(f"檔案超過 {MAX_UPLOAD_BYTES // (1024 * 1024)} MB 上限")
+
+        if extension not in EXTRACTORS:
+            # 純文字不需要解析，直接解碼
+            text = data.decode("utf-8", errors="ignore").strip()
+            document = ExtractedDocument(text[:MAX_EXTRACTED_CHARS], 1, len(text) > MAX_EXTRACTED_CHARS)
+        else:
+            key = make_document_key(data)
+            document = self._cached(key)
+            if document is None:
+                with timed_stage("document_extract", extension=extension, size=len(data)):
+                    document = ExtractedDocument(*self._run(EXTRACTORS[extension], data))
+                if document.text:
+                    self._remember(key, document)
+
+        if not document.text:
+            raise DocumentExtractionError("檔案中找不到文字（可能是掃描的圖片檔），請改為貼上履歷內容")
+        return document
+
+    def shutdown(self):
+        with self._lock:
+            pool, self._pool = self._pool, None
+            self._documents.clear()
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
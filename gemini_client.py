@@ -0,0 +1,233 @@
+import concurrent.futures
+import datetime
+import logging
+import os
+import threading
+import time
+
+from rate_limit import RateLimiter
+
+DEFAULT_MODEL_NAME = "gemini-2.0-flash-lite"
+# 系統提示詞 context cache 的存活時間（秒），設為 0 則停用
+CONTEXT_CACHE_TTL = int(os.getenv("GEMINI_CONTEXT_CACHE_TTL", "3600"))
+# 建立 context cache 遇到暫時性錯誤（網路、429、5xx）後，多久再重試（秒）
+CONTEXT_CACHE_RETRY_SECONDS = int(os.getenv("GEMINI_CONTEXT_CACHE_RETRY", "300"))
+
+logger = logging.getLogger(__name__)
+
+
+def _genai():
+    """延後載入 google.generativeai（import 需要近一秒），讓 Streamlit 的首次渲染不必等待"""
+    import google.generativeai as genai
+    return genai
+
+
+class GeminiClientError(Exception):
+    """Gemini 客戶端設定或健康檢查失敗"""
+
+
+def _is_unsupported_error(error):
+    """context cache 的錯誤是否代表這個模型/提示詞永遠不支援（參數無效、低於最小 token 數、模型不存在、SDK 沒有 caching）"""
+    if isinstance(error, (ImportError, AttributeError)):
+        return True
+    try:
+        from google.api_core import exceptions
+    except ImportError:
+        return False
+    return isinstance(error, (exceptions.InvalidArgument, exceptions.NotFound))
+
+
+class GeminiClientPool:
+    """行程層級的 Gemini 客戶端池
+
+    genai.configure() 只執行一次；GenerativeModel 依模型名稱建立後重複使用，
+    所有模型共用 SDK 內部的預設連線，因此 HTTP/gRPC 連線可以在各個 session 之間保持並重用。
+    """
+
+    def __init__(self, api_key=None, model_name=DEFAULT_MODEL_NAME):
+        self.api_key = api_key or os.getenv("GOOGLE_API_KEY")
+        self.model_name = model_name
+        self._models = {}
+        self._cached_models = {}
+        # 建立中的 context cache：(模型名稱, cache_id) -> Future，讓同時的請求等待同一次建立
+        self._cache_setups = {}
+        self._context_cache_unsupported = set()
+        # 暫時性失敗的 cache：(模型名稱, cache_id) -> 可以再重試的時間
+        self._context_cache_retry_at = {}
+        self._lock = threading.Lock()
+        self._configured = False
+        self.healthy = False
+        self._warm_up_future = None
+        # 所有 session 共用同一份 RPM/TPM 額度
+        self.rate_limiter = RateLimiter()
+
+    def _configure(self):
+        if self._configured:
+            return
+        if not self.api_key:
+            raise GeminiClientError("GOOGLE_API_KEY 未設置")
+        _genai().configure(api_key=self.api_key)
+        self._configured = True
+
+    def get_model(self, model_name=None):
+        """取得（必要時建立）指定名稱的模型，多個 session 可同時安全呼叫"""
+        name = model_name or self.model_name
+        model = self._models.get(name)
+        if model is not None:
+            return model
+        with self._lock:
+            self._configure()
+            model = self._models.get(name)
+            if model is None:
+                model = _genai().GenerativeModel(name)
+                self._models[name] = model
+            return model
+
+    def get_cached_model(self, cache_id, system_instruction, model_name=None, ttl_seconds=None):
+        """取得以 context cache 保存系統提示詞的模型，之後每次只需送出變動的部分
+
+        後端或模型不支援 context caching（例如提示詞低於最小 token 數）時回傳 None，並記住結果，不會每次請求都重試；
+        網路、429、5xx 等暫時性錯誤同樣回傳 None，CONTEXT_CACHE_RETRY_SECONDS 後再重試。查詢與建立 cache 是網路呼叫，不持有 pool 的鎖：
+        同一個 cache 同時只有一個執行緒建立，其他執行緒等待同一個結果，get_model 與其他 cache 不受影響。
+        """
+        name = model_name or self.model_name
+        ttl = CONTEXT_CACHE_TTL if ttl_seconds is None else ttl_seconds
+        key = (name, cache_id)
+        if ttl <= 0 or key in self._context_cache_unsupported or self._context_cache_retry_at.get(key, 0) > time.time():
+            return None
+        entry = self._cached_models.get(key)
+        # 提前一分鐘視為過期，避免請求途中 cache 失效
+        if entry is not None and entry[1] - 60 > time.time():
+            return entry[0]
+        with self._lock:
+            self._configure()
+            if key in self._context_cache_unsupported or self._context_cache_retry_at.get(key, 0) > time.time():
+                return None
+            entry = self._cached_models.get(key)
+            if entry is not None and entry[1] - 60 > time.time():
+                return entry[0]
+            setup = self._cache_setups.get(key)
+            is_owner = setup is None
+            if is_owner:
+                setup = self._cache_setups[key] = concurrent.futures.Future()
+        if not is_owner:
+            return setup.result()
+
+        entry = None
+        unsupported = False
+        try:
+            entry = self._create_cached_model(name, cache_id, system_instruction, ttl)
+        except Exception as e:
+            unsupported = _is_unsupported_error(e)
+            logger.info(
+                "context cache 不可用，改為每次送出完整提示詞: model=%s cache_id=%s retry=%s error=%s",
+                name, cache_id, not unsupported, e,
+            )
+        finally:
+            with self._lock:
+                del self._cache_setups[key]
+                if entry is not None:
+                    self._cached_models[key] = entry
+                    self._context_cache_retry_at.pop(key, None)
+                elif unsupported:
+                    self._context_cache_unsupported.add(key)
+                else:
+                    self._context_cache_retry_at[key] = time.time() + CONTEXT_CACHE_RETRY_SECONDS
+            setup.set_result(entry[0] if entry is not None else None)
+        return entry[0] if entry is not None else None
+
+    def _create_cached_model(self, name, cache_id, system_instruction, ttl):
+        """查詢或建立 context cache，回傳 (模型, 到期時間)；失敗時拋出 SDK 的例外"""
+        from google.generativeai import caching
+        cached_content = self._find_context_cache(caching, name, cache_id)
+        if cached_content is None:
+            cached_content = caching.CachedContent.create(
+                model=f"models/{name}",
+                display_name=cache_id,
+                system_instruction=system_instruction,
+                ttl=datetime.timedelta(seconds=ttl),
+            )
+        model = _genai().GenerativeModel.from_cached_content(cached_content=cached_content)
+        expire_time = cached_content.expire_time
+        expires_at = expire_time.timestamp() if expire_time else time.time() + ttl
+        return model, expires_at
+
+    @staticmethod
+    def _find_context_cache(caching, model_name, cache_id):
+        """多個 worker 行程共用同一份 context cache：先找有沒有其他行程建立的同名 cache"""
+        now = datetime.datetime.now(datetime.timezone.utc)
+        for cached_content in caching.CachedContent.list():
+            if (cached_content.display_name == cache_id
+                    and cached_content.model.endswith(model_name)
+                    and cached_content.expire_time
+                    and cached_content.expire_time - now > datetime.timedelta(minutes=5)):
+                return cached_content
+        return None
+
+    def health_check(self):
+        """確認 API key 有效、模型可用；失敗時拋出 GeminiClientError"""
+        try:
+            with self._lock:
+                self._configure()
+            _genai().get_model(f"models/{self.model_name}")
+        except GeminiClientError:
+            self.healthy = False
+            raise
+        except Exception as e:
+            self.healthy = False
+            raise GeminiClientError(f"Gemini 健康檢查失敗: {e}") from e
+        self.healthy = True
+        return True
+
+    def warm_up(self):
+        """啟動時執行健康檢查並預先建立模型與連線"""
+        self.health_check()
+        model = self.get_model()
+        try:
+            # count_tokens 走與 generate_content 相同的連線，先把連線建立好
+            model.count_tokens("ping")
+        except Exception:
+            # 預熱失敗不代表服務不可用，健康檢查已通過即可
+            pass
+        return self
+
+    def start_warm_up(self, retry_failed=False):
+        """在背景執行緒執行 warm_up()（每個行程一次），回傳 concurrent.futures.Future
+
+        retry_failed=True 時，若上一次預熱失敗則重新開始。
+        """
+        with self._lock:
+            future = self._warm_up_future
+            if future is None or (retry_failed and future.done() and future.exception() is not None):
+                future = concurrent.futures.Future()
+                self._warm_up_future = future
+                threading.Thread(target=self._run_warm_up, args=(future,), name="gemini-warm-up", daemon=True).start()
+            return future
+
+    @property
+    def warm_up_error(self):
+        """背景預熱已失敗時回傳其例外，尚未開始、進行中或成功時回傳 None"""
+        future = self._warm_up_future
+        if future is None or not future.done():
+            return None
+        return future.exception()
+
+    def _run_warm_up(self, future):
+        try:
+            future.set_result(self.warm_up())
+        except Exception as e:
+            future.set_exception(e)
+
+
+_default_pool = None
+_default_pool_lock = threading.Lock()
+
+
+def get_client_pool(api_key=None, model_name=DEFAULT_MODEL_NAME):
+    """取得行程內唯一的客戶端池"""
+    global _default_pool
+    if _default_pool is None:
+        with _default_pool_lock:
+            if _default_pool is None:
+                _default_pool = GeminiClientPool(api_key=api_key, model_name=model_name)
+    return _default_pool
@@ -0,0 +1,207 @@
+import argparse
+import json
+import os
+import sys
+import time
+from collections import Counter
+
+import numpy as np
+
+from prescore import extract_terms
+
+# BM25 參數
+BM25_K1 = 1.2
+BM25_B = 0.75
+INDEX_FORMAT_VERSION = 1
+
+
+def load_jobs(source):
+    """從資料夾（每個 .txt/.md 檔一份職缺）或 JSONL（id/title/text 欄位）載入職缺"""
+    jobs = []
+    if os.path.isdir(source):
+        for name in sorted(os.listdir(source)):
+            if not name.endswith((".txt", ".md")):
+                continue
+            with open(os.path.join(source, name), encoding="utf-8", errors="ignore") as f:
+                text = f.read().strip()
+            if text:
+                jobs.append({"id": name, "title": text.splitlines()[0].strip()[:80], "text": text})
+        return jobs
+
+    with open(source, encoding="utf-8") as f:
+        for line_number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            text = (record.get("text") or record.get("description") or "").strip()
+            if not text:
+                continue
+            jobs.append({
+                "id": str(record.get("id", line_number)),
+                "title": record.get("title") or text.splitlines()[0].strip()[:80],
+                "text": text,
+            })
+    return jobs
+
+
+class JobCorpusIndex:
+    """職缺庫的 BM25 倒排索引
+
+    postings 以 CSR 格式存成連續的 NumPy 陣列（依詞排序的 doc id 與詞頻，搭配每個詞的起訖位置），
+    職缺全文存成單一 UTF-8 檔與位移陣列；載入時全部以 memory-map 開啟，不需要把整個職缺庫讀進記憶體。
+    """
+
+    def __init__(self, vocab, doc_ids, titles, offsets, postings_docs, postings_tf, doc_len, idf, text_offsets, text_blob):
+        self.vocab = vocab
+        self.doc_ids = doc_ids
+        self.titles = titles
+        self.offsets = offsets
+        self.postings_docs = postings_docs
+        self.postings_tf = postings_tf
+        self.doc_len = doc_len
+        self.idf = idf
+        self.text_offsets = text_offsets
+        self.text_blob = text_blob
+        self.avg_doc_len = float(doc_len.mean()) if len(doc_len) else 0.0
+        # BM25 的文件長度正規化項與查詢無關，載入時先算好
+        self.length_norm = (BM25_K1 * (1.0 - BM25_B + BM25_B * np.asarray(doc_len) / max(self.avg_doc_len, 1.0))).astype(np.float32)
+
+    def __len__(self):
+        return len(self.doc_ids)
+
+    @classmethod
+    def build(cls, jobs):
+        """由職缺清單建立索引"""
+        vocab = {}
+        term_ids, doc_indices, term_freqs = [], [], []
+        doc_len = np.zeros(len(jobs), dtype=np.float32)
+        for doc_index, job in enumerate(jobs):
+            counts = Counter(extract_terms(job["text"]))
+            doc_len[doc_index] = sum(counts.values())
+            for term, count in counts.items():
+                term_ids.append(vocab.setdefault(term, len(vocab)))
+                doc_indices.append(doc_index)
+                term_freqs.append(count)
+
+        term_ids = np.asarray(term_ids, dtype=np.int32)
+        order = np.argsort(term_ids, kind="stable")
+        postings_docs = np.asarray(doc_indices, dtype=np.int32)[order]
+        postings_tf = np.asarray(term_freqs, dtype=np.float32)[order]
+        df = np.bincount(term_ids, minlength=len(vocab))
+        offsets = np.zeros(len(vocab) + 1, dtype=np.int64)
+        np.cumsum(df, out=offsets[1:])
+        n_docs = len(jobs)
+        idf = np.log1p((n_docs - df + 0.5) / (df + 0.5)).astype(np.float32)
+
+        encoded = [job["text"].encode("utf-8") for job in jobs]
+        text_offsets = np.zeros(len(jobs) + 1, dtype=np.int64)
+        np.cumsum([len(data) for data in encoded], out=text_offsets[1:])
+        text_blob = np.frombuffer(b"".join(encoded), dtype=np.uint8)
+
+        return cls(
+            vocab,
+            [job["id"] for job in jobs],
+            [job["title"] for job in jobs],
+            offsets, postings_docs, postings_tf, doc_len, idf, text_offsets, text_blob,
+        )
+
+    def save(self, directory):
+        """寫入索引資料夾：陣列存成 .npy（可 memory-map），詞表與職缺標題存成 JSON"""
+        os.makedirs(directory, exist_ok=True)
+        for name in ("offsets", "postings_docs", "postings_tf", "doc_len", "idf", "text_offsets"):
+            np.save(os.path.join(directory, f"{name}.npy"), getattr(self, name))
+        with open(os.path.join(directory, "texts.bin"), "wb") as f:
+            f.write(self.text_blob.tobytes())
+        with open(os.path.join(directory, "meta.json"), "w", encoding="utf-8") as f:
+            json.dump({
+                "format_version": INDEX_FORMAT_VERSION,
+                "vocab": self.vocab,
+                "doc_ids": self.doc_ids,
+                "titles": self.titles,
+            }, f, ensure_ascii=False)
+
+    @classmethod
+    def load(cls, directory):
+        """以 memory-map 載入索引"""
+        with open(os.path.join(directory, "meta.json"), encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta.get("format_version") != INDEX_FORMAT_VERSION:
+            raise ValueError(f"不支援的索引格式版本: {meta.get('format_version')}")
+        arrays = {
+            name: np.load(os.path.join(directory, f"{name}.npy"), mmap_mode="r")
+            for name in ("offsets", "postings_docs", "postings_tf", "doc_len", "idf", "text_offsets")
+        }
+        text_path = os.path.join(directory, "texts.bin")
+        if os.path.getsize(text_path):
+            text_blob = np.memmap(text_path, dtype=np.uint8, mode="r")
+        else:
+            text_blob = np.zeros(0, dtype=np.uint8)
+        return cls(meta["vocab"], meta["doc_ids"], meta["titles"], text_blob=text_blob, **arrays)
+
+    def get_text(self, doc_index):
+        """讀取單一職缺全文（只從 memory-map 讀取需要的位元組）"""
+        start, end = self.text_offsets[doc_index], self.text_offsets[doc_index + 1]
+        return bytes(self.text_blob[start:end]).decode("utf-8")
+
+    def search(self, resume_text, k=10):
+        """回傳 BM25 分數最高的 k 份職缺：[{"id", "title", "text", "score"}]"""
+        if not len(self.doc_ids):
+            return []
+        query = Counter(extract_terms(resume_text))
+        scores = np.zeros(len(self.doc_ids), dtype=np.float32)
+        for term, query_tf in query.items():
+            term_id = self.vocab.get(term)
+            if term_id is None:
+                continue
+            start, end = self.offsets[term_id], self.offsets[term_id + 1]
+            docs = self.postings_docs[start:end]
+            tf = self.postings_tf[start:end]
+            # 同一個詞的 postings 內 doc id 不重複，可以直接用 fancy indexing 累加
+            scores[docs] += self.idf[term_id] * (1.0 + np.log(query_tf)) * tf * (BM25_K1 + 1.0) / (tf + self.length_norm[docs])
+
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return [
+            {
+                "id": self.doc_ids[i],
+                "title": self.titles[i],
+                "text": self.get_text(i),
+                "score": float(scores[i]),
+            }
+            for i in top if scores[i] > 0
+        ]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="建立或查詢職缺庫索引")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    build_parser = subparsers.add_parser("build", help="由資料夾或 JSONL 建立索引")
+    build_parser.add_argument("source")
+    build_parser.add_argument("index_dir")
+    search_parser = subparsers.add_parser("search", help="以履歷檔查詢最相關的職缺")
+    search_parser.add_argument("index_dir")
+    search_parser.add_argument("resume_file")
+    search_parser.add_argument("-k", type=int, default=10)
+    args = parser.parse_args(argv)
+
+    if args.command == "build":
+        start = time.perf_counter()
+        jobs = load_jobs(args.source)
+        index = JobCorpusIndex.build(jobs)
+        index.save(args.index_dir)
+        print(f"已建立 {len(index)} 份職缺的索引（{time.perf_counter() - start:.2f}s）: {args.index_dir}")
+    else:
+        index = JobCorpusIndex.load(args.index_dir)
+        with open(args.resume_file, encoding="utf-8") as f:
+            resume_text = f.read()
+        start = time.perf_counter()
+        results = index.search(resume_text, k=args.k)
+        elapsed = (time.perf_counter() - start) * 1000
+        for rank, job in enumerate(results, 1):
+            print(f"{rank:>3}. {job['score']:8.2f}  {job['id']}  {job['title']}")
+        print(f"查詢耗時 {elapsed:.1f} ms", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
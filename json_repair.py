@@ -0,0 +1,202 @@
+import json
+import re
+
+# 一次比對一個完整字串，或一個結構字元；單獨的 " 代表字串在結尾被截斷
+_TOKEN_RE = re.compile(r'"[^"\\]*(?:\\.[^"\\]*)*"|[{}\[\],:"]', re.S)
+_CONTROL_RE = re.compile(r'[\x00-\x1f\x7f]')
+# 整段文字清理用正規表示式（str.translate 對非 ASCII 長字串較慢）
+_NON_WHITESPACE_CONTROL_RE = re.compile(r'[\x00-\x08\x0B\x0C\x0E-\x1F\x7F]')
+_CLOSERS = {"{": "}", "[": "]"}
+# strict=False 允許字串內含原始換行等控制字元；raw_decode 會忽略根物件之後的文字
+_DECODER = json.JSONDecoder(strict=False)
+_OPENERS = {"}": "{", "]": "["}
+
+# 字串內的換行/定位字元轉成跳脫序列，其餘控制字元直接移除
+_STRING_CONTROL_TABLE = {c: None for c in list(range(0x20)) + [0x7f]}
+_STRING_CONTROL_TABLE.update({0x0A: "\\n", 0x0D: "\\r", 0x09: "\\t"})
+# 字串外保留空白字元（\n, \r, \t），移除其他控制字元
+_LITERAL_CONTROL_TABLE = {c: None for c in list(range(0x20)) + [0x7f] if c not in (0x09, 0x0A, 0x0D)}
+
+
+def _find_start(text):
+    """找出 JSON 根物件的起點；有 ```json 圍欄時從圍欄後開始找"""
+    fence = text.find("```json")
+    if fence >= 0:
+        start = text.find("{", fence + 7)
+        if start >= 0:
+            return start
+    return text.find("{")
+
+
+def _scan(text, start, max_depth=None):
+    """從 start 開始單次線性掃描，回傳 (輸出片段, 是否完整, 安全截斷長度, 安全截斷時的堆疊)
+
+    過程中同時處理：控制字元、字串內的原始換行、多餘的尾逗號、不匹配的右括號。
+    """
+    out = []
+    stack = ""
+    expect_key = False
+    last_token = ""
+    last_comma = -1
+    safe_len = 0
+    safe_stack = None
+    pos = start
+
+    for match in _TOKEN_RE.finditer(text, start):
+        token_start = match.start()
+        if token_start > pos:
+            literal = text[pos:token_start]
+            if _CONTROL_RE.search(literal):
+                literal = literal.translate(_LITERAL_CONTROL_TABLE)
+            out.append(literal)
+            if not literal.isspace():
+                last_token = "literal"
+        pos = match.end()
+        token = match.group()
+        ch = token[0]
+
+        if ch == '"':
+            if len(token) == 1:
+                # 字串沒有結尾引號：回應在字串中間被截斷
+                break
+            if _CONTROL_RE.search(token):
+                token = token.translate(_STRING_CONTROL_TABLE)
+            out.append(token)
+            is_key = expect_key and stack[-1:] == "{"
+            last_token = "key" if is_key else "value"
+            if not is_key and (max_depth is None or len(stack) <= max_depth):
+                safe_len, safe_stack = len(out), stack
+        elif ch in "{[":
+            # 只有物件欄位的空容器算安全點；陣列中未完成的元素不保留，避免出現空的 {} 項目
+            is_field_value = stack[-1:] != "["
+            out.append(ch)
+            stack += ch
+            expect_key = ch == "{"
+            last_token = ch
+            if is_field_value and (max_depth is None or len(stack) <= max_depth):
+                safe_len, safe_stack = len(out), stack
+        elif ch in "}]":
+            if not stack:
+                break
+            opener = _OPENERS[ch]
+            if stack[-1] != opener:
+                if opener not in stack:
+                    # 多餘的右括號，略過
+                    continue
+                # 補上內層缺少的右括號
+                while stack[-1] != opener:
+                    out.append(_CLOSERS[stack[-1]])
+                    stack = stack[:-1]
+            if last_token == ",":
+                # 移除尾逗號，例如 [1, 2,]
+                out[last_comma] = ""
+            out.append(ch)
+            stack = stack[:-1]
+            expect_key = False
+            last_token = ch
+            if not stack:
+                return out, True, len(out), ""
+            if max_depth is None or len(stack) <= max_depth:
+                safe_len, safe_stack = len(out), stack
+        elif ch == ",":
+            # 逗號前一個值必定已完整（數字、true/false/null 也在此確認）
+            if last_token in ("value", "literal", "}", "]") and (max_depth is None or len(stack) <= max_depth):
+                safe_len, safe_stack = len(out), stack
+            last_comma = len(out)
+            out.append(ch)
+            expect_key = stack[-1:] == "{"
+            last_token = ","
+        else:
+            out.append(ch)
+            expect_key = False
+            last_token = ":"
+
+    return out, False, safe_len, safe_stack
+
+
+def _close(out, safe_len, safe_stack):
+    text = "".join(out[:safe_len]).rstrip()
+    if text.endswith(","):
+        text = text[:-1]
+    return text + "".join(_CLOSERS[opener] for opener in reversed(safe_stack))
+
+
+def extract_json(text):
+    """從 AI 回應中取出可解析的 JSON 文字，回傳 (json_text, truncated)
+
+    去除 ``` 圍欄與前後說明文字、清理控制字元，並在回應被截斷時
+    截到最後一個完整的值、依括號堆疊補上缺少的右括號；字串中的括號不受影響。
+    """
+    if not text:
+        return "", False
+    start = _find_start(text)
+    if start < 0:
+        return _NON_WHITESPACE_CONTROL_RE.sub("", text.strip()), False
+    out, complete, safe_len, safe_stack = _scan(text, start)
+    if complete:
+        return "".join(out), False
+    if safe_stack is None:
+        return "", True
+    return _close(out, safe_len, safe_stack), True
+
+
+def loads_fast(text):
+    """只走快速路徑：格式正確（或只夾雜控制字元）的回應由 C 實作的解碼器直接解析；失敗時拋出 json.JSONDecodeError"""
+    text = text or ""
+    start = _find_start(text)
+    if start < 0:
+        raise json.JSONDecodeError("找不到 JSON 起點", text, 0)
+    try:
+        return _DECODER.raw_decode(text, start)[0]
+    except json.JSONDecodeError:
+        cleaned = _NON_WHITESPACE_CONTROL_RE.sub("", text)
+        if len(cleaned) == len(text):
+            raise
+    return _DECODER.raw_decode(cleaned, _find_start(cleaned))[0]
+
+
+def loads_repaired(text):
+    """以 extract_json 的修復掃描解析被截斷或格式錯誤的回應，回傳 (value, truncated)"""
+    json_text, truncated = extract_json(text or "")
+    return json.loads(json_text), truncated
+
+
+def loads_tolerant(text):
+    """解析 AI 回應，回傳 (value, truncated)；無法解析時拋出 json.JSONDecodeError
+
+    格式正確的回應直接由 C 實作的解碼器一次解析完成；只夾雜控制字元時先整段清理再解碼，
+    真正被截斷或格式錯誤時才走 extract_json 的修復掃描。
+    """
+    try:
+        return loads_fast(text), False
+    except json.JSONDecodeError:
+        return loads_repaired(text)
+
+
+def close_partial_json(text, max_depth=None):
+    """把尚未生成完的 JSON 前綴截到最後一個完整值，再補上缺少的右括號
+
+    max_depth 限制「安全截斷點」的巢狀深度，例如 2 代表只保留已完整的頂層欄位與頂層陣列元素。
+    找不到 JSON 起點時回傳 None。
+    """
+    start = _find_start(text)
+    if start < 0:
+        return None
+    out, complete, safe_len, safe_stack = _scan(text, start, max_depth=max_depth)
+    if complete:
+        return "".join(out)
+    if safe_stack is None:
+        return None
+    return _close(out, safe_len, safe_stack)
+
+
+def parse_partial_json(text, max_depth=2):
+    """解析串流中途的 JSON 文字，回傳目前已完整的部分（dict），無法解析時回傳 None"""
+    closed = close_partial_json(text, max_depth=max_depth)
+    if closed is None:
+        return None
+    try:
+        value = json.loads(closed)
+    except json.JSONDecodeError:
+        return None
+    return value if isinstance(value, dict) else None
@@ -0,0 +1,77 @@
+import re
+
+# 依文字系統判斷語言時使用的輸出語言名稱（與 prompts.get_prompt 的語言參數相同）
+CHINESE = "中文"
+ENGLISH = "English"
+JAPANESE = "日本語"
+KOREAN = "한국어"
+
+# 大型輸入只取樣部分視窗，判斷結果穩定後提前結束
+SAMPLE_WINDOW_CHARS = 2048
+MAX_SAMPLE_WINDOWS = 8
+# 至少看過這麼多個字母/字元，且比例離門檻夠遠時才提前結束
+MIN_DECISION_CHARS = 400
+DECISION_MARGIN = 0.15
+# CJK 字元佔比超過此門檻才判定為 CJK 語言（與原本中英判斷相同的門檻）
+CJK_RATIO_THRESHOLD = 0.5
+# 假名佔 CJK 字元的比例超過此值就視為日文（日文漢字很多，只看假名是否明顯出現）
+KANA_RATIO_THRESHOLD = 0.1
+
+# 以連續片段計數，比逐字元比對少建立很多物件
+_HAN_RE = re.compile('[\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff]+')
+# 片假名中點（・）常被中文當作項目符號，不列入假名
+_KANA_RE = re.compile('[\u3040-\u309f\u30a0-\u30fa\u30fc-\u30ff\u31f0-\u31ff\uff66-\uff9f]+')
+_HANGUL_RE = re.compile('[\u1100-\u11ff\u3130-\u318f\uac00-\ud7af]+')
+_LATIN_RE = re.compile('[A-Za-z\u00c0-\u00d6\u00d8-\u00f6\u00f8-\u024f]+')
+
+
+def _count(pattern, text):
+    return sum(map(len, pattern.findall(text)))
+
+
+def _sample_windows(text):
+    """短文字整段回傳；長文字從頭到尾平均取 MAX_SAMPLE_WINDOWS 個視窗"""
+    if len(text) <= SAMPLE_WINDOW_CHARS * MAX_SAMPLE_WINDOWS:
+        for start in range(0, len(text), SAMPLE_WINDOW_CHARS):
+            yield text[start:start + SAMPLE_WINDOW_CHARS]
+        return
+    step = (len(text) - SAMPLE_WINDOW_CHARS) / (MAX_SAMPLE_WINDOWS - 1)
+    for index in range(MAX_SAMPLE_WINDOWS):
+        start = int(index * step)
+        yield text[start:start + SAMPLE_WINDOW_CHARS]
+
+
+def script_profile(text):
+    """統計（取樣後的）各文字系統字元數：han / kana / hangul / latin"""
+    counts = {"han": 0, "kana": 0, "hangul": 0, "latin": 0}
+    for window in _sample_windows(text or ""):
+        counts["han"] += _count(_HAN_RE, window)
+        counts["kana"] += _count(_KANA_RE, window)
+        counts["hangul"] += _count(_HANGUL_RE, window)
+        counts["latin"] += _count(_LATIN_RE, window)
+        total = sum(counts.values())
+        if total >= MIN_DECISION_CHARS:
+            cjk_ratio = (total - counts["latin"]) / total
+            if abs(cjk_ratio - CJK_RATIO_THRESHOLD) >= DECISION_MARGIN:
+                break
+    return counts
+
+
+def classify_profile(counts):
+    """由文字系統統計決定語言；CJK 內部再依假名與諺文的比例區分中日韓"""
+    cjk = counts["han"] + counts["kana"] + counts["hangul"]
+    total = cjk + counts["latin"]
+    if total == 0:
+        return ENGLISH  # 預設英文
+    if cjk / total <= CJK_RATIO_THRESHOLD:
+        return ENGLISH
+    if counts["hangul"] >= max(counts["han"], counts["kana"]):
+        return KOREAN
+    if counts["kana"] >= cjk * KANA_RATIO_THRESHOLD:
+        return JAPANESE
+    return CHINESE
+
+
+def detect_language(text):
+    """檢測文本的主要語言：中文、English、日本語 或 한국어"""
+    return classify_profile(script_profile(text))
@@ -0,0 +1,588 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import time
+
+from analysis_cache import AnalysisCache, make_cache_key
+from analysis_result import AdviceCategory, AnalysisResult, JobProfile
+from gemini_client import get_client_pool
+from json_repair import extract_json, loads_fast, loads_repaired, parse_partial_json
+from metrics import AnalysisTrace, get_registry
+from prompts import (
+    FULL_SECTIONS, SECTION_KEYS, SUMMARY_SECTIONS,
+    build_advice_user_prompt, build_job_profile_user_prompt, build_profile_user_prompt, build_user_prompt,
+    get_advice_prompt, get_job_profile_prompt, get_prompt,
+)
+from rate_limit import QueueFullError, call_with_retry
+from single_flight import SingleFlight
+from text_compaction import canonical_text, compact_job_description, compact_resume, estimate_tokens
+
+# 模型設定（任何一項變更都會讓舊的緩存失效，提示詞版本見 prompts.py）
+MODEL_NAME = "gemini-2.0-flash-lite"
+GENERATION_CONFIG = {
+    "temperature": 0.1,  # 降低溫度以提高一致性
+    "max_output_tokens": 4000,  # 增加 token 限制以避免截斷
+    "top_p": 0.8,  # 限制詞彙選擇範圍
+    "top_k": 20,   # 限制候選詞數量
+}
+
+# 以 response_schema 約束輸出格式（設為 0 則改回在提示詞中以文字描述 schema）
+STRUCTURED_OUTPUT = os.getenv("GEMINI_STRUCTURED_OUTPUT", "1") != "0"
+
+# 把單一大型請求拆成分數、符合/缺少證據與建議三個子請求並行送出（設為 1 啟用）；
+# 總延遲約等於最長的子請求，但每次分析會用掉多個請求的 RPM 額度
+FAN_OUT = os.getenv("GEMINI_FAN_OUT", "0") == "1"
+
+# 兩階段分析時，單一建議類別的輸出上限
+ADVICE_MAX_OUTPUT_TOKENS = 1500
+# 職缺重點（JobProfile）的輸出上限
+JOB_PROFILE_MAX_OUTPUT_TOKENS = 800
+
+# 行程內同時進行的 Gemini 分析數量上限
+MAX_ASYNC_ANALYSES = int(os.getenv("MAX_ASYNC_ANALYSES", "16"))
+
+logger = logging.getLogger(__name__)
+
+
+class AnalysisError(Exception):
+    """分析失敗；details 保存可顯示給使用者的除錯文字（標籤, 內容）"""
+
+    def __init__(self, message, details=None):
+        super().__init__(message)
+        self.details = details or []
+
+
+class AnalysisBusyError(AnalysisError):
+    """API 額度的等待佇列已滿，稍後重試即可"""
+
+
+def generation_config_for(prompt, max_output_tokens=None):
+    """依提示詞的輸出格式組合生成參數；structured 模式由 API 保證回應是符合 prompt.response_schema 的純 JSON"""
+    config = GENERATION_CONFIG
+    if max_output_tokens:
+        config = {**config, "max_output_tokens": max_output_tokens}
+    if prompt.structured:
+        config = {**config, "response_mime_type": "application/json", "response_schema": prompt.response_schema}
+    return config
+
+
+def make_input_hash(resume_text, job_description, output_language):
+    """創建輸入的哈希值用於緩存（包含輸出語言）；以 canonical_text 計算，換行、空白或項目順序不同的輸入共用同一個鍵"""
+    return hashlib.md5(f"{canonical_text(resume_text)}_{canonical_text(job_description)}_{output_language}".encode()).hexdigest()
+
+
+def make_job_hash(job_description, output_language):
+    """職缺重點的緩存鍵只取決於職缺內容與輸出語言"""
+    return hashlib.md5(f"{canonical_text(job_description)}_{output_language}".encode()).hexdigest()
+
+
+def log_token_usage(response, prompt_version, context_cached):
+    """記錄每次請求的 token 用量，用來觀察 context caching 省下的輸入 token"""
+    usage = getattr(response, "usage_metadata", None)
+    if usage is None:
+        return
+    logger.info(
+        "gemini_usage prompt_version=%s context_cached=%s prompt_tokens=%s cached_tokens=%s output_tokens=%s total_tokens=%s",
+        prompt_version,
+        context_cached,
+        getattr(usage, "prompt_token_count", 0),
+        getattr(usage, "cached_content_token_count", 0),
+        getattr(usage, "candidates_token_count", 0),
+        getattr(usage, "total_token_count", 0),
+    )
+
+
+async def stream_response_text(response, on_partial, on_first_chunk=None):
+    """逐塊讀取串流回應，每當可解析的部分結果有新內容就呼叫 on_partial，最後回傳完整文字"""
+    buffer = ""
+    last_signature = None
+    async for chunk in response:
+        if not buffer and on_first_chunk:
+            on_first_chunk()
+        buffer += chunk.text
+        partial = parse_partial_json(buffer)
+        if not partial:
+            continue
+        # 只在出現新欄位或列表變長時更新畫面，避免重複渲染
+        signature = tuple((key, len(value) if isinstance(value, (list, dict)) else 1) for key, value in partial.items())
+        if signature != last_signature:
+            last_signature = signature
+            on_partial(partial)
+    return buffer
+
+
+async def _traced(trace, coro):
+    """等待 coro 並依結果（成功、額度已滿、失敗、取消）結束 trace"""
+    try:
+        result = await coro
+    except asyncio.CancelledError:
+        trace.finish("cancelled")
+        raise
+    except AnalysisBusyError:
+        trace.finish("busy")
+        raise
+    except Exception:
+        trace.finish("error")
+        raise
+    trace.finish("ok")
+    return result
+
+
+def _subscriber(warn=None, on_partial=None, on_queue=None):
+    def subscriber(kind, value):
+        if kind == "partial" and on_partial:
+            on_partial(value)
+        elif kind == "warn" and warn:
+            warn(value)
+        elif kind == "queue" and on_queue:
+            on_queue(value)
+    return subscriber
+
+
+async def run_analysis(model, shared_cache, resume_text, job_description, output_language, warn=None, on_partial=None, flights=None, on_queue=None, include_advice=True, fan_out=None, use_job_profile=False,
+                       job_profile=None):
+    """不依賴 Streamlit 的非同步分析流程，回傳 AnalysisResult；等待 API 時不佔用執行緒，可被取消，失敗時拋出 AnalysisError
+
+    提供 flights（SingleFlight）時，相同輸入的同時請求會合併成一次 API 呼叫。
+    等待 API 額度時以 on_queue((排隊位置, 預估秒數)) 回報，取得額度後回報 None。
+    include_advice=False 時只生成分數與符合/缺少項目（兩階段分析的第一階段），建議之後再以 run_advice 逐類生成。
+    fan_out=True 時各段落以並行的子請求生成後再合併（未指定時依 GEMINI_FAN_OUT），結果格式與緩存都和單次請求相同。
+    use_job_profile=True 時職缺先以 run_job_profile 整理成重點（同一份職缺只抽取一次），提示詞中以重點取代完整職缺，
+    適合多位應徵者比對同一份職缺：每次比對的輸入 token 較少，priorities 也固定使用同一組關鍵技能。
+    已經取得重點時以 job_profile 傳入，不再逐份查詢；重點沒有關鍵技能時改用完整職缺（與一般分析共用緩存）。
+    各階段耗時與 token 用量記錄在 AnalysisTrace，結束時輸出到 metrics。
+    """
+    fan_out = FAN_OUT if fan_out is None else fan_out
+    if job_profile is not None:
+        use_job_profile = bool(job_profile.key_skills)
+    trace = AnalysisTrace(
+        output_language=output_language, stream=on_partial is not None, include_advice=include_advice, fan_out=fan_out, job_profile=use_job_profile
+    )
+    return await _traced(trace, _run_analysis(
+        trace, model, shared_cache, resume_text, job_description, output_language, warn, on_partial, flights, on_queue, include_advice, fan_out,
+        use_job_profile, job_profile,
+    ))
+
+
+async def _run_analysis(trace, model, shared_cache, resume_text, job_description, output_language, warn, on_partial, flights, on_queue, include_advice, fan_out,
+                        use_job_profile, job_profile):
+    with trace.span("prompt_build"):
+        # 正規化並壓縮輸入：移除職缺樣板內容與重複項目，並控制在 token 預算內
+        resume_text = compact_resume(resume_text)
+        job_description = compact_job_description(job_description)
+
+        # 預先建立的系統提示詞與本次的履歷/職缺內容
+        sections = FULL_SECTIONS if include_advice else SUMMARY_SECTIONS
+        prompt = get_prompt(output_language, STRUCTURED_OUTPUT, sections)
+        user_prompt = build_user_prompt(resume_text, job_description)
+
+    profile = job_profile
+    if use_job_profile and profile is None:
+        # 職缺重點以職缺為單位緩存並合併同時的請求，同一份職缺的所有應徵者共用一次抽取
+        with trace.span("job_profile"):
+            profile = await run_job_profile(model, shared_cache, job_description, output_language, flights=flights, on_queue=on_queue)
+
+    # 檢查跨 session 的共享緩存；平行拆分的結果與單次請求相同，共用以完整提示詞計算的鍵（以壓縮後的內容計算，只差在空白、樣板或項目順序的輸入會共用結果）
+    input_hash = make_input_hash(resume_text, job_description, output_language)
+    prompt_version = prompt.version_id
+    if use_job_profile and profile.key_skills:
+        # 提示詞中以職缺重點取代完整職缺時，結果與完整職缺的結果分開緩存；重點是空的時候送出的仍是完整職缺
+        user_prompt = build_profile_user_prompt(resume_text, profile)
+        prompt_version += "+" + get_job_profile_prompt(output_language, STRUCTURED_OUTPUT).version_id
+    cache_key = make_cache_key(input_hash, MODEL_NAME, prompt_version, generation_config_for(prompt))
+    with trace.span("cache_lookup"):
+        cached_result = await asyncio.to_thread(shared_cache.get, cache_key)
+    if cached_result is not None:
+        cached_result = AnalysisResult.from_stored(cached_result)
+    if cached_result is not None:
+        trace.set(source="cache", cache="hit")
+        return cached_result
+
+    # 完全相同的輸入未命中時，查詢內容幾乎相同的既有結果（NEAR_DUPLICATE_MODE，預設只統計不使用）
+    from near_duplicate import NEAR_DUPLICATE_MODE, get_near_duplicate_index, numbers_fingerprint, simhash
+    # 第一次呼叫會開啟 SQLite 並建立資料表，不在 event loop 執行緒上進行
+    near_index = await asyncio.to_thread(get_near_duplicate_index, shared_cache)
+    signatures = None
+    scope = make_cache_key(
+        f"{output_language}|{numbers_fingerprint(resume_text, job_description)}", MODEL_NAME, prompt_version, generation_config_for(prompt)
+    )
+    trace.set(cache="miss")
+    if near_index is not None:
+        def near_lookup():
+            found_signatures = (simhash(resume_text), simhash(job_description))
+            return found_signatures, near_index.find(scope, *found_signatures)
+
+        with trace.span("near_lookup"):
+            signatures, match = await asyncio.to_thread(near_lookup)
+        if match is not None:
+            near_key, similarity = match
+            trace.set(cache="near_shadow", near_similarity=round(similarity, 3))
+            if NEAR_DUPLICATE_MODE == "serve":
+                stored = await asyncio.to_thread(shared_cache.get, near_key)
+                near_result = AnalysisResult.from_stored(stored) if stored is not None else None
+                if near_result is not None:
+                    # 以本次的鍵再存一份，之後相同的輸入直接命中
+                    await asyncio.to_thread(shared_cache.set, cache_key, stored)
+                    trace.set(source="near_cache", cache="near_hit")
+                    return near_result
+                # 結果已過期或被淘汰：視為未命中並移除這筆索引
+                await asyncio.to_thread(near_index.discard, near_key)
+                trace.set(cache="miss")
+
+    # 本地預估分數明顯過低時跳過 LLM，節省 API 額度（門檻見 PRESCORE_SKIP_THRESHOLD）
+    with trace.span("prescore"):
+        from prescore import build_prescreen_result, estimate_match, should_skip_llm
+        estimate = estimate_match(resume_text, job_description)
+    if should_skip_llm(estimate):
+        trace.set(source="prescreen")
+        return build_prescreen_result(estimate, output_language)
+
+    # 相同輸入同時有多個請求時（例如多位使用者貼上同一份範本與職缺），只呼叫一次 API，其餘請求等待同一個結果
+    subscriber = _subscriber(warn, on_partial, on_queue)
+
+    async def factory(publish):
+        trace.set(source="model")
+        if fan_out:
+            parts = {section: get_prompt(output_language, STRUCTURED_OUTPUT, (section,)) for section in sections}
+            result = await generate_analysis_fanout(
+                model, shared_cache, cache_key, parts, user_prompt, output_language, publish, stream=on_partial is not None, trace=trace
+            )
+        else:
+            result = await generate_analysis(
+                model, shared_cache, cache_key, prompt, user_prompt, output_language, publish, stream=on_partial is not None, trace=trace
+            )
+        if signatures is not None:
+            await asyncio.to_thread(near_index.add, scope, cache_key, *signatures)
+        return result
+
+    if flights is None:
+        return await factory(subscriber)
+    # 合併到其他請求時 factory 不會被呼叫，生成階段的耗時只記錄在 leader 的 trace
+    trace.set(source="coalesced")
+    return await flights.do(cache_key, factory, subscriber)
+
+
+async def generate_analysis(model, shared_cache, cache_key, prompt, user_prompt, output_language, publish, stream=False, trace=None):
+    """呼叫 Gemini 並解析結果；部分結果與警告以 publish("partial" / "warn", value) 發出"""
+    trace = trace or AnalysisTrace()
+    on_partial = None
+    if stream:
+        def on_partial(partial):
+            publish("partial", AnalysisResult.from_dict(partial, output_language, partial=True))
+
+    result = await request_json(model, prompt, user_prompt, publish, trace, on_partial=on_partial)
+
+    # 驗證並正規化成 AnalysisResult（同時記錄輸出語言），以緊湊格式存入共享緩存
+    result = AnalysisResult.from_dict(result, output_language)
+    await asyncio.to_thread(shared_cache.set, cache_key, result.to_compact())
+    return result
+
+
+async def generate_analysis_fanout(model, shared_cache, cache_key, parts, user_prompt, output_language, publish, stream=False, trace=None):
+    """把分析拆成各段落的子請求並行送出（parts 為 {段落: 提示詞}），合併成與單次請求相同的 AnalysisResult
+
+    每個子請求只取回自己段落的欄位；串流模式下各子請求也以串流生成，任一段落有新內容時以
+    publish("partial", value) 發出目前合併的結果。任一子請求失敗時取消其餘子請求並拋出該錯誤。
+    各子請求的階段耗時以 "段落.階段" 記錄在 trace。
+    """
+    trace = trace or AnalysisTrace()
+    merged = {}
+
+    def merge(section, data):
+        merged.update((key, data[key]) for key in SECTION_KEYS[section] if key in data)
+
+    async def request_part(section, prompt):
+        on_partial = None
+        if stream:
+            def on_partial(partial):
+                merge(section, partial)
+                publish("partial", AnalysisResult.from_dict(merged, output_language, partial=True))
+
+        merge(section, await request_json(model, prompt, user_prompt, publish, trace, on_partial=on_partial, span_prefix=f"{section}."))
+
+    tasks = [asyncio.ensure_future(request_part(section, prompt)) for section, prompt in parts.items()]
+    try:
+        with trace.span("fan_out"):
+            await asyncio.gather(*tasks)
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        raise
+
+    result = AnalysisResult.from_dict(merged, output_language)
+    await asyncio.to_thread(shared_cache.set, cache_key, result.to_compact())
+    return result
+
+
+def summarize_for_advice(result):
+    """把第一階段的結果整理成第二階段提示詞中的分析摘要"""
+    lines = [f"match_score: {result.match_score}"]
+    lines.extend(f"matched: {item.item}" for item in result.matched)
+    lines.extend(f"missing: {item.item}" + (f" — {item.action}" if item.action else "") for item in result.missing)
+    return "\n".join(lines)
+
+
+def _advice_items(data, category):
+    """從建議請求的回應取出該類別的字串列表；找不到或格式不符時拋出 AnalysisError
+
+    未使用 response_schema 時，模型偶爾會改用類別名稱當作欄位，或回傳完整的分析結構（advice 底下依類別分組）；
+    其他欄位只接受全部是字串的列表，避免把 priorities、matched 等物件列表當成建議顯示。
+    """
+    advice = data.get("advice")
+    for items in (data.get("items"), data.get(category), advice.get(category) if isinstance(advice, dict) else None):
+        if items is not None:
+            break
+    else:
+        items = next((value for value in data.values() if isinstance(value, list) and value and all(isinstance(item, str) for item in value)), None)
+    if not isinstance(items, list) or not all(isinstance(item, str) for item in items):
+        raise AnalysisError("❌ AI 回應中找不到這個類別的建議", [("原始回應:", json.dumps(data, ensure_ascii=False))])
+    return items
+
+
+async def run_advice(model, shared_cache, resume_text, job_description, output_language, result, category, flights=None, on_queue=None):
+    """兩階段分析的第二階段：只生成一個建議類別（prompts.ADVICE_KEYS 之一），回傳 AdviceCategory
+
+    以第一階段的 result 作為上下文；結果以 (輸入, 類別) 存入共享緩存。
+    """
+    trace = AnalysisTrace(output_language=output_language, advice_category=category)
+    return await _traced(trace, _run_advice(
+        trace, model, shared_cache, resume_text, job_description, output_language, result, category, flights, on_queue
+    ))
+
+
+async def _run_advice(trace, model, shared_cache, resume_text, job_description, output_language, result, category, flights, on_queue):
+    with trace.span("prompt_build"):
+        resume_text = compact_resume(resume_text)
+        job_description = compact_job_description(job_description)
+        prompt = get_advice_prompt(output_language, category, STRUCTURED_OUTPUT)
+        user_prompt = build_advice_user_prompt(resume_text, job_description, summarize_for_advice(result), category)
+
+    config = generation_config_for(prompt, ADVICE_MAX_OUTPUT_TOKENS)
+    input_hash = make_input_hash(resume_text, job_description, output_language)
+    cache_key = make_cache_key(input_hash, MODEL_NAME, prompt.version_id, config)
+    with trace.span("cache_lookup"):
+        cached_items = await asyncio.to_thread(shared_cache.get, cache_key)
+    if cached_items is not None:
+        trace.set(source="cache")
+        return AdviceCategory.from_raw(category, cached_items)
+
+    async def generate(publish):
+        trace.set(source="model")
+        data = await request_json(model, prompt, user_prompt, publish, trace, max_output_tokens=ADVICE_MAX_OUTPUT_TOKENS)
+        advice = AdviceCategory.from_raw(category, _advice_items(data, category))
+        await asyncio.to_thread(shared_cache.set, cache_key, list(advice.items))
+        return advice
+
+    subscriber = _subscriber(on_queue=on_queue)
+    if flights is None:
+        return await generate(subscriber)
+    trace.set(source="coalesced")
+    return await flights.do(cache_key, generate, subscriber)
+
+
+async def run_job_profile(model, shared_cache, job_description, output_language, flights=None, on_queue=None):
+    """把職缺整理成 JobProfile（職稱、關鍵技能、經驗要求、其他條件）；以 (職缺內容, 輸出語言) 存入共享緩存"""
+    trace = AnalysisTrace(output_language=output_language, job_profile_extract=True)
+    return await _traced(trace, _run_job_profile(trace, model, shared_cache, job_description, output_language, flights, on_queue))
+
+
+async def _run_job_profile(trace, model, shared_cache, job_description, output_language, flights, on_queue):
+    with trace.span("prompt_build"):
+        job_description = compact_job_description(job_description)
+        prompt = get_job_profile_prompt(output_language, STRUCTURED_OUTPUT)
+        user_prompt = build_job_profile_user_prompt(job_description)
+
+    config = generation_config_for(prompt, JOB_PROFILE_MAX_OUTPUT_TOKENS)
+    cache_key = make_cache_key(make_job_hash(job_description, output_language), MODEL_NAME, prompt.version_id, config)
+    with trace.span("cache_lookup"):
+        cached_profile = await asyncio.to_thread(shared_cache.get, cache_key)
+    if isinstance(cached_profile, dict):
+        trace.set(source="cache", cache="hit")
+        return JobProfile.from_dict(cached_profile)
+    trace.set(cache="miss")
+
+    async def generate(publish):
+        trace.set(source="model")
+        profile = JobProfile.from_dict(await request_json(
+            model, prompt, user_prompt, publish, trace, max_output_tokens=JOB_PROFILE_MAX_OUTPUT_TOKENS
+        ))
+        # 沒有關鍵技能的結果也要緩存，否則同一份職缺的每位應徵者都會再抽取一次
+        await asyncio.to_thread(shared_cache.set, cache_key, profile.to_dict())
+        return profile
+
+    subscriber = _subscriber(on_queue=on_queue)
+    if flights is None:
+        return await generate(subscriber)
+    trace.set(source="coalesced")
+    return await flights.do(cache_key, generate, subscriber)
+
+
+async def request_json(model, prompt, user_prompt, publish, trace, on_partial=None, max_output_tokens=None, span_prefix=""):
+    """送出一次 Gemini 請求並解析成 JSON 物件（dict）
+
+    包含 context caching、依額度排隊與重試、token 用量記錄與截斷修復；提供 on_partial 時以串流模式
+    逐步回傳已完整的部分結果。等待額度與截斷警告以 publish("queue" / "warn", value) 發出。
+    同一個 trace 有多個並行請求時，以 span_prefix 區分各自的階段耗時，token 用量則累加。
+    """
+    import google.generativeai as genai
+
+    stream = on_partial is not None
+    generation_config = genai.types.GenerationConfig(**generation_config_for(prompt, max_output_tokens))
+    queued_at = time.perf_counter()
+
+    async def call_model():
+        publish("queue", None)
+        sent_at = time.perf_counter()
+        trace.record(span_prefix + "queue_wait", sent_at - queued_at)
+        # 使用 Gemini 生成回應（串流模式下先渲染已完成的欄位）
+        response = await model.generate_content_async(
+            contents,
+            generation_config=generation_config,
+            stream=stream
+        )
+        if stream:
+            response_text = await stream_response_text(
+                response, on_partial,
+                on_first_chunk=lambda: trace.record(span_prefix + "api_ttfb", time.perf_counter() - sent_at),
+            )
+        else:
+            # 非串流時整份回應一次送達，首位元組時間即為生成時間
+            response_text = response.text
+            trace.record(span_prefix + "api_ttfb", time.perf_counter() - sent_at)
+        trace.record(span_prefix + "generation", time.perf_counter() - sent_at)
+        return response, response_text
+
+    limiter = get_client_pool().rate_limiter
+    try:
+        # 後端支援 context caching 時，系統提示詞只上傳一次，之後只送出履歷/職缺
+        cached_model = await asyncio.to_thread(
+            get_client_pool().get_cached_model, prompt.version_id, prompt.system_prompt, MODEL_NAME
+        )
+        if cached_model is not None:
+            model = cached_model
+            contents = user_prompt
+        else:
+            contents = f"{prompt.system_prompt}\n\n{user_prompt}"
+
+        # 依 RPM/TPM 額度排隊後才送出，暫時性錯誤（429、5xx）以指數退避重試
+        estimated_tokens = estimate_tokens(contents)
+        response, response_text = await call_with_retry(
+            call_model, limiter, estimated_tokens,
+            on_wait=lambda position, eta: publish("queue", (position, eta))
+        )
+    except QueueFullError as e:
+        raise AnalysisBusyError("⚠️ 目前分析請求過多，請稍後再試") from e
+    except Exception as e:
+        raise AnalysisError(f"❌ API 調用失敗: {str(e)}") from e
+
+    usage = getattr(response, "usage_metadata", None)
+    limiter.record_usage(estimated_tokens, getattr(usage, "prompt_token_count", 0))
+    log_token_usage(response, prompt.version_id, cached_model is not None)
+    trace.set(context_cached=cached_model is not None)
+    trace.add(
+        prompt_tokens=getattr(usage, "prompt_token_count", 0) or 0,
+        cached_tokens=getattr(usage, "cached_content_token_count", 0) or 0,
+        output_tokens=getattr(usage, "candidates_token_count", 0) or 0,
+    )
+
+    # 檢查回應是否為空
+    if not response_text or response_text.strip() == "":
+        raise AnalysisError("❌ AI 回應為空，請檢查 API 設置")
+
+    # 格式正確的回應由 C 解碼器直接解析；失敗時才以單次掃描完成圍欄去除、控制字元清理與截斷修復
+    truncated = False
+    with trace.span(span_prefix + "parse"):
+        try:
+            result = loads_fast(response_text)
+        except json.JSONDecodeError:
+            result = None
+    trace.set(repair_triggered=result is None or trace.attributes.get("repair_triggered", False), structured=prompt.structured)
+    try:
+        if result is None:
+            with trace.span(span_prefix + "repair"):
+                result, truncated = loads_repaired(response_text)
+    except json.JSONDecodeError as e:
+        json_text, _ = extract_json(response_text)
+        if not json_text:
+            raise AnalysisError("❌ 無法從 AI 回應中提取 JSON 內容", [("原始回應:", response_text)]) from e
+        raise AnalysisError(
+            f"❌ JSON 解析失敗: {str(e)}",
+            [("提取的 JSON 文本:", json_text), ("原始回應:", response_text)],
+        ) from e
+
+    if not isinstance(result, dict):
+        raise AnalysisError("❌ 無法從 AI 回應中提取 JSON 內容", [("原始回應:", response_text)])
+
+    if truncated:
+        publish("warn", "⚠️ JSON 回應可能被截斷，已自動修復")
+    return result
+
+
+class MatchingEngine:
+    """不依賴 Streamlit 的匹配分析服務，供 HTTP API 等無介面的呼叫端使用
+
+    持有行程共用的 Gemini 客戶端池、磁碟緩存與 single-flight 表；必須在同一個 event loop 中使用。
+    """
+
+    def __init__(self, shared_cache=None, max_concurrency=MAX_ASYNC_ANALYSES):
+        self.pool = get_client_pool(model_name=MODEL_NAME)
+        self.shared_cache = shared_cache or AnalysisCache()
+        self.flights = SingleFlight("analysis_single_flight")
+        # 緩存命中率與 single-flight 省下的呼叫數在 /metrics 輸出時讀取
+        registry = get_registry()
+        if hasattr(self.shared_cache, "metrics"):
+            registry.register_collector("analysis_cache", self.shared_cache.metrics)
+        registry.register_collector("single_flight", self.flights.metrics, flight=self.flights.name)
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._model = None
+
+    async def start(self):
+        """健康檢查並預熱客戶端（在背景執行緒執行，不阻塞 event loop）"""
+        await asyncio.to_thread(self.pool.warm_up)
+        self._model = self.pool.get_model()
+        return self
+
+    async def analyze(self, resume_text, job_description, output_language="中文"):
+        """分析一份職缺；失敗時拋出 AnalysisError"""
+        if self._model is None:
+            await self.start()
+        async with self._semaphore:
+            return await run_analysis(
+                self._model, self.shared_cache, resume_text, job_description, output_language, flights=self.flights
+            )
+
+    async def screen(self, job_description, resume_texts, output_language="中文"):
+        """多位應徵者比對同一份職缺：職缺先整理成重點（只抽取一次），再並行比對每份履歷
+
+        重點直接傳給每次比對；重點沒有關鍵技能時整批改用完整職缺。
+        回傳 (JobProfile, 與輸入順序相同的 [(AnalysisResult, error)])；職缺重點抽取失敗時拋出 AnalysisError。
+        """
+        if self._model is None:
+            await self.start()
+        async with self._semaphore:
+            profile = await run_job_profile(self._model, self.shared_cache, job_description, output_language, flights=self.flights)
+
+        async def analyze_one(resume_text):
+            try:
+                async with self._semaphore:
+                    result = await run_analysis(
+                        self._model, self.shared_cache, resume_text, job_description, output_language,
+                        flights=self.flights, job_profile=profile,
+                    )
+                return result, None
+            except AnalysisError as e:
+                return None, e
+
+        return profile, await asyncio.gather(*(analyze_one(resume_text) for resume_text in resume_texts))
+
+    async def analyze_batch(self, resume_text, job_descriptions, output_language="中文"):
+        """同一份履歷並行分析多份職缺，回傳與輸入順序相同的 [(AnalysisResult, error)]"""
+        async def analyze_one(job_description):
+            try:
+                return await self.analyze(resume_text, job_description, output_language), None
+            except AnalysisError as e:
+                return None, e
+
+        return await asyncio.gather(*(analyze_one(job_description) for job_description in job_descriptions))
@@ -0,0 +1,235 @@
+"""分析流程的階段計時與 token 用量統計
+
+每次分析建立一個 AnalysisTrace，依序記錄各階段耗時（cache_lookup、prompt_build、queue_wait、
+api_ttfb、generation、parse、repair、render…）與 token 用量；結束時寫入行程共用的 MetricsRegistry，
+並以一行 JSON 記錄到 "metrics" logger。
+
+緩存與 single-flight 等元件以 register_collector() 登記，輸出時才讀取它們目前的累計值（counter）與數量（gauge）。
+MetricsRegistry.render_prometheus() 輸出 Prometheus text format，由 api_server.py 的 GET /metrics
+提供；Streamlit 介面可設定 METRICS_PORT，由 start_metrics_server() 在背景提供同樣的內容。
+"""
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# 各階段耗時的直方圖分界（秒），涵蓋毫秒級的解析到數十秒的生成
+STAGE_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+METRICS_PREFIX = "jobmatch"
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+logger = logging.getLogger("metrics")
+
+
+class _Histogram:
+    __slots__ = ("counts", "total", "count")
+
+    def __init__(self):
+        self.counts = [0] * len(STAGE_BUCKETS)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        for index, bound in enumerate(STAGE_BUCKETS):
+            if value <= bound:
+                self.counts[index] += 1
+        self.total += value
+        self.count += 1
+
+
+def _labels(pairs):
+    return ",".join(f'{name}="{value}"' for name, value in pairs)
+
+
+class MetricsRegistry:
+    """行程內的計數器與階段耗時直方圖（執行緒安全）"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stages = {}
+        self._counters = {}
+        self._collectors = {}
+
+    def observe_stage(self, stage, seconds):
+        with self._lock:
+            histogram = self._stages.get(stage)
+            if histogram is None:
+                histogram = self._stages[stage] = _Histogram()
+            histogram.observe(seconds)
+
+    def inc(self, name, amount=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def register_collector(self, prefix, collect, **labels):
+        """登記輸出時才讀取的統計：collect() 回傳 (counters, gauges) 兩個 {名稱: 數值}
+
+        counter 是只增不減的累計值，輸出為 {prefix}_{名稱}_total；gauge 是目前的數量，輸出為 {prefix}_{名稱}。
+        相同 prefix 與 labels 會取代先前的登記。
+        """
+        with self._lock:
+            self._collectors[(prefix, tuple(sorted(labels.items())))] = collect
+
+    def _collect(self, collectors):
+        counters = {}
+        gauges = {}
+        for (prefix, labels), collect in collectors:
+            try:
+                collected_counters, collected_gauges = collect()
+            except Exception:
+                # 統計讀取失敗（例如 SQLite 被鎖住）時略過，不影響其他指標
+                logger.debug("metrics collection failed: %s", prefix, exc_info=True)
+                continue
+            for name, value in collected_counters.items():
+                counters[(f"{prefix}_{name}", labels)] = value
+            for name, value in collected_gauges.items():
+                gauges.setdefault(f"{METRICS_PREFIX}_{prefix}_{name}", []).append((labels, value))
+        return counters, gauges
+
+    def render_prometheus(self):
+        """輸出 Prometheus text exposition format"""
+        with self._lock:
+            stages = {stage: (list(h.counts), h.total, h.count) for stage, h in self._stages.items()}
+            counters = dict(self._counters)
+            collectors = list(self._collectors.items())
+        collected_counters, gauges = self._collect(collectors)
+        counters.update(collected_counters)
+
+        lines = []
+        name = f"{METRICS_PREFIX}_stage_duration_seconds"
+        lines.append(f"# HELP {name} Duration of each analysis stage.")
+        lines.append(f"# TYPE {name} histogram")
+        for stage in sorted(stages):
+            counts, total, count = stages[stage]
+            for bound, bucket_count in zip(STAGE_BUCKETS, counts):
+                lines.append(f'{name}_bucket{{stage="{stage}",le="{bound}"}} {bucket_count}')
+            lines.append(f'{name}_bucket{{stage="{stage}",le="+Inf"}} {count}')
+            lines.append(f'{name}_sum{{stage="{stage}"}} {total:.6f}')
+            lines.append(f'{name}_count{{stage="{stage}"}} {count}')
+
+        for counter in sorted({key[0] for key in counters}):
+            full_name = f"{METRICS_PREFIX}_{counter}_total"
+            lines.append(f"# TYPE {full_name} counter")
+            for (key_name, labels), value in sorted(counters.items()):
+                if key_name == counter:
+                    label_text = f"{{{_labels(labels)}}}" if labels else ""
+                    lines.append(f"{full_name}{label_text} {value}")
+
+        for full_name in sorted(gauges):
+            lines.append(f"# TYPE {full_name} gauge")
+            for labels, value in sorted(gauges[full_name]):
+                label_text = f"{{{_labels(labels)}}}" if labels else ""
+                lines.append(f"{full_name}{label_text} {value}")
+        return "\n".join(lines) + "\n"
+
+
+_registry = MetricsRegistry()
+
+
+def get_registry():
+    return _registry
+
+
+class AnalysisTrace:
+    """單次分析的階段計時；同一階段重複記錄時（例如重試）以最後一次為準"""
+
+    __slots__ = ("trace_id", "spans", "attributes", "_start", "_finished")
+
+    def __init__(self, **attributes):
+        self.trace_id = uuid.uuid4().hex[:16]
+        self.spans = {}
+        self.attributes = attributes
+        self._start = time.perf_counter()
+        self._finished = False
+
+    @contextmanager
+    def span(self, stage):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(stage, time.perf_counter() - start)
+
+    def record(self, stage, seconds):
+        self.spans[stage] = seconds
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+    def add(self, **amounts):
+        """累加數值屬性（例如平行子請求各自的 token 用量）"""
+        for name, amount in amounts.items():
+            self.attributes[name] = self.attributes.get(name, 0) + amount
+
+    def finish(self, outcome="ok"):
+        """寫入 registry 並輸出一行 JSON 記錄；只有第一次呼叫有效"""
+        if self._finished:
+            return
+        self._finished = True
+        total = time.perf_counter() - self._start
+        registry = get_registry()
+        for stage, seconds in self.spans.items():
+            registry.observe_stage(stage, seconds)
+        registry.observe_stage("total", total)
+        registry.inc("analyses", outcome=outcome, source=self.attributes.get("source", "unknown"))
+        if "cache" in self.attributes:
+            registry.inc("cache_lookups", result=self.attributes["cache"])
+        if "repair_triggered" in self.attributes:
+            registry.inc("json_repair", triggered=str(self.attributes["repair_triggered"]).lower())
+        for kind in ("prompt", "cached", "output"):
+            tokens = self.attributes.get(f"{kind}_tokens")
+            if tokens:
+                registry.inc("gemini_tokens", tokens, kind=kind)
+
+        logger.info(json.dumps({
+            "event": "analysis",
+            "trace_id": self.trace_id,
+            "outcome": outcome,
+            "total_ms": round(total * 1000, 2),
+            "spans_ms": {stage: round(seconds * 1000, 2) for stage, seconds in self.spans.items()},
+            **self.attributes,
+        }, ensure_ascii=False))
+
+
+@contextmanager
+def timed_stage(stage, **attributes):
+    """不屬於單次分析的階段（例如 Streamlit 的結果渲染）：記錄耗時並輸出一行 JSON"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        seconds = time.perf_counter() - start
+        get_registry().observe_stage(stage, seconds)
+        logger.info(json.dumps({"event": "stage", "stage": stage, "ms": round(seconds * 1000, 2), **attributes}, ensure_ascii=False))
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = get_registry().render_prometheus().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", PROMETHEUS_CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_metrics_server(port=None, host=None):
+    """在背景執行緒提供 GET /metrics；未設定 METRICS_PORT 時不啟動並回傳 None"""
+    port = int(port if port is not None else os.getenv("METRICS_PORT", "0"))
+    if not port:
+        return None
+    server = ThreadingHTTPServer((host or os.getenv("METRICS_HOST", "127.0.0.1"), port), _MetricsHandler)
+    threading.Thread(target=server.serve_forever, name="metrics_server", daemon=True).start()
+    logger.info(json.dumps({"event": "metrics_server_started", "port": port}))
+    return server
@@ -0,0 +1,219 @@
+"""近似重複輸入的查詢：以 SimHash 找出內容幾乎相同的已分析履歷/職缺
+
+完全相同（經 canonical_text 正規化後）的輸入由緩存鍵直接命中；只差幾個字的輸入（修正錯字、多一行技能）
+鍵不同，由這裡找出相似度達門檻的既有結果。履歷與職缺各自計算 64 位元 SimHash，兩者都要夠相似才算命中。
+
+簽章存在傳入的 AnalysisCache 同一個 SQLite 檔案（共用它的連線與 TTL）；每個簽章切成 SIMHASH_BANDS 段，
+相差不超過 SIMHASH_BANDS - 1 個位元的簽章至少有一段完全相同，查詢時只比對這些候選項目。
+
+年資、年份等數字會直接影響評分，因此數字也是簽章的特徵，並以 numbers_fingerprint 併入 scope：
+數字不完全相同的輸入不會互相命中。
+
+NEAR_DUPLICATE_MODE：
+  off     不查詢也不記錄簽章
+  shadow  只記錄「如果啟用會命中」的次數（預設），用來評估實際流量中的效益
+  serve   直接回傳相似輸入的分析結果
+"""
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+import weakref
+from collections import Counter
+
+import numpy as np
+
+from prescore import extract_terms
+from text_compaction import canonical_text
+
+NEAR_DUPLICATE_MODES = ("off", "shadow", "serve")
+NEAR_DUPLICATE_MODE = os.getenv("NEAR_DUPLICATE_MODE", "shadow")
+# 履歷與職缺的相似度門檻（1 - 相異位元數 / 64）；0.95 代表最多相差 3 個位元
+NEAR_DUPLICATE_SIMILARITY = float(os.getenv("NEAR_DUPLICATE_SIMILARITY", "0.95"))
+
+SIMHASH_BITS = 64
+SIMHASH_BANDS = 4
+_BAND_BITS = SIMHASH_BITS // SIMHASH_BANDS
+_BAND_MASK = (1 << _BAND_BITS) - 1
+# 單次查詢最多比對的候選數
+MAX_CANDIDATES = 500
+
+_NUMBER_RE = re.compile(r"\d+(?:\.\d+)?")
+
+
+def _feature_hash(feature):
+    return int.from_bytes(hashlib.blake2b(feature.encode(), digest_size=8).digest(), "little")
+
+
+def simhash(text):
+    """64 位元 SimHash；特徵為關鍵詞、相鄰關鍵詞組（保留一點順序資訊）與數字，以出現次數加權"""
+    text = canonical_text(text)
+    terms = extract_terms(text)
+    features = Counter(terms)
+    features.update(f"{first} {second}" for first, second in zip(terms, terms[1:]))
+    # extract_terms 不保留數字，「2 年」與「8 年」的差異要另外加入
+    features.update(f"#{number}" for number in _NUMBER_RE.findall(text))
+    if not features:
+        return 0
+    hashes = np.fromiter((_feature_hash(feature) for feature in features), dtype="<u8", count=len(features))
+    weights = np.fromiter(features.values(), dtype=np.float64, count=len(features))
+    bits = np.unpackbits(hashes.view(np.uint8).reshape(-1, 8), axis=1, bitorder="little")
+    votes = weights @ (bits.astype(np.float64) * 2.0 - 1.0)
+    return int(np.packbits(votes > 0, bitorder="little").view("<u8")[0])
+
+
+def numbers_fingerprint(*texts):
+    """各段文字中出現的數字（不計順序）的摘要；併入 scope 後，年資或年份不同的輸入不會被視為近似"""
+    parts = ["|".join(sorted(_NUMBER_RE.findall(canonical_text(text)))) for text in texts]
+    return hashlib.blake2b("\n".join(parts).encode(), digest_size=8).hexdigest()
+
+
+def similarity(first, second):
+    """兩個簽章的相似度：相同位元的比例"""
+    return 1.0 - bin(first ^ second).count("1") / SIMHASH_BITS
+
+
+def _bands(signature):
+    return [(signature >> (index * _BAND_BITS)) & _BAND_MASK for index in range(SIMHASH_BANDS)]
+
+
+def _to_sql(signature):
+    """SQLite 的 INTEGER 是有號 64 位元"""
+    return signature - (1 << 64) if signature >= 1 << 63 else signature
+
+
+def _from_sql(value):
+    return value + (1 << 64) if value < 0 else value
+
+
+class NearDuplicateIndex:
+    """(履歷, 職缺) 簽章到緩存鍵的索引，存在 cache（AnalysisCache）的 SQLite 檔案中
+
+    scope 區分模型、提示詞版本、輸出語言與輸入中的數字，不同 scope 的結果不會互相命中。
+    """
+
+    def __init__(self, cache):
+        self.cache = cache
+        self._init_schema()
+
+    @property
+    def ttl_seconds(self):
+        return self.cache.ttl_seconds
+
+    def _connect(self):
+        # 與 AnalysisCache 共用每個執行緒的連線，索引與結果一定在同一個檔案
+        return self.cache._connect()
+
+    def _init_schema(self):
+        conn = self._connect()
+        band_columns = ", ".join(f"r{i} INTEGER NOT NULL, j{i} INTEGER NOT NULL" for i in range(SIMHASH_BANDS))
+        conn.execute(
+            f"""CREATE TABLE IF NOT EXISTS near_duplicates (
+                cache_key TEXT PRIMARY KEY,
+                scope TEXT NOT NULL,
+                resume_sig INTEGER NOT NULL,
+                job_sig INTEGER NOT NULL,
+                {band_columns},
+                created_at REAL NOT NULL
+            )"""
+        )
+        for i in range(SIMHASH_BANDS):
+            conn.execute(f"CREATE INDEX IF NOT EXISTS idx_near_duplicates_r{i} ON near_duplicates(scope, r{i})")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_near_duplicates_created_at ON near_duplicates(created_at)")
+
+    def add(self, scope, cache_key, resume_sig, job_sig):
+        """記錄一筆已存入 AnalysisCache 的結果
+
+        同時清掉過期、對應結果已被 AnalysisCache 以 LRU 淘汰的項目，筆數上限與 cache.max_entries 相同。
+        """
+        now = time.time()
+        values = [cache_key, scope, _to_sql(resume_sig), _to_sql(job_sig)]
+        for resume_band, job_band in zip(_bands(resume_sig), _bands(job_sig)):
+            values += [resume_band, job_band]
+        columns = ", ".join(f"r{i}, j{i}" for i in range(SIMHASH_BANDS))
+        try:
+            conn = self._connect()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.execute(
+                    f"INSERT OR REPLACE INTO near_duplicates(cache_key, scope, resume_sig, job_sig, {columns}, created_at) "
+                    f"VALUES ({', '.join('?' * (len(values) + 1))})",
+                    (*values, now),
+                )
+                if self.ttl_seconds > 0:
+                    conn.execute("DELETE FROM near_duplicates WHERE created_at < ?", (now - self.ttl_seconds,))
+                conn.execute(
+                    "DELETE FROM near_duplicates WHERE NOT EXISTS (SELECT 1 FROM analysis_cache WHERE key = near_duplicates.cache_key)"
+                )
+                if self.cache.max_entries > 0:
+                    conn.execute(
+                        """DELETE FROM near_duplicates WHERE cache_key IN (
+                            SELECT cache_key FROM near_duplicates ORDER BY created_at DESC LIMIT -1 OFFSET ?
+                        )""",
+                        (self.cache.max_entries,),
+                    )
+                conn.execute("COMMIT")
+            except sqlite3.Error:
+                conn.execute("ROLLBACK")
+                raise
+        except sqlite3.Error:
+            # 索引寫入失敗只會少一次近似命中的機會
+            return False
+        return True
+
+    def find(self, scope, resume_sig, job_sig, threshold=NEAR_DUPLICATE_SIMILARITY):
+        """找出履歷與職缺都達到 threshold 的最相似項目，回傳 (cache_key, 相似度) 或 None
+
+        相似度取履歷與職缺兩者中較低的一個；對應結果已不在 AnalysisCache 的項目不會回傳。
+        """
+        resume_bands = _bands(resume_sig)
+        job_bands = _bands(job_sig)
+        resume_match = " OR ".join(f"r{i} = ?" for i in range(SIMHASH_BANDS))
+        job_match = " OR ".join(f"j{i} = ?" for i in range(SIMHASH_BANDS))
+        query = (
+            f"SELECT cache_key, resume_sig, job_sig FROM near_duplicates "
+            f"WHERE scope = ? AND ({resume_match}) AND ({job_match}) AND created_at >= ? "
+            f"AND EXISTS (SELECT 1 FROM analysis_cache WHERE key = near_duplicates.cache_key) LIMIT ?"
+        )
+        min_created = time.time() - self.ttl_seconds if self.ttl_seconds > 0 else 0
+        try:
+            rows = self._connect().execute(query, (scope, *resume_bands, *job_bands, min_created, MAX_CANDIDATES)).fetchall()
+        except sqlite3.Error:
+            return None
+
+        best = None
+        for cache_key, stored_resume, stored_job in rows:
+            score = min(similarity(resume_sig, _from_sql(stored_resume)), similarity(job_sig, _from_sql(stored_job)))
+            if score >= threshold and (best is None or score > best[1]):
+                best = (cache_key, score)
+        return best
+
+    def discard(self, cache_key):
+        """移除指向已失效結果的項目"""
+        try:
+            self._connect().execute("DELETE FROM near_duplicates WHERE cache_key = ?", (cache_key,))
+        except sqlite3.Error:
+            pass
+
+    def clear(self):
+        self._connect().execute("DELETE FROM near_duplicates")
+
+
+_indexes = weakref.WeakKeyDictionary()
+_index_lock = threading.Lock()
+
+
+def get_near_duplicate_index(cache):
+    """cache 對應的索引（每個 AnalysisCache 一個）；NEAR_DUPLICATE_MODE=off 或 cache 不是 SQLite 緩存時回傳 None"""
+    if NEAR_DUPLICATE_MODE not in NEAR_DUPLICATE_MODES[1:] or not hasattr(cache, "_connect"):
+        return None
+    with _index_lock:
+        index = _indexes.get(cache)
+        if index is None:
+            try:
+                index = _indexes[cache] = NearDuplicateIndex(cache)
+            except sqlite3.Error:
+                return None
+        return index
@@ -0,0 +1,139 @@
+import os
+import re
+from collections import Counter
+
+import numpy as np
+
+from analysis_result import AnalysisResult, MatchedItem, MissingItem
+
+# 本地預估分數低於此門檻時跳過 LLM 分析（0 代表停用）
+PRESCORE_SKIP_THRESHOLD = float(os.getenv("PRESCORE_SKIP_THRESHOLD", "0"))
+
+# BM25 參數：k1 控制詞頻飽和速度，b 控制履歷長度正規化
+BM25_K1 = 1.2
+BM25_B = 0.75
+AVERAGE_RESUME_TERMS = 400
+# 已知技能詞的權重加成
+SKILL_BOOST = 2.0
+
+_WORD_RE = re.compile(r"[a-z][a-z0-9+#]*(?:[.\-/][a-z0-9+#]+)*", re.I)
+_CJK_RUN_RE = re.compile('[\u4e00-\u9fff]+')
+
+_STOPWORDS = frozenset("""
+a an and are as at be by for from has have in is it of on or our that the this to we will with you your
+about across all also any can able ability etc experience experiences years year strong good excellent
+work working team teams role job position candidate candidates including include new must should well
+plus preferred required requirements responsibilities skills skill knowledge understanding using use
+other more least such who what which their they them into within per based level related
+""".split())
+_CJK_STOPWORDS = frozenset("""
+以上 經驗 具備 熟悉 能力 相關 工作 負責 良好 優先 需要 以及 或是 我們 可以 具有 年以 進行
+""".split())
+
+SKILL_TERMS = frozenset("""
+python java javascript typescript go golang rust ruby php kotlin swift scala c++ c# sql nosql
+react vue angular svelte next.js node.js django flask fastapi spring rails express graphql rest
+html css sass tailwind redux webpack vite
+aws gcp azure docker kubernetes terraform ansible linux git ci/cd jenkins kafka spark hadoop airflow
+postgresql mysql mongodb redis elasticsearch snowflake bigquery
+pandas numpy pytorch tensorflow scikit-learn llm nlp machine deep learning tableau powerbi excel
+figma sketch photoshop seo sem agile scrum jira
+leadership communication collaboration management
+""".split()) | frozenset("""
+前端 後端 全端 資料 數據 分析 機器 學習 設計 產品 專案 管理 溝通 協作 領導 測試 架構 行銷 營運
+""".split())
+
+
+def extract_terms(text):
+    """擷取關鍵詞：英文單字（保留 c++、node.js 等技術詞）與中文二元詞組"""
+    terms = []
+    for word in _WORD_RE.findall(text.lower()):
+        if word in SKILL_TERMS or (len(word) > 2 and word not in _STOPWORDS):
+            terms.append(word)
+    for run in _CJK_RUN_RE.findall(text):
+        for i in range(len(run) - 1):
+            bigram = run[i:i + 2]
+            if bigram not in _CJK_STOPWORDS:
+                terms.append(bigram)
+    return terms
+
+
+def estimate_match(resume_text, job_description, top_n=8):
+    """以 BM25 式的重疊分數粗估匹配度（0-100），不呼叫任何 API
+
+    職缺中的詞為查詢、履歷為文件：職缺詞頻與技能加成決定權重，
+    履歷詞頻經 BM25 飽和函數後計算覆蓋率。回傳 dict：score / matched_terms / missing_terms。
+    """
+    job_counts = Counter(extract_terms(job_description))
+    if not job_counts:
+        return {"score": 0, "matched_terms": [], "missing_terms": []}
+    resume_terms = extract_terms(resume_text)
+    resume_counts = Counter(resume_terms)
+
+    vocab = list(job_counts)
+    job_tf = np.fromiter((job_counts[term] for term in vocab), dtype=np.float64, count=len(vocab))
+    resume_tf = np.fromiter((resume_counts.get(term, 0) for term in vocab), dtype=np.float64, count=len(vocab))
+    boost = np.fromiter((SKILL_BOOST if term in SKILL_TERMS else 1.0 for term in vocab), dtype=np.float64, count=len(vocab))
+
+    weights = (1.0 + np.log(job_tf)) * boost
+    length_norm = 1.0 - BM25_B + BM25_B * max(len(resume_terms), 1) / AVERAGE_RESUME_TERMS
+    saturated = resume_tf * (BM25_K1 + 1.0) / (resume_tf + BM25_K1 * length_norm)
+    coverage = saturated / (BM25_K1 + 1.0)
+
+    score = float(np.dot(weights, np.minimum(coverage, 1.0)) / weights.sum()) * 100.0
+    # 顯示用的關鍵詞只列英文詞與已知技能，略過沒有意義的中文二元詞組
+    order = np.argsort(-weights, kind="stable")
+    matched, missing = [], []
+    for i in order:
+        term = vocab[i]
+        if term not in SKILL_TERMS and _CJK_RUN_RE.match(term):
+            continue
+        (matched if resume_tf[i] > 0 else missing).append(term)
+    return {
+        "score": int(round(min(max(score, 0.0), 100.0))),
+        "matched_terms": matched[:top_n],
+        "missing_terms": missing[:top_n],
+    }
+
+
+def should_skip_llm(estimate, threshold=None):
+    """預估分數明顯過低時，可跳過 LLM 以節省 API 額度"""
+    threshold = PRESCORE_SKIP_THRESHOLD if threshold is None else threshold
+    return threshold > 0 and estimate["score"] < threshold
+
+
+_PRESCREEN_TEXTS = {
+    "中文": {
+        "explanation": "本地關鍵字比對的預估匹配度只有 {score}%，明顯低於門檻，因此沒有進行完整的 AI 分析。如果你認為這份職缺仍然值得一試，可以補充履歷中的相關經驗後再分析一次。",
+        "action": "職缺中提到，但履歷裡沒有找到",
+    },
+    "English": {
+        "explanation": "The local keyword estimate is only {score}%, well below the threshold, so the full AI analysis was skipped. If you still think this job is worth a try, add the relevant experience to your resume and analyze again.",
+        "action": "Mentioned in the job description but not found in the resume",
+    },
+    "日本語": {
+        "explanation": "ローカルのキーワード照合による推定マッチ度は {score}% で、しきい値を大きく下回ったため、AI による詳細な分析は行いませんでした。この求人に応募する価値があると思う場合は、関連する経験を履歴書に追記してから再度分析してください。",
+        "action": "求人票に記載されていますが、履歴書には見つかりませんでした",
+    },
+    "한국어": {
+        "explanation": "로컬 키워드 비교로 추정한 매칭도가 {score}%로 기준보다 크게 낮아 전체 AI 분석을 건너뛰었습니다. 그래도 지원해 볼 만한 직무라고 생각된다면 관련 경험을 이력서에 보완한 뒤 다시 분석해 보세요.",
+        "action": "채용 공고에는 언급되어 있지만 이력서에서는 찾을 수 없습니다",
+    },
+}
+
+
+def build_prescreen_result(estimate, language="中文"):
+    """跳過 LLM 時，把本地預估轉成 display_results 可直接顯示的 AnalysisResult"""
+    # 沒有對應文字的語言改用英文
+    texts = _PRESCREEN_TEXTS.get(language, _PRESCREEN_TEXTS["English"])
+    return AnalysisResult(
+        match_score=estimate["score"],
+        match_explanation=texts["explanation"].format(score=estimate["score"]),
+        score_explanation="",
+        priorities=(),
+        matched=tuple(MatchedItem(term, ()) for term in estimate["matched_terms"]),
+        missing=tuple(MissingItem(term, texts["action"]) for term in estimate["missing_terms"]),
+        advice=(),
+        output_language=language,
+        prescreened=True,
+    )
@@ -0,0 +1,327 @@
+import hashlib
+
+# 提示詞版本；修改提示詞內容時請一併更新，舊的緩存結果會自動失效
+PROMPT_VERSION = "2024-10-v1"
+SUPPORTED_LANGUAGES = ("中文", "English", "日本語", "한국어")
+
+# 五個建議類別：structured output 模式下 advice 的固定欄位 -> (類別名稱, 內容說明)
+ADVICE_CATEGORIES = {
+    "resume_optimization": ("履歷優化", "關鍵缺漏技能建議、可加入的具體句子、技能欄排序建議、成就量化建議"),
+    "cover_letter": ("求職信建議", "開場句模板、中段敘述連結過往經驗、結尾句模板（使用{language}，自然表達，不用敬語，可以用「你」）"),
+    "skill_gap": ("技能差距分析", "缺少技能、學習方向、免費資源/課程建議"),
+    "interview": ("面試準備建議", "潛在問題、回答方向、STAR回答框架提示"),
+    "portfolio": ("作品集建議", "小專案題目、展示建議"),
+}
+ADVICE_KEYS = tuple(ADVICE_CATEGORIES)
+
+# 分析結果的段落與各自的欄位；平行拆分（fan-out）時每個段落各自成為一個子請求
+SECTION_KEYS = {
+    "score": ("match_score", "match_explanation", "priorities"),
+    "evidence": ("matched", "missing"),
+    "advice": ("advice",),
+}
+FULL_SECTIONS = tuple(SECTION_KEYS)
+# 兩階段分析的第一階段不生成 advice
+SUMMARY_SECTIONS = ("score", "evidence")
+
+# 以文字描述輸出格式（未使用 response_schema 時），依段落列出欄位
+PROSE_OUTPUT_HEADER = "你是專業職涯顧問。請閱讀【履歷】與【職缺】，並 ONLY 以 JSON 回覆，符合下列 schema："
+PROSE_FIELDS = {
+    "score": (
+        '"match_score": 整數0-100',
+        '"confidence": 浮點0-1',
+        '"match_explanation": "請根據履歷與職缺的比對結果，撰寫一段不超過 3 段的自然語言說明，用來在 UI 呈現匹配度摘要。請使用簡單清楚、人性化的語氣"',
+        '"priorities": [{"name":字串,"weight":0-1,"explanation":字串}]',
+    ),
+    "evidence": (
+        '"matched": [{"item":字串,"evidence":[字串...]}]',
+        '"missing": [{"item":字串,"action":字串}]',
+    ),
+    "advice": (
+        """"advice": {
+    "履歷優化": ["具體的履歷改進建議"],
+    "求職信建議": ["可直接複製的段落模板"],
+    "技能差距分析": ["缺少技能和學習方向"],
+    "面試準備建議": ["潛在問題和回答方向"],
+    "作品集建議": ["具體的專案題目和展示建議"]
+  }""",
+    ),
+}
+
+# 輸出格式由 response_schema 約束時只需說明欄位對應，省下重複描述 schema 的輸入 token
+STRUCTURED_OUTPUT_FORMAT = """你是專業職涯顧問。請閱讀【履歷】與【職缺】，並以符合 response schema 的 JSON 回覆。{advice_format}"""
+STRUCTURED_ADVICE_FORMAT = "\nadvice 的五個欄位依序為：" + "、".join(f"{key}（{title}）" for key, (title, _) in ADVICE_CATEGORIES.items()) + "。"
+
+# 各段落欄位的撰寫規則；只放入本次請求要生成的段落
+SECTION_RULES = {
+    "score": (
+        "- match_explanation：請根據履歷與職缺的比對結果，撰寫一段不超過 3 段的自然語言說明，用來在 UI 呈現匹配度摘要。請使用簡單清楚、人性化的語氣\n"
+        "- priorities：必須只從職缺內容中挑出重要關鍵技能，不能包含職缺中未提及的技能！每個技能要包含explanation說明為何得分是這樣。\n"
+    ),
+    "evidence": (
+        "- matched：標題要是關鍵技能，首字要大寫；內文若有多點，要列點式描述哪裡有符合、排版恰當，不用寫「因此給予怎樣的權重。」\n"
+        "- missing：不用每個都寫「建議行動：在履歷中補充相關經驗」，文字要寫的有邏輯，有頭有尾；標題要寫的是有邏輯的履歷提到的經歷、技能，要讓人看得懂\n"
+    ),
+    "advice": "         - advice：必須包含以下五個類別，每個類別提供具體可執行的建議：\n" + "".join(
+        f"           * {title}：{guide}\n" for title, guide in ADVICE_CATEGORIES.values()
+    ),
+}
+
+# 分數與權重的評估標準，只有生成分數的段落需要
+SCORING_RULES = """
+特別注意：
+1. priorities 中的技能必須是職缺描述中明確提及或要求的技能，不能因為履歷中有相關經驗就加入職缺關鍵技能中！
+2. 經驗年數評估規則：
+   - 只有當職缺有提到此年數要求才需要考慮此規則
+   - 職缺要求 X 年經驗，履歷有 Y 年經驗：
+     * Y >= X：給 90-100%（經驗充足或超過要求）
+     * Y >= X*0.8：給 70-85%（經驗接近要求）
+     * Y >= X*0.6：給 50-70%（經驗不足但可接受）
+     * Y < X*0.6：給 30-50%（經驗嚴重不足）
+   - 必須在 explanation 中明確說明年數差距對分數的影響
+3. 技能匹配評估規則：
+   - 履歷明確提到相關經驗：給 70-90%
+   - 履歷有相關但描述較少：給 50-70%
+   - 履歷沒有明確提到：給 20-40%
+   - 不要過於保守，如果履歷中有相關經驗就應該給合理的高分
+"""
+
+# 系統提示詞（靜態前綴，可透過 Gemini context caching 重複使用）
+SYSTEM_PROMPT_TEMPLATE = """{output_format}
+
+重要規則：
+- 所有回應文字必須完全使用{language}，不能混合其他語言，不用使用敬語（您）
+{section_rules}- 僅回 JSON，不要其他文字
+{scoring_rules}
+一致性要求：
+- 相同的履歷和職缺描述必須產生相同的分數和評估結果
+- 使用結構化的評估標準，避免主觀判斷
+- 優先考慮客觀指標（年數、技能匹配度）而非主觀感受
+- 嚴格遵守語言一致性：所有回應必須完全使用{language}，不能出現任何其他語言"""
+
+USER_PROMPT_TEMPLATE = """
+履歷內容：
+{resume_text}
+
+職缺描述：
+{job_description}
+
+請分析匹配度並提供建議。
+"""
+
+# 兩階段分析的第二階段：只生成一個建議類別，並以第一階段的結果作為上下文
+ADVICE_SYSTEM_TEMPLATE = """你是專業職涯顧問。請閱讀【履歷】、【職缺】與先前的匹配分析摘要，只針對「{title}」提供具體可執行的建議：{guide}
+
+重要規則：
+- 所有回應文字必須完全使用{language}，不能混合其他語言，不用使用敬語（您）
+- 建議必須根據履歷與職缺的實際內容，優先處理分析摘要中缺少的項目
+- 僅回 JSON：{{"items": ["建議1", "建議2", ...]}}，不要其他文字"""
+
+ADVICE_USER_PROMPT_TEMPLATE = """
+履歷內容：
+{resume_text}
+
+職缺描述：
+{job_description}
+
+先前的匹配分析摘要：
+{analysis_summary}
+
+請提供「{title}」的建議。
+"""
+
+# 多位應徵者比對同一份職缺時，職缺先整理成重點（只抽取一次），每份履歷只送出重點而不是完整職缺
+JOB_PROFILE_SYSTEM_TEMPLATE = """你是專業的招募顧問。請閱讀【職缺】，整理出之後比對履歷時使用的職缺重點，並 ONLY 以 JSON 回覆：
+{{"role": 職稱字串, "key_skills": [字串...], "experience": [字串...], "other": [字串...]}}
+
+重要規則：
+- 所有文字必須完全使用{language}（技術名詞可保留原文），不用使用敬語（您）
+- key_skills：只列出職缺中明確提及或要求的重要關鍵技能，依重要程度排序，最多 10 項，首字要大寫
+- experience：年資、學歷、產業經驗等要求，保留原文中的數字（例如「3 年以上 React 開發經驗」）
+- other：其他對履歷比對有意義的條件（語言能力、證照、工作型態），沒有則為空列表
+- 不要包含福利、公司介紹、平等就業聲明等與比對無關的內容
+- 僅回 JSON，不要其他文字"""
+
+JOB_PROFILE_USER_PROMPT_TEMPLATE = """
+職缺描述：
+{job_description}
+
+請整理職缺重點。
+"""
+
+PROFILE_USER_PROMPT_TEMPLATE = """
+履歷內容：
+{resume_text}
+
+職缺重點（已從職缺描述整理）：
+{job_profile}
+
+請分析匹配度並提供建議。priorities 必須依序使用上列關鍵技能作為 name，不要增減或改寫；經驗年數依上列經驗要求評估。
+"""
+
+
+def _array(items):
+    return {"type": "array", "items": items}
+
+
+def _object(properties):
+    return {"type": "object", "properties": properties, "required": list(properties)}
+
+
+# 與 PROSE_FIELDS 相同結構的 response_schema 欄位（Gemini 的 OpenAPI schema 子集）
+RESPONSE_PROPERTIES = {
+    "match_score": {"type": "integer", "description": "0-100"},
+    "match_explanation": {"type": "string"},
+    "priorities": _array(_object({
+        "name": {"type": "string"},
+        "weight": {"type": "number", "description": "0-1"},
+        "explanation": {"type": "string"},
+    })),
+    "matched": _array(_object({
+        "item": {"type": "string"},
+        "evidence": _array({"type": "string"}),
+    })),
+    "missing": _array(_object({
+        "item": {"type": "string"},
+        "action": {"type": "string"},
+    })),
+    "advice": _object({key: _array({"type": "string"}) for key in ADVICE_KEYS}),
+}
+
+
+def response_schema_for(sections):
+    """只包含指定段落欄位的 response_schema"""
+    return _object({key: RESPONSE_PROPERTIES[key] for section in sections for key in SECTION_KEYS[section]})
+
+
+RESPONSE_SCHEMA = response_schema_for(FULL_SECTIONS)
+# 兩階段分析：第二階段每次只生成一個類別
+ADVICE_RESPONSE_SCHEMA = _object({"items": _array({"type": "string"})})
+JOB_PROFILE_RESPONSE_SCHEMA = _object({
+    "role": {"type": "string"},
+    "key_skills": _array({"type": "string"}),
+    "experience": _array({"type": "string"}),
+    "other": _array({"type": "string"}),
+})
+
+
+class PromptTemplate:
+    """已展開語言變數的提示詞；version_id 同時反映版本號與內容
+
+    response_schema 不為 None 時，輸出格式交給 Gemini 的 structured output 約束。
+    """
+
+    __slots__ = ("language", "system_prompt", "response_schema", "version_id")
+
+    def __init__(self, language, system_prompt, response_schema=None):
+        self.language = language
+        self.system_prompt = system_prompt
+        self.response_schema = response_schema
+        digest = hashlib.md5(system_prompt.encode()).hexdigest()[:8]
+        self.version_id = f"{PROMPT_VERSION}-{digest}"
+
+    @property
+    def structured(self):
+        return self.response_schema is not None
+
+
+def _build_prompt(language, structured=False, sections=FULL_SECTIONS):
+    include_advice = "advice" in sections
+    if structured:
+        output_format = STRUCTURED_OUTPUT_FORMAT.format(advice_format=STRUCTURED_ADVICE_FORMAT if include_advice else "")
+        response_schema = response_schema_for(sections)
+    else:
+        fields = [field for section in sections for field in PROSE_FIELDS[section]]
+        output_format = PROSE_OUTPUT_HEADER + "\n\n{\n" + ",\n".join(f"  {field}" for field in fields) + "\n}"
+        response_schema = None
+    system_prompt = SYSTEM_PROMPT_TEMPLATE.format(
+        language=language,
+        output_format=output_format,
+        section_rules="".join(SECTION_RULES[section] for section in sections).format(language=language),
+        scoring_rules=SCORING_RULES if "score" in sections else "",
+    )
+    return PromptTemplate(language, system_prompt, response_schema)
+
+
+def _build_advice_prompt(language, category, structured=False):
+    title, guide = ADVICE_CATEGORIES[category]
+    system_prompt = ADVICE_SYSTEM_TEMPLATE.format(language=language, title=title, guide=guide.format(language=language))
+    return PromptTemplate(language, system_prompt, ADVICE_RESPONSE_SCHEMA if structured else None)
+
+
+def _build_job_profile_prompt(language, structured=False):
+    system_prompt = JOB_PROFILE_SYSTEM_TEMPLATE.format(language=language)
+    return PromptTemplate(language, system_prompt, JOB_PROFILE_RESPONSE_SCHEMA if structured else None)
+
+
+# import 時即建立各語言、兩種輸出格式的完整分析版本，之後每次分析直接取用
+PROMPTS = {
+    (language, structured, FULL_SECTIONS): _build_prompt(language, structured)
+    for language in SUPPORTED_LANGUAGES for structured in (False, True)
+}
+
+
+def get_prompt(language, structured=False, sections=FULL_SECTIONS):
+    """取得指定語言的系統提示詞；structured=True 時輸出格式交給 response_schema 約束
+
+    sections 為要生成的段落（SECTION_KEYS 的子集，依序）：兩階段分析的第一階段為 SUMMARY_SECTIONS，
+    平行拆分時每個子請求只生成一個段落。
+    """
+    key = (language, structured, tuple(sections))
+    prompt = PROMPTS.get(key)
+    if prompt is None:
+        prompt = PROMPTS.setdefault(key, _build_prompt(language, structured, key[2]))
+    return prompt
+
+
+def get_advice_prompt(language, category, structured=False):
+    """取得只生成單一建議類別（ADVICE_KEYS 之一）的系統提示詞"""
+    key = ("advice", language, category, structured)
+    prompt = PROMPTS.get(key)
+    if prompt is None:
+        prompt = PROMPTS.setdefault(key, _build_advice_prompt(language, category, structured))
+    return prompt
+
+
+def get_job_profile_prompt(language, structured=False):
+    """取得把職缺整理成重點（JobProfile）的系統提示詞"""
+    key = ("job_profile", language, structured)
+    prompt = PROMPTS.get(key)
+    if prompt is None:
+        prompt = PROMPTS.setdefault(key, _build_job_profile_prompt(language, structured))
+    return prompt
+
+
+def build_user_prompt(resume_text, job_description):
+    """組合每次請求會變動的履歷/職缺部分"""
+    return USER_PROMPT_TEMPLATE.format(resume_text=resume_text, job_description=job_description)
+
+
+def build_advice_user_prompt(resume_text, job_description, analysis_summary, category):
+    """組合第二階段的履歷/職缺與第一階段的分析摘要"""
+    return ADVICE_USER_PROMPT_TEMPLATE.format(
+        resume_text=resume_text, job_description=job_description,
+        analysis_summary=analysis_summary, title=ADVICE_CATEGORIES[category][0],
+    )
+
+
+def build_job_profile_user_prompt(job_description):
+    return JOB_PROFILE_USER_PROMPT_TEMPLATE.format(job_description=job_description)
+
+
+def format_job_profile(profile):
+    """把 JobProfile 整理成提示詞中的職缺重點（比完整職缺短，且每位應徵者看到的內容完全相同）"""
+    lines = []
+    if profile.role:
+        lines.append(f"職位：{profile.role}")
+    lines.append("關鍵技能：" + "、".join(profile.key_skills))
+    for label, items in (("經驗要求", profile.experience), ("其他條件", profile.other)):
+        if items:
+            lines.append(f"{label}：")
+            lines.extend(f"- {item}" for item in items)
+    return "\n".join(lines)
+
+
+def build_profile_user_prompt(resume_text, profile):
+    """以職缺重點取代完整職缺的使用者提示詞"""
+    return PROFILE_USER_PROMPT_TEMPLATE.format(resume_text=resume_text, job_profile=format_job_profile(profile))
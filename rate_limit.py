@@ -0,0 +1,168 @@
+import asyncio
+import functools
+import logging
+import os
+import random
+import time
+from collections import deque
+
+# 預設為 gemini-2.0-flash-lite 免費額度，可透過環境變數調整（設為 0 則不限制）
+DEFAULT_REQUESTS_PER_MINUTE = int(os.getenv("GEMINI_RPM", "30"))
+DEFAULT_TOKENS_PER_MINUTE = int(os.getenv("GEMINI_TPM", "1000000"))
+# 等待額度的請求數上限，超過時直接拒絕而不是無限排隊
+DEFAULT_MAX_QUEUE = int(os.getenv("GEMINI_MAX_QUEUE", "50"))
+# 暫時性錯誤的重試次數與退避時間（秒）
+DEFAULT_MAX_RETRIES = int(os.getenv("GEMINI_MAX_RETRIES", "4"))
+RETRY_BASE_DELAY = 1.0
+RETRY_MAX_DELAY = 30.0
+# 排隊中的請求重新檢查額度的間隔（秒）
+QUEUE_POLL_INTERVAL = 0.5
+
+logger = logging.getLogger(__name__)
+
+
+@functools.lru_cache(maxsize=None)
+def transient_errors():
+    """可重試的暫時性錯誤：429 額度不足、5xx 與逾時（延後載入 google.api_core，避免拖慢啟動）"""
+    from google.api_core import exceptions as google_exceptions
+    return (
+        google_exceptions.ResourceExhausted,
+        google_exceptions.TooManyRequests,
+        google_exceptions.ServiceUnavailable,
+        google_exceptions.InternalServerError,
+        google_exceptions.DeadlineExceeded,
+        google_exceptions.GatewayTimeout,
+    )
+
+
+@functools.lru_cache(maxsize=None)
+def quota_errors():
+    """額度不足（429）的錯誤類別"""
+    from google.api_core import exceptions as google_exceptions
+    return (google_exceptions.ResourceExhausted, google_exceptions.TooManyRequests)
+
+
+class QueueFullError(Exception):
+    """等待額度的請求已達上限"""
+
+
+class TokenBucket:
+    """以每分鐘速率補充的 token bucket；允許暫時透支，之後的請求會等到餘額回正"""
+
+    def __init__(self, rate_per_minute, capacity):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = float(capacity)
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount, now):
+        """取得 amount 個 token 需要等待的秒數（超過容量的請求只需等到桶滿）"""
+        self._refill(now)
+        deficit = min(amount, self.capacity) - self.tokens
+        return deficit / self.rate if deficit > 0 else 0.0
+
+    def consume(self, amount, now):
+        self._refill(now)
+        self.tokens -= amount
+
+    def adjust(self, amount):
+        """依實際用量修正先前的預估（正數退還、負數追加扣除）"""
+        self.tokens = min(self.capacity, self.tokens + amount)
+
+    def drain(self):
+        self.tokens = min(self.tokens, 0.0)
+
+
+class RateLimiter:
+    """依 RPM/TPM 額度控制 Gemini 請求的准入
+
+    請求依先後順序排隊（FIFO），隊首等到兩個 bucket 都有足夠餘額才放行；
+    排隊期間透過 on_wait(position, eta_seconds) 回報位置與預估等待時間。
+    只能在單一 event loop 中使用。
+    """
+
+    def __init__(self, requests_per_minute=DEFAULT_REQUESTS_PER_MINUTE, tokens_per_minute=DEFAULT_TOKENS_PER_MINUTE,
+                 max_queue=DEFAULT_MAX_QUEUE, burst_seconds=10):
+        self.enabled = requests_per_minute > 0
+        self.max_queue = max_queue
+        self.request_interval = 60.0 / requests_per_minute if self.enabled else 0.0
+        # 容量設為數秒的額度，允許小幅突發但不會一次用光整分鐘的額度
+        self._requests = TokenBucket(requests_per_minute, max(1, requests_per_minute * burst_seconds // 60)) if self.enabled else None
+        self._tokens = TokenBucket(tokens_per_minute, max(1, tokens_per_minute * burst_seconds // 60)) if self.enabled and tokens_per_minute > 0 else None
+        self._queue = deque()
+        self.admitted = 0
+        self.rejected = 0
+
+    def _wait_time(self, tokens, now):
+        wait = self._requests.wait_time(1, now)
+        if self._tokens is not None:
+            wait = max(wait, self._tokens.wait_time(tokens, now))
+        return wait
+
+    async def acquire(self, tokens=0, on_wait=None):
+        """等待一個請求與 tokens 個 token 的額度；隊伍已滿時拋出 QueueFullError"""
+        if not self.enabled:
+            return
+        if len(self._queue) >= self.max_queue:
+            self.rejected += 1
+            raise QueueFullError(f"等待中的請求已達上限 ({self.max_queue})")
+
+        waiter = object()
+        self._queue.append(waiter)
+        try:
+            while True:
+                now = time.monotonic()
+                position = self._queue.index(waiter)
+                wait = self._wait_time(tokens, now)
+                if position == 0 and wait <= 0:
+                    self._requests.consume(1, now)
+                    if self._tokens is not None:
+                        self._tokens.consume(tokens, now)
+                    self.admitted += 1
+                    return
+                if on_wait:
+                    on_wait(position + 1, wait + position * self.request_interval)
+                await asyncio.sleep(min(wait, QUEUE_POLL_INTERVAL) if position == 0 else QUEUE_POLL_INTERVAL)
+        finally:
+            self._queue.remove(waiter)
+
+    def record_usage(self, estimated_tokens, actual_tokens):
+        """以實際 token 用量修正預估值"""
+        if self._tokens is not None and actual_tokens:
+            self._tokens.adjust(estimated_tokens - actual_tokens)
+
+    def penalize(self):
+        """收到 429 時清空餘額，讓排隊中的請求一起退讓，而不是繼續送出注定失敗的請求"""
+        if self._requests is not None:
+            self._requests.drain()
+
+    def stats(self):
+        return {"admitted": self.admitted, "rejected": self.rejected, "queued": len(self._queue)}
+
+
+def backoff_delay(attempt, base_delay=RETRY_BASE_DELAY, max_delay=RETRY_MAX_DELAY):
+    """指數退避加上 full jitter：在 [0, min(max_delay, base * 2^attempt)] 之間隨機取值"""
+    return random.uniform(0, min(max_delay, base_delay * (2 ** attempt)))
+
+
+async def call_with_retry(call, limiter=None, tokens=0, on_wait=None, max_retries=DEFAULT_MAX_RETRIES):
+    """先取得額度再執行 call()；遇到暫時性錯誤時以 jittered exponential backoff 重試"""
+    attempt = 0
+    while True:
+        if limiter is not None:
+            await limiter.acquire(tokens, on_wait)
+        try:
+            return await call()
+        except transient_errors() as e:
+            if attempt >= max_retries:
+                raise
+            if limiter is not None and isinstance(e, quota_errors()):
+                limiter.penalize()
+            delay = backoff_delay(attempt)
+            attempt += 1
+            logger.warning("gemini_retry attempt=%d delay=%.2fs error=%s", attempt, delay, type(e).__name__)
+            await asyncio.sleep(delay)
@@ -0,0 +1,183 @@
+import html
+import re
+import threading
+from collections import OrderedDict
+
+# 同一份結果重新顯示（Streamlit rerun、展開多職缺結果）時直接取用已產生的 HTML
+RENDER_CACHE_SIZE = 256
+
+_BOLD_RE = re.compile(r'\*\*(.*?)\*\*')
+# Markdown 的 HTML 區塊遇到空行就會結束，內容裡的換行一律轉成 <br>
+_NEWLINES_RE = re.compile(r'\s*\n\s*')
+
+# 定義每個建議類別的顏色和翻譯映射
+ADVICE_CONFIG = {
+    "履歷優化": {"color": "#dc3545", "key": "advice_resume_optimization"},
+    "求職信建議": {"color": "#007bff", "key": "advice_cover_letter"},
+    "技能差距分析": {"color": "#28a745", "key": "advice_skill_gap"},
+    "面試準備建議": {"color": "#6f42c1", "key": "advice_interview"},
+    "作品集建議": {"color": "#fd7e14", "key": "advice_portfolio"},
+    "Resume Optimization": {"color": "#dc3545", "key": "advice_resume_optimization"},
+    "Cover Letter Suggestions": {"color": "#007bff", "key": "advice_cover_letter"},
+    "Skill Gap Analysis": {"color": "#28a745", "key": "advice_skill_gap"},
+    "Interview Preparation": {"color": "#6f42c1", "key": "advice_interview"},
+    "Portfolio Suggestions": {"color": "#fd7e14", "key": "advice_portfolio"},
+    # structured output 模式的固定欄位（prompts.ADVICE_KEYS）
+    "resume_optimization": {"color": "#dc3545", "key": "advice_resume_optimization"},
+    "cover_letter": {"color": "#007bff", "key": "advice_cover_letter"},
+    "skill_gap": {"color": "#28a745", "key": "advice_skill_gap"},
+    "interview": {"color": "#6f42c1", "key": "advice_interview"},
+    "portfolio": {"color": "#fd7e14", "key": "advice_portfolio"},
+}
+_DEFAULT_ADVICE_CONFIG = {"color": "#666"}
+
+# 各區塊的 HTML 樣板（單行，避免被 Markdown 解析成程式碼區塊）
+SCORE_TEMPLATE = (
+    '<div class="score-container"><h1 class="score-number">{score}%</h1>'
+    '<p class="score-label">{label}</p>'
+    '<p style="font-size: {font_size}; margin-top: 0.5rem; opacity: 0.8;">{explanation}</p></div>'
+)
+HEADING_TEMPLATE = '<h3>{title}</h3>'
+SCORE_EXPLANATION_TEMPLATE = "<p style='font-size: {font_size}; color: #666; margin-bottom: 1rem;'>{text}</p>"
+PRIORITY_TEMPLATE = (
+    '<div style="background: #f8f9fa; padding: 0.8rem; margin: 0.3rem 0; border-radius: 6px; border-left: 3px solid {color};">'
+    '<div style="margin-bottom: 0.3rem;"><span style="font-weight: 500;">{index}. {name}</span>'
+    '<span style="font-weight: bold; color: {color}; float: right;">{percent}%</span><div style="clear: both;"></div></div>'
+    '<small style="color: #666; font-size: {font_size};">{explanation}</small></div>'
+)
+PRIORITY_LEGACY_TEMPLATE = "<div class='priority-item'>{index}. {text}</div>"
+EVIDENCE_ITEM_TEMPLATE = "<li style='margin: 0.2rem 0;'>{text}</li>"
+MATCHED_EVIDENCE_TEMPLATE = "<div class=\"matched-item\"><strong>{title}</strong><ul style='margin: 0.3rem 0; padding-left: 1.2rem;'>{evidence}</ul></div>"
+MISSING_ACTION_TEMPLATE = '<div class="missing-item"><strong>{title}</strong><br><span style="color: #666;">{action}</span></div>'
+PLAIN_ITEM_TEMPLATE = '<div class="{css_class}">{text}</div>'
+NOTICE_TEMPLATE = '<div class="result-notice {kind}">{text}</div>'
+ADVICE_TITLE_TEMPLATE = "<div style='font-size: 1.5rem; font-weight: 600; margin: 1.5rem 0 1rem 0; color: #1a1a1a;'>{title}</div>"
+ADVICE_CATEGORY_TEMPLATE = "<div style='color: {color}; margin-top: 0.8rem; margin-bottom: 0.5rem; font-size: 1.5rem; font-weight: 600;'>{title}</div>"
+ADVICE_SUBHEADING_TEMPLATE = "<div style='font-weight: 600; margin: 0.8rem 0 0.3rem 0; color: #333; font-size: 1.1rem;'>{text}</div>"
+ADVICE_BULLET_TEMPLATE = (
+    "<div style='margin: 0.3rem 0; padding-left: 1.5rem; line-height: 1.6;'>"
+    "<span style='color: {color}; font-weight: bold; margin-right: 0.5rem;'>•</span>{text}</div>"
+)
+
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def _text(value):
+    """轉義 AI 產生的文字，並把換行轉成 <br>"""
+    return _NEWLINES_RE.sub("<br>", html.escape(str(value).strip(), quote=False))
+
+
+def _render_priorities(parts, result, texts, language):
+    if not result.priorities:
+        return
+    parts.append(HEADING_TEMPLATE.format(title=texts['priorities_title']))
+    if result.score_explanation:
+        parts.append(SCORE_EXPLANATION_TEMPLATE.format(
+            font_size="1.0rem" if language == "English" else "0.9rem", text=_text(result.score_explanation)
+        ))
+    font_size = "0.9rem" if language == "English" else "0.8rem"
+    for index, priority in enumerate(result.priorities, 1):
+        weight = priority.weight
+        if weight is None:
+            # 舊格式的純文字項目
+            parts.append(PRIORITY_LEGACY_TEMPLATE.format(index=index, text=_text(priority.name)))
+            continue
+        color = "#28a745" if weight >= 0.7 else "#ffc107" if weight >= 0.5 else "#dc3545"
+        parts.append(PRIORITY_TEMPLATE.format(
+            color=color, index=index, name=_text(priority.name), percent=int(weight * 100),
+            font_size=font_size, explanation=_text(priority.explanation),
+        ))
+
+
+def _render_matched_item(item):
+    if not item.evidence:
+        return PLAIN_ITEM_TEMPLATE.format(css_class="matched-item", text=_text(item.item))
+    return MATCHED_EVIDENCE_TEMPLATE.format(
+        title=_text(item.item), evidence="".join(EVIDENCE_ITEM_TEMPLATE.format(text=_text(e)) for e in item.evidence)
+    )
+
+
+def _render_missing_item(item):
+    if not item.action:
+        return PLAIN_ITEM_TEMPLATE.format(css_class="missing-item", text=_text(item.item))
+    return MISSING_ACTION_TEMPLATE.format(title=_text(item.item), action=_text(item.action))
+
+
+def _render_columns(parts, result, texts, partial):
+    parts.append('<div class="result-columns"><div class="result-column">')
+    parts.append(HEADING_TEMPLATE.format(title=texts['matched_title']))
+    if result.matched:
+        parts.extend(_render_matched_item(item) for item in result.matched)
+    elif not partial:
+        parts.append(NOTICE_TEMPLATE.format(kind="info", text=texts['no_matched']))
+    parts.append('</div><div class="result-column">')
+    parts.append(HEADING_TEMPLATE.format(title=texts['missing_title']))
+    if result.missing:
+        parts.extend(_render_missing_item(item) for item in result.missing)
+    elif not partial:
+        parts.append(NOTICE_TEMPLATE.format(kind="success", text=texts['all_skills_met']))
+    parts.append('</div></div>')
+
+
+def _render_advice_item(item, color):
+    clean_item = _BOLD_RE.sub(r'<strong>\1</strong>', _text(item)).replace("*", "").strip()
+    # 檢查是否為子標題（包含冒號且長度較短）
+    if ":" in clean_item and len(clean_item) < 100:
+        return ADVICE_SUBHEADING_TEMPLATE.format(text=clean_item)
+    # 所有其他項目都使用 bullet points (Safari 兼容)
+    return ADVICE_BULLET_TEMPLATE.format(color=color, text=clean_item)
+
+
+def _render_advice(parts, result, texts):
+    if not result.advice:
+        return
+    parts.append(ADVICE_TITLE_TEMPLATE.format(title=texts['advice_title']))
+    parts.append('<div class="advice-box">')
+    for category in result.advice:
+        config = ADVICE_CONFIG.get(category.title, _DEFAULT_ADVICE_CONFIG)
+        color = config["color"]
+        # 使用翻譯後的標題，如果沒有找到則使用原始標題；舊格式的建議列表沒有標題
+        if category.title:
+            parts.append(ADVICE_CATEGORY_TEMPLATE.format(color=color, title=texts.get(config.get("key", ""), _text(category.title))))
+        parts.extend(_render_advice_item(item, color) for item in category.items)
+    parts.append('</div>')
+
+
+def render_advice_category(category):
+    """兩階段分析中單獨生成的建議類別（標題由外層的 expander 顯示）"""
+    color = ADVICE_CONFIG.get(category.title, _DEFAULT_ADVICE_CONFIG)["color"]
+    return '<div class="advice-box">' + "".join(_render_advice_item(item, color) for item in category.items) + '</div>'
+
+
+def render_result(result, texts, language="中文", partial=False):
+    """把 AnalysisResult 一次轉成單一 HTML 片段；partial=True 時省略空白區塊的提示"""
+    parts = [SCORE_TEMPLATE.format(
+        score=result.match_score or 0,
+        label=texts['match_score_label'],
+        # 根據語言調整字體大小
+        font_size="0.9rem" if language == "English" else "0.85rem",
+        explanation=_text(result.match_explanation),
+    )]
+    _render_priorities(parts, result, texts, language)
+    _render_columns(parts, result, texts, partial)
+    _render_advice(parts, result, texts)
+    return "".join(parts)
+
+
+def render_result_cached(result, texts, language="中文", partial=False):
+    """以結果內容快取 render_result 的輸出（AnalysisResult 不可變，可直接作為鍵；串流中的部分結果不快取）"""
+    if partial:
+        return render_result(result, texts, language, partial)
+    key = (language, result)
+    with _cache_lock:
+        fragment = _cache.get(key)
+        if fragment is not None:
+            _cache.move_to_end(key)
+            return fragment
+    fragment = render_result(result, texts, language, partial)
+    with _cache_lock:
+        _cache[key] = fragment
+        if len(_cache) > RENDER_CACHE_SIZE:
+            _cache.popitem(last=False)
+    return fragment
@@ -0,0 +1,82 @@
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class _Flight:
+    __slots__ = ("task", "subscribers", "waiters", "events")
+
+    def __init__(self):
+        self.task = None
+        self.subscribers = []
+        self.waiters = 0
+        # 保留最近一次的各類事件，讓中途加入的請求也能立刻看到目前的部分結果
+        self.events = {}
+
+    def publish(self, kind, value):
+        self.events[kind] = value
+        for subscriber in list(self.subscribers):
+            subscriber(kind, value)
+
+
+class SingleFlight:
+    """合併同一個 key 上同時進行中的非同步工作
+
+    第一個請求（leader）實際執行工作，期間以相同 key 進來的請求只等待同一個結果；
+    工作透過 publish(kind, value) 發出的事件（例如串流中的部分結果）會轉送給所有等待者。
+    任何一個等待者被取消時只會自己離開，所有等待者都離開後才取消底層工作。
+    必須在同一個 event loop 中使用。
+    """
+
+    def __init__(self, name="single_flight"):
+        self.name = name
+        self._flights = {}
+        self.leaders = 0
+        self.coalesced = 0
+
+    async def do(self, key, factory, subscriber=None):
+        """以 key 執行 factory(publish) 回傳的協程；相同 key 已在執行時改為等待其結果"""
+        flight = self._flights.get(key)
+        if flight is None:
+            flight = _Flight()
+            flight.task = asyncio.ensure_future(factory(flight.publish))
+            self._flights[key] = flight
+            flight.task.add_done_callback(lambda _: self._forget(key, flight))
+            self.leaders += 1
+        else:
+            self.coalesced += 1
+            logger.info("%s coalesced key=%s waiters=%d saved_calls=%d", self.name, key, flight.waiters + 1, self.coalesced)
+            if subscriber:
+                for kind, value in flight.events.items():
+                    subscriber(kind, value)
+
+        flight.waiters += 1
+        if subscriber:
+            flight.subscribers.append(subscriber)
+        try:
+            return await asyncio.shield(flight.task)
+        finally:
+            flight.waiters -= 1
+            if subscriber:
+                flight.subscribers.remove(subscriber)
+            if flight.waiters == 0 and not flight.task.done():
+                flight.task.cancel()
+
+    def _forget(self, key, flight):
+        if self._flights.get(key) is flight:
+            del self._flights[key]
+
+    def metrics(self):
+        """register_collector 用的 (counters, gauges)：執行與被合併的累計次數、目前進行中的 key 數"""
+        return {"executions": self.leaders, "coalesced": self.coalesced}, {"in_flight": len(self._flights)}
+
+    def stats(self):
+        """回傳執行次數、被合併的請求數（即省下的 API 呼叫）與目前進行中的 key 數"""
+        total = self.leaders + self.coalesced
+        return {
+            "executions": self.leaders,
+            "coalesced": self.coalesced,
+            "saved_ratio": self.coalesced / total if total else 0.0,
+            "in_flight": len(self._flights),
+        }
@@ -0,0 +1,197 @@
+import os
+import re
+import unicodedata
+
+# 預設 token 預算，可透過環境變數調整
+RESUME_TOKEN_BUDGET = int(os.getenv("RESUME_TOKEN_BUDGET", "3000"))
+JOB_TOKEN_BUDGET = int(os.getenv("JOB_TOKEN_BUDGET", "2000"))
+
+_CJK_RE = re.compile('[\u3040-\u30ff\u3400-\u9fff\uac00-\ud7af\uf900-\ufaff]')
+_NON_SPACE_RE = re.compile(r'\S')
+_INLINE_SPACE_RE = re.compile('[ \t\u00a0\u2000-\u200b\u3000]+')
+_BLANK_LINES_RE = re.compile(r'\n{3,}')
+_BULLET_RE = re.compile(r'^\s*(?:[-*•●▪◦・‧·]|\d{1,2}(?:[.)](?=\s)|、)|[（(]\d{1,2}[）)])\s*')
+_HEADING_MARK_RE = re.compile(r'^\s*#+\s*|[:：]\s*$')
+
+# 段落標題關鍵字與優先順序（數字越大越重要，0 代表樣板內容可直接移除）
+_JOB_SECTION_RULES = [
+    (0, re.compile(r'benefit|perk|what we offer|compensation|salary|福利|待遇|薪資|我們提供', re.I)),
+    (0, re.compile(r'about (?:us|the company)|who we are|our (?:company|mission|story)|company overview|關於我們|公司介紹|公司簡介', re.I)),
+    (0, re.compile(r'equal (?:employment )?opportunit|eeo|diversity|accommodation|平等就業', re.I)),
+    (0, re.compile(r'how to apply|application process|應徵方式|聯絡方式', re.I)),
+    (3, re.compile(r'requirement|qualification|must have|what you.?ll need|you have|skill|條件|要求|資格|必備|技能|專長', re.I)),
+    (2, re.compile(r'nice to have|preferred|bonus|plus|加分', re.I)),
+    (2, re.compile(r'responsibilit|what you.?ll do|the role|duties|工作內容|職責|職務說明', re.I)),
+]
+# 履歷的優先順序 0 不會直接移除，只在超過預算時最先捨棄
+_RESUME_SECTION_RULES = [
+    (3, re.compile(r'experience|employment|work history|工作經驗|工作經歷|經歷', re.I)),
+    (3, re.compile(r'skill|technolog|tech stack|技能|專長|技術', re.I)),
+    (2, re.compile(r'project|achievement|portfolio|專案|作品|成就', re.I)),
+    (1, re.compile(r'education|certificat|award|學歷|證照|獎項', re.I)),
+    (1, re.compile(r'summary|profile|about me|objective|自傳|簡介|個人摘要', re.I)),
+    (0, re.compile(r'^references?$|hobbies|^(?:personal )?interests$|興趣|推薦人', re.I)),
+]
+# 不論出現在哪個段落，都直接移除的樣板句子
+_BOILERPLATE_LINE_RE = re.compile(
+    r'equal opportunity employer|without regard to|regardless of (?:race|gender|age)|'
+    r'protected veteran|reasonable accommodation|e-verify|'
+    r'平等就業|不分性別|不因種族',
+    re.I,
+)
+# 沒有標題的開頭段落預設優先順序
+_DEFAULT_PRIORITY = 2
+
+
+def estimate_tokens(text):
+    """粗估 token 數：CJK 字元約 1 token，其他非空白字元約 4 個 1 token"""
+    cjk = len(_CJK_RE.findall(text))
+    others = len(_NON_SPACE_RE.findall(text)) - cjk
+    return cjk + (others + 3) // 4
+
+
+def normalize_text(text):
+    """統一換行、空白與項目符號，移除多餘的空行"""
+    text = text.replace("\r\n", "\n").replace("\r", "\n")
+    lines = []
+    for line in text.split("\n"):
+        line = _INLINE_SPACE_RE.sub(" ", line).strip()
+        if _BULLET_RE.match(line):
+            line = "- " + _BULLET_RE.sub("", line, count=1)
+        lines.append(line)
+    return _BLANK_LINES_RE.sub("\n\n", "\n".join(lines)).strip()
+
+
+def canonical_text(text):
+    """緩存鍵用的標準形式：在 normalize_text 之外統一全形/半形與大小寫，並排序連續的項目
+
+    只差在換行符號、空白、項目符號樣式或同一組項目順序的輸入會得到相同結果；不用於送出的提示詞。
+    標題在轉小寫前判斷（全大寫的標題才認得出來），只有同一段落內連續的「- 」項目會排序，
+    其他行（職稱、公司、日期等）維持原位，項目不會跨到別的職位底下。
+    """
+    text = normalize_text(unicodedata.normalize("NFKC", text))
+    blocks = []
+    for heading, lines in split_sections(text):
+        body = "\n".join(_sort_bullet_runs(lines)).strip()
+        blocks.append(f"{heading}:\n{body}" if heading else body)
+    return "\n\n".join(blocks).casefold()
+
+
+def _sort_bullet_runs(lines):
+    """排序每一組連續的「- 」項目，非項目行是分界且位置不變"""
+    result = []
+    run = []
+    for line in lines:
+        if line.startswith("- "):
+            run.append(line)
+            continue
+        result.extend(sorted(run))
+        run = []
+        result.append(line)
+    result.extend(sorted(run))
+    return result
+
+
+def _is_heading(line):
+    if not line or line.startswith("- ") or len(line) > 40:
+        return False
+    if line.startswith("#") or line.endswith((":", "：")):
+        return True
+    letters = [c for c in line if c.isalpha()]
+    return len(letters) >= 3 and line.isupper()
+
+
+def split_sections(text):
+    """依標題行切成 [(標題, [內容行...])]；開頭沒有標題的內容標題為空字串"""
+    sections = [("", [])]
+    for line in text.split("\n"):
+        if _is_heading(line):
+            sections.append((_HEADING_MARK_RE.sub("", line).strip(), []))
+        else:
+            sections[-1][1].append(line)
+    return [(heading, lines) for heading, lines in sections if heading or any(lines)]
+
+
+def _section_priority(heading, rules):
+    if not heading:
+        return _DEFAULT_PRIORITY
+    for priority, pattern in rules:
+        if pattern.search(heading):
+            return priority
+    return _DEFAULT_PRIORITY - 1
+
+
+def _dedupe_key(line):
+    return re.sub(r'[\W_]+', '', line.lower())
+
+
+def _compact(text, budget, rules, drop_boilerplate_sections):
+    text = normalize_text(text)
+    if not text:
+        return text
+
+    # 移除樣板段落、樣板句子與重複的項目
+    sections = []
+    for heading, lines in split_sections(text):
+        priority = _section_priority(heading, rules)
+        if priority == 0 and drop_boilerplate_sections:
+            continue
+        kept = []
+        # 只在同一組項目內去重：職稱、公司等非項目行是分界且一定保留，不同職位底下相同的項目不會被合併
+        seen = set()
+        for line in lines:
+            if _BOILERPLATE_LINE_RE.search(line):
+                continue
+            if not line.startswith("- "):
+                seen = set()
+                kept.append(line)
+                continue
+            key = _dedupe_key(line)
+            if len(key) >= 4:
+                if key in seen:
+                    continue
+                seen.add(key)
+            kept.append(line)
+        if heading or any(kept):
+            sections.append((heading, kept, priority))
+
+    # 依優先順序分配 token 預算，輸出時維持原本的段落順序
+    costs = [estimate_tokens(heading) + sum(estimate_tokens(line) for line in lines) for heading, lines, _ in sections]
+    if budget and sum(costs) > budget:
+        remaining = budget
+        allowed = [None] * len(sections)
+        for index in sorted(range(len(sections)), key=lambda i: -sections[i][2]):
+            heading, lines, _ = sections[index]
+            if costs[index] <= remaining:
+                allowed[index] = lines
+                remaining -= costs[index]
+                continue
+            # 預算不足以放入整個段落時，從段落開頭保留能放得下的行
+            partial = []
+            remaining -= estimate_tokens(heading)
+            for line in lines:
+                cost = estimate_tokens(line)
+                if cost > remaining:
+                    break
+                partial.append(line)
+                remaining -= cost
+            allowed[index] = partial if partial else None
+            if remaining <= 0:
+                break
+        sections = [(heading, allowed[i], priority) for i, (heading, _, priority) in enumerate(sections) if allowed[i]]
+
+    blocks = []
+    for heading, lines, _ in sections:
+        body = "\n".join(lines).strip()
+        blocks.append(f"{heading}:\n{body}" if heading else body)
+    return _BLANK_LINES_RE.sub("\n\n", "\n\n".join(block for block in blocks if block)).strip()
+
+
+def compact_job_description(text, budget=None):
+    """壓縮職缺描述：移除 EEO 聲明、福利、公司介紹等樣板，優先保留要求/技能/職責"""
+    return _compact(text, JOB_TOKEN_BUDGET if budget is None else budget, _JOB_SECTION_RULES, drop_boilerplate_sections=True)
+
+
+def compact_resume(text, budget=None):
+    """壓縮履歷：去除同一組內重複的項目，預算不足時優先保留工作經驗與技能（興趣、推薦人等段落最先捨棄）"""
+    return _compact(text, RESUME_TOKEN_BUDGET if budget is None else budget, _RESUME_SECTION_RULES, drop_boilerplate_sections=False)
@@ -0,0 +1,185 @@
+import os
+import re
+
+ASSETS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "assets")
+
+_CSS_COMMENT_RE = re.compile(r'/\*.*?\*/', re.S)
+_CSS_SPACE_RE = re.compile(r'\s+')
+_CSS_PUNCT_RE = re.compile(r'\s*([{}:;,>])\s*')
+
+
+def minify_css(css):
+    """移除註解與多餘空白；每次 rerun 都要重新送出樣式，縮小後可減少傳輸量"""
+    css = _CSS_COMMENT_RE.sub("", css)
+    css = _CSS_SPACE_RE.sub(" ", css)
+    return _CSS_PUNCT_RE.sub(r"\1", css).replace(";}", "}").strip()
+
+
+def load_style_html(path=os.path.join(ASSETS_DIR, "style.css")):
+    with open(path, encoding="utf-8") as f:
+        return f"<style>{minify_css(f.read())}</style>"
+
+
+# import 時讀取一次，之後每次 rerun 直接使用
+APP_STYLE_HTML = load_style_html()
+
+# 介面文字目錄（每個行程只建立一次）
+UI_TEXTS = {
+    "中文": {
+        "app_title": "JobMatch.AI",
+        "app_subtitle": "看見你的強項，精準補齊差距：30 秒搞懂這份職缺適不適合你",
+        "settings_title": "設置",
+        "language_label": "分析語言",
+        "instructions_title": "使用說明",
+        "instructions": [
+            "在左側貼上你的履歷內容",
+            "在右側貼上職缺描述",
+            "點擊「開始分析」",
+            "查看匹配度結果和建議"
+        ],
+        "privacy_title": "隱私保護",
+        "privacy": [
+            "履歷原文不會寫入磁碟，上傳檔案的文字只暫存在伺服器記憶體中",
+            "分析結果暫存在伺服器緩存，到期後自動清除",
+            "完全免費使用"
+        ],
+        "resume_title": "履歷內容",
+        "resume_placeholder": "請貼上你的履歷內容（支援中英文）",
+        "resume_example": "例如：\n姓名：張小明\n學歷：台灣大學資訊工程系\n工作經驗：\n- 2020-2022 軟體工程師，負責前端開發\n- 具備 React, JavaScript, Python 經驗\n...",
+        "resume_upload": "或上傳履歷檔案（PDF、DOCX、TXT）",
+        "resume_extracting": "正在讀取履歷檔案...",
+        "resume_extracted": "已從 {name} 讀取 {chars} 字（共 {pages} 頁），將以檔案內容進行分析",
+        "resume_truncated": "檔案內容過長，只使用前段內容",
+        "resume_upload_failed": "無法讀取履歷檔案：{error}",
+        "job_title": "職缺描述",
+        "job_placeholder": "請貼上職缺描述（Job Description）",
+        "job_example": "例如：\n職位：前端工程師\n要求：\n- 3年以上 React 開發經驗\n- 熟悉 JavaScript, TypeScript\n- 具備團隊協作能力\n- 有產品思維\n...",
+        "analyze_button": "開始分析",
+        "analyze_another": "分析另一份職缺",
+        "match_score_label": "總體匹配度",
+        "priorities_title": "職缺關鍵經驗/技能",
+        "matched_title": "我符合的經驗",
+        "missing_title": "我缺少的經驗",
+        "advice_title": "AI 建議",
+        "advice_resume_optimization": "履歷優化",
+        "advice_cover_letter": "求職信建議",
+        "advice_skill_gap": "技能差距分析",
+        "advice_interview": "面試準備建議",
+        "advice_portfolio": "作品集建議",
+        "no_matched": "暫無符合的經驗",
+        "all_skills_met": "所有關鍵技能都已具備！",
+        "copy_advice": "複製建議文字",
+        "analyzing": "AI 正在分析中，請稍候...",
+        "analysis_complete": "分析完成！",
+        "analysis_failed": "分析失敗，請檢查 API 設置或稍後再試",
+        "fill_required": "請填寫履歷內容和職缺描述",
+        "stream_label": "即時顯示分析結果",
+        "lazy_advice_label": "快速模式：先顯示匹配結果，建議在展開時才產生",
+        "advice_generate": "產生建議",
+        "advice_empty": "這個類別沒有產生任何建議",
+        "prescore_label": "快速預估匹配度：{score}%（本地關鍵字比對，AI 分析進行中...）",
+        "mode_label": "分析模式",
+        "mode_single": "單一職缺",
+        "mode_multi": "多個職缺",
+        "jobs_title": "多個職缺描述",
+        "jobs_placeholder": "請貼上多份職缺描述，每份之間用一行 --- 分隔",
+        "jobs_example": "例如：\n前端工程師\n- 3年以上 React 開發經驗\n---\n後端工程師\n- 熟悉 Python, Django\n...",
+        "jobs_upload": "或上傳職缺文字檔（可多選）",
+        "multi_progress": "已完成 {done}/{total} 份職缺分析",
+        "ranking_title": "職缺匹配度排名",
+        "rank_column": "排名",
+        "job_column": "職缺",
+        "score_column": "匹配度",
+        "status_column": "狀態",
+        "status_done": "完成",
+        "status_failed": "失敗",
+        "elapsed_label": "已等待 {seconds} 秒",
+        "queue_label": "目前使用人數較多，正在排隊：第 {position} 位，預計約 {eta} 秒後開始分析",
+        "mode_corpus": "職缺庫搜尋",
+        "corpus_top_k": "從職缺庫（共 {total} 份）挑出最相關的職缺數量進行 AI 分析",
+        "corpus_retrieved": "已從 {total} 份職缺中找出最相關的 {count} 份",
+        "corpus_no_match": "職缺庫中找不到與履歷相關的職缺",
+        "corpus_load_failed": "無法載入職缺庫索引：{error}"
+    },
+    "English": {
+        "app_title": "JobMatch.AI",
+        "app_subtitle": "See your strengths, bridge the gaps: 30 seconds to know if this job fits you",
+        "settings_title": "Settings",
+        "language_label": "Analysis Language",
+        "instructions_title": "Instructions",
+        "instructions": [
+            "Paste your resume content on the left",
+            "Paste job description on the right",
+            "Click 'Start Analysis'",
+            "View matching results and recommendations"
+        ],
+        "privacy_title": "Privacy Protection",
+        "privacy": [
+            "Resume text is never written to disk; uploaded file text is only held in server memory",
+            "Analysis results are cached on the server and expire automatically",
+            "Completely free to use"
+        ],
+        "resume_title": "Resume Content",
+        "resume_placeholder": "Please paste your resume content",
+        "resume_example": "Example:\nName: John Smith\nEducation: Computer Science, MIT\nExperience:\n- 2020-2022 Software Engineer, Frontend Development\n- Proficient in React, JavaScript, Python\n...",
+        "resume_upload": "Or upload a resume file (PDF, DOCX, TXT)",
+        "resume_extracting": "Reading resume file...",
+        "resume_extracted": "Read {chars} characters from {name} ({pages} pages); the file content will be analyzed",
+        "resume_truncated": "The file is very long, only the first part is used",
+        "resume_upload_failed": "Could not read the resume file: {error}",
+        "job_title": "Job Description",
+        "job_placeholder": "Please paste job description",
+        "job_example": "Example:\nPosition: Frontend Engineer\nRequirements:\n- 3+ years React development experience\n- Familiar with JavaScript, TypeScript\n- Team collaboration skills\n- Product mindset\n...",
+        "analyze_button": "Start Analysis",
+        "analyze_another": "Analyze Another Job",
+        "match_score_label": "Overall Match Score",
+        "priorities_title": "Job Key Experience/Skills",
+        "matched_title": "My Matching Experience",
+        "missing_title": "Missing Experience",
+        "advice_title": "AI Recommendations",
+        "advice_resume_optimization": "Resume Optimization",
+        "advice_cover_letter": "Cover Letter Suggestions",
+        "advice_skill_gap": "Skill Gap Analysis",
+        "advice_interview": "Interview Preparation",
+        "advice_portfolio": "Portfolio Suggestions",
+        "no_matched": "No matching experience found",
+        "all_skills_met": "All key skills are met!",
+        "copy_advice": "Copy Recommendations",
+        "analyzing": "AI is analyzing, please wait...",
+        "analysis_complete": "Analysis complete!",
+        "analysis_failed": "Analysis failed, please check API settings or try again later",
+        "fill_required": "Please fill in resume content and job description",
+        "stream_label": "Show results as they are generated",
+        "lazy_advice_label": "Fast mode: show the match first, generate advice when expanded",
+        "advice_generate": "Generate recommendations",
+        "advice_empty": "No recommendations were generated for this category",
+        "prescore_label": "Quick estimate: {score}% (local keyword match, AI analysis in progress...)",
+        "mode_label": "Analysis Mode",
+        "mode_single": "Single Job",
+        "mode_multi": "Multiple Jobs",
+        "jobs_title": "Job Descriptions",
+        "jobs_placeholder": "Paste several job descriptions, separated by a line containing ---",
+        "jobs_example": "Example:\nFrontend Engineer\n- 3+ years React experience\n---\nBackend Engineer\n- Familiar with Python, Django\n...",
+        "jobs_upload": "Or upload job description text files (multiple allowed)",
+        "multi_progress": "Finished {done}/{total} job analyses",
+        "ranking_title": "Job Match Ranking",
+        "rank_column": "Rank",
+        "job_column": "Job",
+        "score_column": "Match Score",
+        "status_column": "Status",
+        "status_done": "Done",
+        "status_failed": "Failed",
+        "elapsed_label": "Waiting for {seconds}s",
+        "queue_label": "High demand right now. You are #{position} in the queue, analysis starts in about {eta}s",
+        "mode_corpus": "Job Library Search",
+        "corpus_top_k": "Number of most relevant jobs from the library ({total} total) to analyze with AI",
+        "corpus_retrieved": "Found the {count} most relevant jobs out of {total}",
+        "corpus_no_match": "No jobs in the library are related to this resume",
+        "corpus_load_failed": "Failed to load the job library index: {error}"
+    },
+}
+
+
+def get_ui_texts(language):
+    """根據語言返回界面文字（回傳共用的字典，請勿修改）"""
+    return UI_TEXTS.get(language, UI_TEXTS["中文"])